@@ -44,6 +44,25 @@ export class DebianLinuxRole extends Construct {
               actions: ['s3:GetObject', 's3:ListBucket'],
               resources: [`arn:aws:s3:::${props.bucketName}`, `arn:aws:s3:::${props.bucketName}/*`],
             }),
+            new PolicyStatement({
+              sid: 'ScenarioEventsUpload',
+              effect: Effect.ALLOW,
+              actions: ['s3:PutObject'],
+              resources: [`arn:aws:s3:::${props.bucketName}/events/*`],
+            }),
+            // the SSM agent streams the red team script's output to CloudWatch Logs for the driver host
+            new PolicyStatement({
+              sid: 'RemoteScriptOutput',
+              effect: Effect.ALLOW,
+              actions: ['logs:CreateLogGroup', 'logs:CreateLogStream', 'logs:PutLogEvents', 'logs:DescribeLogStreams'],
+              resources: [`arn:aws:logs:${props.region}:${props.accountId}:log-group:GuardDuty-Tester-Remote-Output:*`],
+            }),
+            new PolicyStatement({
+              sid: 'RemoteScriptOutputGroups',
+              effect: Effect.ALLOW,
+              actions: ['logs:DescribeLogGroups'],
+              resources: ['*'],
+            }),
             new PolicyStatement({
               sid: 'S3Finding',
               effect: Effect.ALLOW,
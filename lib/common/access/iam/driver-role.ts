@@ -31,6 +31,7 @@ export interface DriverRoleProps {
   clusterName: string;
   taskRole: string;
   execRole: string;
+  driverInstanceName: string;
 }
 
 /**
@@ -104,6 +105,10 @@ export class DriverRole extends Construct {
               actions: [
                 'guardduty:CreateThreatIntelSet',
                 'guardduty:GetDetector',
+                'guardduty:GetFindings',
+                'guardduty:GetFindingsStatistics',
+                'guardduty:ListCoverage',
+                'guardduty:ListFindings',
                 'guardduty:ListDetectors',
                 'guardduty:UpdateDetector',
               ],
@@ -148,6 +153,60 @@ export class DriverRole extends Construct {
               actions: ['ssm:TerminateSession'],
               resources: ['*']
             }),
+            // Multi region runs (--regions) start the tester on the driver host of each region
+            new PolicyStatement({
+              sid: 'RegionFanOutSendCommand',
+              effect: Effect.ALLOW,
+              actions: ['ssm:SendCommand'],
+              resources: [`arn:aws:ec2:*:${props.accountId}:instance/*`],
+              conditions: {
+                StringEquals: {
+                  'ssm:resourceTag/Name': props.driverInstanceName,
+                },
+              },
+            }),
+            // Multi account runs (--accounts/--ou) assume a role in each member account of the organization
+            new PolicyStatement({
+              sid: 'AccountFanOutAssumeRole',
+              effect: Effect.ALLOW,
+              actions: ['sts:AssumeRole'],
+              resources: ['arn:aws:iam::*:role/*'],
+              conditions: {
+                StringEquals: {
+                  'aws:ResourceOrgID': '${aws:PrincipalOrgID}',
+                },
+              },
+            }),
+            new PolicyStatement({
+              sid: 'AccountFanOutListAccounts',
+              effect: Effect.ALLOW,
+              actions: ['organizations:ListAccountsForParent', 'organizations:ListOrganizationalUnitsForParent'],
+              resources: ['*'],
+            }),
+            new PolicyStatement({
+              sid: 'RegionFanOutDocument',
+              effect: Effect.ALLOW,
+              actions: ['ssm:SendCommand'],
+              resources: ['arn:aws:ssm:*::document/AWS-RunShellScript'],
+            }),
+            new PolicyStatement({
+              sid: 'RegionFanOutCommandStatus',
+              effect: Effect.ALLOW,
+              actions: ['ssm:GetCommandInvocation'],
+              resources: ['*'], // Selected actions only support the all resources wildcard('*')
+            }),
+            new PolicyStatement({
+              sid: 'ScenarioEventLogs',
+              effect: Effect.ALLOW,
+              actions: ['logs:FilterLogEvents'],
+              resources: [`arn:aws:logs:${props.region}:${props.accountId}:log-group:GuardDuty-Tester-Ecs-Task-Logs:*`],
+            }),
+            new PolicyStatement({
+              sid: 'RemoteScriptOutput',
+              effect: Effect.ALLOW,
+              actions: ['logs:GetLogEvents'],
+              resources: [`arn:aws:logs:${props.region}:${props.accountId}:log-group:GuardDuty-Tester-Remote-Output:*`],
+            }),
             new PolicyStatement({
               sid: 'InstallGuardDutyAgent',
               effect: Effect.ALLOW,
@@ -175,9 +234,18 @@ export class DriverRole extends Construct {
             new PolicyStatement({
               sid: 'RegisterEcsTask',
               effect: Effect.ALLOW,
-              actions: ['ecs:RegisterTaskDefinition'],
+              actions: ['ecs:RegisterTaskDefinition', 'ecs:ListTaskDefinitions', 'ecs:DescribeTaskDefinition'],
               resources: ['*'], // Selected actions only support the all resources wildcard('*').
             }),
+            new PolicyStatement({
+              sid: 'TagEcsTask',
+              effect: Effect.ALLOW,
+              actions: ['ecs:TagResource'], // Required to tag task definitions with their payload digest on registration
+              resources: [
+                `arn:aws:ecs:${props.region}:${props.accountId}:task-definition/${props.fargateTaskFamily}:*`,
+                `arn:aws:ecs:${props.region}:${props.accountId}:task-definition/${props.ec2TaskFamily}:*`,
+              ],
+            }),
             new PolicyStatement({
               sid: 'ECRFullAccess',
               effect: Effect.ALLOW,
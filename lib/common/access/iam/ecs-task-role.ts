@@ -28,6 +28,18 @@ export class EcsTaskRole extends Construct {
 
     this.role = new Role(this, id, {
       assumedBy: new ServicePrincipal('ecs-tasks.amazonaws.com'),
+      inlinePolicies: {
+        EcsTaskInlinePolicy: new PolicyDocument({
+          statements: [
+            new PolicyStatement({
+              sid: 'RuntimePayloadDownload',
+              effect: Effect.ALLOW,
+              actions: ['s3:GetObject'],
+              resources: [`arn:aws:s3:::${props.bucketName}/payloads/*`],
+            }),
+          ],
+        }),
+      },
     });
   }
 }
@@ -145,7 +145,7 @@ export class DebianLinuxInstance extends Construct {
       `cd ${homeDir}`,
       'python3 -m venv gd_tester_pyenv',
       'source gd_tester_pyenv/bin/activate',
-      'pip3 install awscurl aws-consoler',
+      'pip3 install awscurl aws-consoler boto3 requests pysocks',
       'systemctl enable tor',
       'systemctl start tor',
       `chown -R ssm-user: ${homeDir}`,
@@ -90,6 +90,7 @@ export class TestDriverEcsCluster extends Construct {
       execRole: executionRole.role.roleArn,
       fargateTaskFamily: props.fargateTaskFamily,
       clusterName: props.ecsCluster,
+      driverInstanceName: props.instanceName,
     });
 
     const cluster_sg = new ClusterSecurityGroup(this, 'ClusterSecurityGroup', {
@@ -161,25 +162,22 @@ export class TestDriverEcsCluster extends Construct {
       'echo "ssm-user ALL=(ALL) NOPASSWD:ALL" > /etc/sudoers.d/ssm-agent-users',
       'chmod 440 /etc/sudoers.d/ssm-agent-users',
       'yum update -y',
-      `${install} zip unzip wget nmap git python3-pip gcc glib2-devel cmake3 gcc-c++ openssl-devel libX11-devel libXi-devel libXtst-devel libXinerama-devel libusb-devel libusb-devel bind-utils jq libpcap-devel`,
+      `${install} zip unzip wget nmap git python3-pip gcc glibc-static glib2-devel cmake3 gcc-c++ openssl-devel libX11-devel libXi-devel libXtst-devel libXinerama-devel libusb-devel libusb-devel bind-utils jq libpcap-devel`,
       'curl https://awscli.amazonaws.com/awscli-exe-linux-x86_64.zip -o awscliv2.zip',
       'unzip awscliv2.zip',
       './aws/install',
       'PATH=$PATH:/usr/local/bin',
-      'pip3 install argparse envbash boto3 paramiko scapy',
+      'pip3 install argparse envbash boto3 numpy paramiko scapy',
       'systemctl start amazon-ssm-agent',
       'TOKEN=`curl -X PUT "http://169.254.169.254/latest/api/token" -H "X-aws-ec2-metadata-token-ttl-seconds: 21600"`',
       'INSTANCE_ID=$(curl -H "X-aws-ec2-metadata-token: $TOKEN" -v http://169.254.169.254/latest/meta-data/instance-id)',
       `aws ssm send-command --region ${region} --instance-ids \$INSTANCE_ID --document-name "AmazonGuardDuty-ConfigureRuntimeMonitoringSsmPlugin" --parameters "action=Install,name=AmazonGuardDuty-RuntimeMonitoringSsmPlugin" --output text`,
       `mkdir ${homeDir}/compromised_keys`,
-      `mkdir ${homeDir}/domains`,
       `mkdir ${homeDir}/passwords`,
-      `curl -L https://raw.githubusercontent.com/awslabs/amazon-guardduty-tester/master/artifacts/queries.txt > ${homeDir}/domains/queries.txt`,
       `curl -L https://raw.githubusercontent.com/awslabs/amazon-guardduty-tester/master/artifacts/password_list.txt > ${homeDir}/passwords/password_list.txt`,
       `curl -L https://raw.githubusercontent.com/awslabs/amazon-guardduty-tester/master/artifacts/never_used_sample_key.foo > ${homeDir}/compromised_keys/compromised.pem`,
       `FILE="${homeDir}/compromised_keys/compromised.pem"`,
       `for FILE in {1..20}; do cp ${homeDir}/compromised_keys/compromised.pem ${homeDir}/compromised_keys/compromised$FILE.pem; done`,
-      `sed -i 's/loganding123test.com/guarddutyc2activityb.com/g' ${homeDir}/domains/queries.txt`,
       `aws s3 cp --recursive s3://${props.bucketName}/py_tester ${homeDir}/py_tester`,
       `find  ${homeDir}/py_tester/runtimeScenarios -name "*.sh" -exec chmod +x {} \\;`,
       `find  ${homeDir}/py_tester/runtimeScenarios -name "*.py" -exec chmod +x {} \\;`,
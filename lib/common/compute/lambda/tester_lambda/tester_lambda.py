@@ -11,13 +11,52 @@
 #  express or implied. See the License for the specific language governing 
 #  permissions and limitations under the License.
 
-import random
-import string
+import time
 import socket
 from aws_lambda_powertools.utilities.typing import LambdaContext
 
-def lambda_handler(event: dict, context: LambdaContext) -> int:
-    payload = ''.join(random.choice(string.ascii_uppercase) for _ in range(1024))
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    sock.sendto(bytes(payload, "utf-8"), (event['ip'], int(event['port'])))
-    return 0 
\ No newline at end of file
+MAX_PACKET_SIZE = 65507
+CONNECT_TIMEOUT = 2
+
+# payload buffer allocated once per execution environment, packets are slices of it
+PAYLOAD = memoryview(b'ABCDEFGHIJKLMNOPQRSTUVWXYZ' * (MAX_PACKET_SIZE // 26 + 1))[:MAX_PACKET_SIZE]
+
+
+'''
+Sends packets of size bytes to the event's ip and port, over UDP by default or over a
+single TCP connection with protocol 'tcp', optionally paced to rate packets per second
+Event fields: ip, port, packets (default 1), size (default 1024), protocol, rate
+Returns the packets and bytes sent and the number of failed sends
+'''
+def lambda_handler(event: dict, context: LambdaContext) -> dict:
+    address = (event['ip'], int(event['port']))
+    packets = int(event.get('packets', 1))
+    size = min(int(event.get('size', 1024)), MAX_PACKET_SIZE)
+    rate = float(event.get('rate', 0))
+    payload = PAYLOAD[:size]
+
+    sent, errors = 0, 0
+    start = time.monotonic()
+    try:
+        if event.get('protocol', 'udp') == 'tcp':
+            sock = socket.create_connection(address, timeout=CONNECT_TIMEOUT)
+            send = sock.sendall
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            send = lambda data: sock.sendto(data, address)
+    except OSError:
+        return {'packets': 0, 'bytes': 0, 'errors': 1}
+
+    with sock:
+        for i in range(packets):
+            if rate > 0:
+                delay = start + i / rate - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            try:
+                send(payload)
+                sent += 1
+            except OSError:
+                errors += 1
+
+    return {'packets': sent, 'bytes': sent * size, 'errors': errors}
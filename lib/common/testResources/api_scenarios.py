@@ -0,0 +1,701 @@
+#Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License").
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  or in the "license" file accompanying this file. This file is distributed
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+#  express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+
+# Standard library and boto3 only: this module is also piped to the python of the
+# Debian host's tester virtualenv, where no other tester modules are present
+
+import os
+import ssl
+import sys
+import json
+import time
+import uuid
+import base64
+import socket
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlencode, urlparse
+import boto3
+import urllib3
+from botocore.auth import S3SigV4Auth, SigV4Auth
+from botocore.awsrequest import AWSRequest
+from botocore.config import Config
+
+
+# script variables the scenarios read, passed through the environment by the generated scripts
+SCRIPT_VARS = (
+    'REGION', 'ACCNT_ID', 'TEMP_ROLE_ARN', 'S3_BUCKET_NAME', 'EMPTY_BUCKET_NAME',
+    'ATTACK_BUCKET_NAME', 'CLOUD_TRAIL_NAME', 'EKS_CLUSTER_NAME', 'GD_RUN_ID', 'GD_EVENTS',
+)
+
+KALI_USER_AGENT = ('aws-cli/2.23.6 md/awscrt#1.0.0.dev0 ua/2.0 os/linux#6.12.13-cloud-amd64 md/arch#x86_64 '
+                   'lang/python#3.13.2 md/pyimpl#CPython cfg/retry-mode#standard md/installer#source '
+                   'md/distrib#kali.2025 md/prompt#off md/command#{command}')
+
+BLOCK_PUBLIC_ACCESS_OFF = {
+    'BlockPublicAcls': False,
+    'IgnorePublicAcls': False,
+    'BlockPublicPolicy': False,
+    'RestrictPublicBuckets': False,
+}
+
+'''
+TorSession routes requests through the local Tor daemon over one pooled HTTP session
+    - connections go through Tor's SOCKS port (name resolution included, socks5h) and are
+      kept alive and reused by all scenarios, so a circuit is built once, not per request
+    - SigV4 signing happens in-process with botocore's signers
+    - circuits only change when rotate is called: NEWNYM on the control port, then the
+      pooled connections are dropped so the next requests open new circuits (new exit)
+Needs requests with SOCKS support (PySocks), installed in the Debian host's tester virtualenv
+'''
+class TorSession:
+    SOCKS_PROXY = 'socks5h://127.0.0.1:9050'
+    CONTROL_PORT = ('127.0.0.1', 9051)
+    POOL_SIZE = 8
+    TIMEOUT = 60
+
+    def __init__(self, pool_size: int = POOL_SIZE) -> None:
+        # imported here, only the Tor scenarios (on the Debian host) need requests
+        import requests
+        self.requests = requests
+        self.pool_size = pool_size
+        self.lock = threading.Lock()
+        self.http = self.new_pool()
+        # the EKS API server is reached without verifying its certificate, as curl --insecure did
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+
+    def new_pool(self):
+        http = self.requests.Session()
+        adapter = self.requests.adapters.HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        http.mount('https://', adapter)
+        http.mount('http://', adapter)
+        http.proxies = {'http': self.SOCKS_PROXY, 'https': self.SOCKS_PROXY}
+        return http
+
+
+    '''
+    Asks Tor for new circuits and drops the pooled connections built on the old ones
+    Each control command is sent once the previous one was accepted (a 250 reply line)
+    '''
+    def rotate(self) -> None:
+        with socket.create_connection(self.CONTROL_PORT, timeout=10) as control:
+            replies = control.makefile('rb')
+            for command in ['AUTHENTICATE ""', 'SIGNAL NEWNYM']:
+                control.sendall(command.encode() + b'\r\n')
+                reply = replies.readline().decode(errors='replace').strip()
+                if not reply.startswith('250'):
+                    raise RuntimeError(f'Tor control port refused {command}: {reply or "connection closed"}')
+            control.sendall(b'QUIT\r\n')
+        with self.lock:
+            old, self.http = self.http, self.new_pool()
+        old.close()
+
+
+    def get(self, url: str, headers: Optional[dict] = None, verify: bool = True):
+        with self.lock:
+            http = self.http
+        return http.get(url, headers=headers, verify=verify, timeout=self.TIMEOUT)
+
+
+    '''
+    GET signed with SigV4 for the given service (S3 requests carry the payload hash as S3 expects)
+    '''
+    def signed_get(self, url: str, credentials, service: str, region: str):
+        request = AWSRequest(method='GET', url=url)
+        signer = S3SigV4Auth if service == 's3' else SigV4Auth
+        signer(credentials, service, region).add_auth(request)
+        return self.get(url, headers=dict(request.headers.items()))
+
+
+'''
+KubeClient calls the EKS cluster's API server directly, in place of aws eks update-kubeconfig and kubectl
+    - the endpoint and certificate authority come from one DescribeCluster call
+    - the bearer token is a GetCallerIdentity URL presigned with the shared session
+      (the format of aws eks get-token), made once per process
+    - all requests share one HTTPS connection pool to the API server
+'''
+class KubeClient:
+    TOKEN_PREFIX = 'k8s-aws-v1.'
+    TIMEOUT = 30
+    TOKEN_WAIT = 10
+
+    def __init__(self, session: boto3.session.Session, cluster: str, region: str, pool_size: int) -> None:
+        info = session.client('eks', region_name=region).describe_cluster(name=cluster)['cluster']
+        self.endpoint = info['endpoint']
+        self.ssl_context = ssl.create_default_context(cadata=base64.b64decode(info['certificateAuthority']['data']).decode())
+        self.token = self.presigned_token(session, cluster, region)
+        self.pool = urllib3.connection_from_url(self.endpoint, maxsize=pool_size, block=True,
+                                                ssl_context=self.ssl_context, timeout=self.TIMEOUT)
+
+
+    @classmethod
+    def presigned_token(cls, session: boto3.session.Session, cluster: str, region: str) -> str:
+        sts = session.client('sts', region_name=region, endpoint_url=f'https://sts.{region}.amazonaws.com')
+        # the cluster name is a signed header, so the token is only valid for this cluster
+        sts.meta.events.register('before-sign.sts.GetCallerIdentity',
+                                 lambda request, **kwargs: request.headers.__setitem__('x-k8s-aws-id', cluster))
+        url = sts.generate_presigned_url('get_caller_identity', ExpiresIn=60, HttpMethod='GET')
+        return cls.TOKEN_PREFIX + base64.urlsafe_b64encode(url.encode()).decode().rstrip('=')
+
+
+    '''
+    Returns the status and parsed body, anonymous requests carry no token (as curl without credentials)
+    '''
+    def request(self, method: str, path: str, body: Optional[dict] = None,
+                content_type: str = 'application/json', anonymous: bool = False) -> Tuple[int, dict]:
+        headers = {'Accept': 'application/json'}
+        if not anonymous:
+            headers['Authorization'] = f'Bearer {self.token}'
+        if body is not None:
+            headers['Content-Type'] = content_type
+        response = self.pool.request(method, path, body=None if body is None else json.dumps(body),
+                                     headers=headers, retries=False)
+        try:
+            data = json.loads(response.data) if response.data else {}
+        except ValueError:
+            data = {}
+        return response.status, data
+
+
+    def checked(self, method: str, path: str, body: Optional[dict] = None,
+                content_type: str = 'application/json') -> dict:
+        status, data = self.request(method, path, body, content_type)
+        if status >= 400:
+            raise RuntimeError(f"{method} {path}: {status} {data.get('message', '')}".strip())
+        return data
+
+
+    '''
+    kubectl apply: creates the object in the collection, or updates it when it already exists
+    '''
+    def apply(self, collection: str, manifest: dict) -> dict:
+        status, data = self.request('POST', collection, manifest)
+        if status == 409:
+            return self.checked('PATCH', f"{collection}/{manifest['metadata']['name']}", manifest,
+                                'application/merge-patch+json')
+        if status >= 400:
+            raise RuntimeError(f"POST {collection}: {status} {data.get('message', '')}".strip())
+        return data
+
+
+    '''
+    Token of a service account token secret, which the token controller fills in shortly after creation
+    '''
+    def secret_token(self, namespace: str, name: str) -> str:
+        for _ in range(self.TOKEN_WAIT):
+            token = self.checked('GET', f'/api/v1/namespaces/{namespace}/secrets/{name}').get('data', {}).get('token')
+            if token:
+                return base64.b64decode(token).decode()
+            time.sleep(1)
+        raise RuntimeError(f'secret {namespace}/{name} has no token')
+
+
+    '''
+    kubectl exec: runs the command in the pod over a websocket stream, its output is discarded
+    '''
+    def exec(self, namespace: str, pod: str, command: List[str]) -> None:
+        endpoint = urlparse(self.endpoint)
+        query = urlencode([('command', c) for c in command] + [('stdout', 'true'), ('stderr', 'true')])
+        upgrade = (
+            f'GET /api/v1/namespaces/{namespace}/pods/{pod}/exec?{query} HTTP/1.1\r\n'
+            f'Host: {endpoint.netloc}\r\n'
+            f'Authorization: Bearer {self.token}\r\n'
+            'Connection: Upgrade\r\n'
+            'Upgrade: websocket\r\n'
+            'Sec-WebSocket-Version: 13\r\n'
+            f'Sec-WebSocket-Key: {base64.b64encode(os.urandom(16)).decode()}\r\n'
+            'Sec-WebSocket-Protocol: v4.channel.k8s.io\r\n\r\n'
+        )
+        with socket.create_connection((endpoint.hostname, endpoint.port or 443), timeout=self.TIMEOUT) as raw:
+            with self.ssl_context.wrap_socket(raw, server_hostname=endpoint.hostname) as conn:
+                conn.sendall(upgrade.encode())
+                stream = conn.makefile('rb')
+                status = stream.readline().decode(errors='replace').strip()
+                if ' 101 ' not in f'{status} ':
+                    raise RuntimeError(f'exec in {namespace}/{pod}: {status}')
+                # the API server closes the stream when the command exits
+                try:
+                    while stream.read1(65536):
+                        pass
+                except socket.timeout:
+                    pass
+
+
+# scenario alias -> function(runtime), see scenario
+SCENARIOS: Dict[str, Callable[['ScenarioRuntime'], None]] = {}
+# scenario alias -> lane, see scenario
+LANES: Dict[str, str] = {}
+
+# the account and bucket block public access settings and the bucket policies they guard
+S3_PUBLIC_ACCESS = 's3-public-access'
+IAM_PASSWORD_POLICY = 'iam-password-policy'
+# the EKS scenarios share the cluster objects they create (default-token, anonymous bindings)
+EKS_CLUSTER = 'eks-cluster'
+
+
+'''
+Registers a scenario, scenarios of the same lane change the same account or cluster settings
+and run one after another in test number order (as the scripts did), a scenario without
+a lane runs in a lane of its own
+'''
+def scenario(alias: str, lane: Optional[str] = None):
+    def register(func: Callable[['ScenarioRuntime'], None]):
+        SCENARIOS[alias] = func
+        LANES[alias] = lane or alias
+        return func
+    return register
+
+
+'''
+Outcome of one scenario, error is the first error that ended it (None when it completed)
+'''
+class ScenarioResult(NamedTuple):
+    test: int
+    alias: str
+    error: Optional[str]
+    elapsed: float
+
+
+'''
+CredentialCache hands out sessions for assumed roles, each role and session name
+is assumed once per process and shared by every scenario that uses it
+The STS client comes from the runtime, which creates every client under its lock
+'''
+class CredentialCache:
+
+    def __init__(self, runtime: 'ScenarioRuntime') -> None:
+        self.runtime = runtime
+        self.lock = threading.Lock()
+        self.sessions = {}
+
+
+    def assumed(self, role_arn: str, session_name: str) -> boto3.session.Session:
+        key = (role_arn, session_name)
+        with self.lock:
+            if key not in self.sessions:
+                sts = self.runtime.client('sts')
+                creds = sts.assume_role(RoleArn=role_arn, RoleSessionName=session_name)['Credentials']
+                self.sessions[key] = boto3.session.Session(
+                    aws_access_key_id=creds['AccessKeyId'],
+                    aws_secret_access_key=creds['SecretAccessKey'],
+                    aws_session_token=creds['SessionToken'],
+                    region_name=self.runtime.session.region_name,
+                )
+            return self.sessions[key]
+
+
+'''
+ScenarioRuntime runs API only scenarios in one process instead of one aws CLI process per call
+    - one session and credential cache are shared by all scenarios
+    - clients are created once per session, service and user agent, all under one lock
+      as boto3 sessions are not thread safe
+    - the ambient (instance role) credentials are resolved and frozen once, up front
+    - a user agent given for a client replaces the whole User-Agent header, as the
+      --header option of awscurl did
+    - lanes of scenarios run concurrently on a small thread pool, the scenarios within a lane
+      and the calls within a scenario stay in order (see scenario)
+Each scenario records start/end events in the format of gd_event in the generated scripts
+'''
+class ScenarioRuntime:
+    CONCURRENCY = 4
+
+    def __init__(self, variables: Dict[str, str], space: str, concurrency: int = CONCURRENCY,
+                 fresh_tor_exit: bool = False) -> None:
+        self.vars = variables
+        self.space = space
+        self.concurrency = max(1, concurrency)
+        self.session = boto3.session.Session(region_name=variables.get('REGION') or None)
+        # frozen instance role credentials (fetched from IMDS on EC2) for the in-process signed requests
+        credentials = self.session.get_credentials()
+        self.instance_credentials = credentials.get_frozen_credentials() if credentials else None
+        self.credentials = CredentialCache(self)
+        self.lock = threading.Lock()
+        self.clients = {}
+        self.fresh_tor_exit = fresh_tor_exit
+        # the Tor session is created (and its circuits rotated) under its own lock,
+        # so the control port round trip does not hold up client creation
+        self.tor_lock = threading.Lock()
+        self.tor_session = None
+        self.kube_client = None
+
+
+    def client(self, service: str, session: Optional[boto3.session.Session] = None, user_agent: Optional[str] = None):
+        session = session or self.session
+        key = (id(session), service, user_agent)
+        with self.lock:
+            if key not in self.clients:
+                client = session.client(service, config=Config(retries={'mode': 'standard'}))
+                if user_agent:
+                    client.meta.events.register_first(f'before-send.{client.meta.service_model.service_id.hyphenize()}',
+                                                      lambda request, **kwargs: request.headers.__setitem__('User-Agent', user_agent))
+                self.clients[key] = client
+            return self.clients[key]
+
+
+    def assumed(self, session_name: str) -> boto3.session.Session:
+        return self.credentials.assumed(self.vars['TEMP_ROLE_ARN'], session_name)
+
+
+    '''
+    The Tor session shared by all Tor scenarios of the run, created on first use
+    (with new circuits first when the run asked for a fresh exit)
+    '''
+    def tor(self) -> TorSession:
+        with self.tor_lock:
+            if self.tor_session is None:
+                tor_session = TorSession(self.concurrency)
+                if self.fresh_tor_exit:
+                    tor_session.rotate()
+                self.tor_session = tor_session
+            return self.tor_session
+
+
+    '''
+    The EKS API client shared by all EKS scenarios of the run, created on first use
+    '''
+    def kube(self) -> KubeClient:
+        with self.lock:
+            if self.kube_client is None:
+                self.kube_client = KubeClient(self.session, self.vars['EKS_CLUSTER_NAME'], self.vars['REGION'], self.concurrency)
+            return self.kube_client
+
+
+    '''
+    Runs the lanes concurrently, each lane's scenarios in test number order,
+    and returns the results in the order the scenarios were given
+    '''
+    def run(self, scenarios: List[Tuple[int, str]]) -> List[ScenarioResult]:
+        lanes = {}
+        for test, alias in sorted(scenarios):
+            lanes.setdefault(LANES[alias], []).append((test, alias))
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            lane_results = pool.map(lambda lane: [self.run_scenario(*s) for s in lane], lanes.values())
+            results = {(r.test, r.alias): r for lane in lane_results for r in lane}
+        return [results[s] for s in scenarios]
+
+
+    def run_scenario(self, test: int, alias: str) -> ScenarioResult:
+        self.event(test, 'start', alias)
+        start = time.monotonic()
+        error = None
+        try:
+            SCENARIOS[alias](self)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        self.event(test, 'end', alias, 0 if error is None else 1)
+        return ScenarioResult(test, alias, error, time.monotonic() - start)
+
+
+    def event(self, test: int, event: str, alias: str, exit_code: Optional[int] = None) -> None:
+        with open('/proc/uptime') as f:
+            mono = float(f.read().split()[0])
+        line = json.dumps({
+            'run': self.vars.get('GD_RUN_ID', ''),
+            'test': test,
+            'space': self.space,
+            'event': event,
+            'scenario': alias,
+            'exit': exit_code,
+            'ts': time.time(),
+            'mono': mono,
+        }, separators=(',', ':'))
+        with self.lock:
+            if self.vars.get('GD_EVENTS'):
+                with open(self.vars['GD_EVENTS'], 'a') as f:
+                    f.write(line + '\n')
+            else:
+                print(f'GD_EVENT {line}', flush=True)
+
+
+'''
+Calls an API whose failure the scenario tolerates (the scripts' || true)
+'''
+def attempt(call: Callable, **kwargs) -> None:
+    try:
+        call(**kwargs)
+    except Exception:
+        pass
+
+
+@scenario('attack/S3CompromisedData.sh')
+def s3_compromised_data(rt: ScenarioRuntime) -> None:
+    session = rt.assumed('s3_compromised_data')
+    iam, s3 = rt.client('iam', session), rt.client('s3', session)
+    bucket = rt.vars['ATTACK_BUCKET_NAME']
+    attempt(iam.list_users)
+    attempt(iam.list_roles)
+    attempt(s3.list_buckets)
+    attempt(s3.list_objects, Bucket=bucket)
+    attempt(s3.put_object, Bucket=bucket, Key='RANSOM_NOTE.txt', Body=b'Test ransom note\n')
+    attempt(s3.delete_object, Bucket=bucket, Key='RANSOM_NOTE.txt')
+
+
+@scenario('iam/KaliLinux.sh')
+def iam_kali_linux(rt: ScenarioRuntime) -> None:
+    iam = rt.client('iam', rt.assumed('s3_pentest'), KALI_USER_AGENT.format(command='iam.get-user'))
+    attempt(iam.get_user)
+
+
+@scenario('s3/KaliLinux.sh')
+def s3_kali_linux(rt: ScenarioRuntime) -> None:
+    s3 = rt.client('s3', rt.assumed('s3_pentest'), KALI_USER_AGENT.format(command='s3api.list-objects'))
+    attempt(s3.list_objects, Bucket=rt.vars['S3_BUCKET_NAME'])
+
+
+@scenario('iam/ReconMaliciousIPCaller-Custom.sh')
+def recon_malicious_ip_caller(rt: ScenarioRuntime) -> None:
+    rt.client('s3').list_buckets()
+
+
+@scenario('iam/UnauthMaliciousIPCaller-Custom.sh')
+def unauth_malicious_ip_caller(rt: ScenarioRuntime) -> None:
+    rt.client('iam').get_user(UserName='admin')
+
+
+@scenario('s3/DiscoveryMaliciousIPCaller-Custom.sh')
+def s3_discovery_malicious_ip_caller(rt: ScenarioRuntime) -> None:
+    rt.client('s3').list_objects_v2(Bucket=rt.vars['S3_BUCKET_NAME'], Prefix='', Delimiter='/')
+
+
+@scenario('s3/UnauthMaliciousIPCaller-Custom.sh')
+def s3_unauth_malicious_ip_caller(rt: ScenarioRuntime) -> None:
+    s3 = rt.client('s3')
+    location = {'Bucket': rt.vars['S3_BUCKET_NAME'], 'Key': 'tester_script_custom_threat.txt'}
+    s3.head_object(**location)
+    s3.get_object(**location)['Body'].read()
+
+
+@scenario('iam/CloudTrailLoggingDisabled.sh')
+def cloudtrail_logging_disabled(rt: ScenarioRuntime) -> None:
+    rt.client('cloudtrail').stop_logging(Name=rt.vars['CLOUD_TRAIL_NAME'])
+
+
+@scenario('iam/PasswordPolicyChange.sh', IAM_PASSWORD_POLICY)
+def password_policy_change(rt: ScenarioRuntime) -> None:
+    rt.client('iam').update_account_password_policy(MinimumPasswordLength=6)
+
+
+@scenario('s3/AccountBlockPublicAccessDisabled.sh', S3_PUBLIC_ACCESS)
+def account_block_public_access_disabled(rt: ScenarioRuntime) -> None:
+    rt.client('s3control').put_public_access_block(AccountId=rt.vars['ACCNT_ID'], PublicAccessBlockConfiguration=BLOCK_PUBLIC_ACCESS_OFF)
+
+
+@scenario('s3/BucketBlockPublicAccessDisabled.sh', S3_PUBLIC_ACCESS)
+def bucket_block_public_access_disabled(rt: ScenarioRuntime) -> None:
+    rt.client('s3').put_public_access_block(Bucket=rt.vars['EMPTY_BUCKET_NAME'], PublicAccessBlockConfiguration=BLOCK_PUBLIC_ACCESS_OFF)
+
+
+def public_read_policy(bucket: str, principal, condition: Optional[dict] = None) -> str:
+    statement = {
+        'Sid': 'PublicReadGetObject',
+        'Effect': 'Allow',
+        'Principal': principal,
+        'Action': ['s3:GetObject'],
+        'Resource': [f'arn:aws:s3:::{bucket}/*'],
+    }
+    if condition:
+        statement['Condition'] = condition
+    return json.dumps({'Version': '2012-10-17', 'Statement': [statement]}, separators=(',', ':'))
+
+
+@scenario('s3/BucketPublicAccessGranted.sh', S3_PUBLIC_ACCESS)
+def bucket_public_access_granted(rt: ScenarioRuntime) -> None:
+    bucket = rt.vars['EMPTY_BUCKET_NAME']
+    policy = public_read_policy(bucket, {'AWS': '*'}, {'StringLike': {'aws:PrincipalArn': 'arn:aws:iam::*'}})
+    rt.client('s3').put_bucket_policy(Bucket=bucket, Policy=policy)
+
+
+@scenario('s3/BucketAnonymousAccessGranted.sh', S3_PUBLIC_ACCESS)
+def bucket_anonymous_access_granted(rt: ScenarioRuntime) -> None:
+    bucket = rt.vars['EMPTY_BUCKET_NAME']
+    rt.client('s3').put_bucket_policy(Bucket=bucket, Policy=public_read_policy(bucket, '*'))
+
+
+@scenario('s3/ServerAccessLoggingDisabled.sh')
+def server_access_logging_disabled(rt: ScenarioRuntime) -> None:
+    rt.client('s3').put_bucket_logging(Bucket=rt.vars['S3_BUCKET_NAME'], BucketLoggingStatus={})
+
+
+def s3_url(rt: ScenarioRuntime, path: str = '') -> str:
+    region = rt.vars['REGION']
+    host = 's3.amazonaws.com' if region == 'us-east-1' else f's3.{region}.amazonaws.com'
+    return f"https://{rt.vars['S3_BUCKET_NAME']}.{host}/{path}"
+
+
+@scenario('iam/ReconTorIPCaller.sh')
+def recon_tor_ip_caller(rt: ScenarioRuntime) -> None:
+    region = rt.vars['REGION']
+    rt.tor().signed_get(f'https://s3.{region}.amazonaws.com', rt.instance_credentials, 's3', region)
+
+
+@scenario('s3/DiscoveryTorIPCaller.sh')
+def s3_discovery_tor_ip_caller(rt: ScenarioRuntime) -> None:
+    rt.tor().signed_get(s3_url(rt), rt.instance_credentials, 's3', rt.vars['REGION'])
+
+
+@scenario('s3/UnauthTorIPCaller.sh')
+def s3_unauth_tor_ip_caller(rt: ScenarioRuntime) -> None:
+    rt.tor().signed_get(s3_url(rt, 'py_tester/script_tail.sh'), rt.instance_credentials, 's3', rt.vars['REGION'])
+
+
+DEFAULT_TOKEN_SECRET = {
+    'apiVersion': 'v1',
+    'kind': 'Secret',
+    'metadata': {'name': 'default-token', 'annotations': {'kubernetes.io/service-account.name': 'default'}},
+    'type': 'kubernetes.io/service-account-token',
+}
+
+
+def deployment(name: str, image: str, security_context: dict, volumes: Optional[dict] = None) -> dict:
+    container = {
+        'name': name,
+        'image': image,
+        'ports': [{'containerPort': 22}],
+        'securityContext': security_context,
+    }
+    pod_spec = {'containers': [container]}
+    if volumes:
+        container['volumeMounts'] = [{'mountPath': path, 'name': volume} for volume, (path, _) in volumes.items()]
+        pod_spec['volumes'] = [{'name': volume, 'hostPath': host_path} for volume, (_, host_path) in volumes.items()]
+    return {
+        'apiVersion': 'apps/v1',
+        'kind': 'Deployment',
+        'metadata': {'name': name},
+        'spec': {
+            'selector': {'matchLabels': {'app': name}},
+            'replicas': 1,
+            'template': {'metadata': {'labels': {'app': name}}, 'spec': pod_spec},
+        },
+    }
+
+
+@scenario('eks/AdminAccessToDefaultServiceAccount.sh', EKS_CLUSTER)
+def eks_admin_access_to_default_service_account(rt: ScenarioRuntime) -> None:
+    rt.kube().checked('PATCH', '/apis/rbac.authorization.k8s.io/v1/clusterrolebindings/cluster-admin',
+                      {'subjects': [{'kind': 'ServiceAccount', 'name': 'default', 'namespace': 'default'}]},
+                      'application/strategic-merge-patch+json')
+
+
+@scenario('eks/AnonymousAccessGranted.sh', EKS_CLUSTER)
+def eks_anonymous_access_granted(rt: ScenarioRuntime) -> None:
+    rt.kube().apply('/apis/rbac.authorization.k8s.io/v1/clusterrolebindings', {
+        'apiVersion': 'rbac.authorization.k8s.io/v1',
+        'kind': 'ClusterRoleBinding',
+        'metadata': {'name': 'anonymous-binding'},
+        'roleRef': {'apiGroup': 'rbac.authorization.k8s.io', 'kind': 'ClusterRole', 'name': 'anonymous-role'},
+        'subjects': [{'apiGroup': 'rbac.authorization.k8s.io', 'kind': 'User', 'name': 'system:anonymous'}],
+    })
+
+
+@scenario('eks/ContainerWithSensitiveMount.sh', EKS_CLUSTER)
+def eks_container_with_sensitive_mount(rt: ScenarioRuntime) -> None:
+    rt.kube().apply('/apis/apps/v1/namespaces/default/deployments', deployment(
+        'mount', 'GuardDutyTestContainerSensitiveMount', {'privileged': False},
+        {'test-volume': ('/test-pd', {'path': '/etc', 'type': 'Directory'})},
+    ))
+
+
+@scenario('eks/PrivilegedContainer.sh', EKS_CLUSTER)
+def eks_privileged_container(rt: ScenarioRuntime) -> None:
+    rt.kube().apply('/apis/apps/v1/namespaces/default/deployments', deployment(
+        'privileged', 'GuardDutyTestPrivilegedContainer',
+        {'privileged': True, 'capabilities': {'add': ['SYS_ADMIN', 'SYS_PTRACE']}},
+    ))
+
+
+@scenario('eks/ExecInKubeSystemPod.sh', EKS_CLUSTER)
+def eks_exec_in_kube_system_pod(rt: ScenarioRuntime) -> None:
+    kube = rt.kube()
+    pods = kube.checked('GET', '/api/v1/namespaces/kube-system/pods')['items']
+    pod = next(p['metadata']['name'] for p in pods if p['metadata']['name'].startswith('kube-proxy'))
+    # the script tolerated the command's failure (|| true), only the exec request matters
+    attempt(kube.exec, namespace='kube-system', pod=pod, command=['kube-proxy', '-h'])
+
+
+@scenario('eks/SuccessfulAnonymousAccess.sh', EKS_CLUSTER)
+def eks_successful_anonymous_access(rt: ScenarioRuntime) -> None:
+    kube = rt.kube()
+    kube.apply('/apis/rbac.authorization.k8s.io/v1/namespaces/default/roles', {
+        'apiVersion': 'rbac.authorization.k8s.io/v1',
+        'kind': 'Role',
+        'metadata': {'namespace': 'default', 'name': 'pod-reader'},
+        'rules': [{'apiGroups': [''], 'resources': ['pods'], 'verbs': ['get', 'list', 'watch']}],
+    })
+    kube.apply('/apis/rbac.authorization.k8s.io/v1/namespaces/default/rolebindings', {
+        'apiVersion': 'rbac.authorization.k8s.io/v1',
+        'kind': 'RoleBinding',
+        'metadata': {'name': 'anonymous-pod-reader', 'namespace': 'default'},
+        'subjects': [{'kind': 'User', 'name': 'system:anonymous', 'apiGroup': 'rbac.authorization.k8s.io'}],
+        'roleRef': {'kind': 'Role', 'name': 'pod-reader', 'apiGroup': 'rbac.authorization.k8s.io'},
+    })
+    kube.request('GET', '/api/v1/namespaces/default/pods/', anonymous=True)
+
+
+@scenario('eks/DiscoveryMaliciousIPCaller-Custom.sh', EKS_CLUSTER)
+def eks_discovery_malicious_ip_caller(rt: ScenarioRuntime) -> None:
+    rt.kube().apply('/api/v1/namespaces/default/secrets', DEFAULT_TOKEN_SECRET)
+
+
+@scenario('eks/ImpactMaliciousIPCaller-Custom.sh', EKS_CLUSTER)
+def eks_impact_malicious_ip_caller(rt: ScenarioRuntime) -> None:
+    # a UUID avoids collision with existing service account names
+    rt.kube().checked('POST', '/api/v1/namespaces/default/serviceaccounts', {
+        'apiVersion': 'v1',
+        'kind': 'ServiceAccount',
+        'metadata': {'name': f'tester-service-account-{uuid.uuid4()}'},
+    })
+
+
+@scenario('eks/TorIPCaller.sh', EKS_CLUSTER)
+def eks_tor_ip_caller(rt: ScenarioRuntime) -> None:
+    kube = rt.kube()
+    kube.apply('/api/v1/namespaces/default/secrets', DEFAULT_TOKEN_SECRET)
+    token = kube.secret_token('default', 'default-token')
+    rt.tor().get(f'{kube.endpoint}/api', headers={'Authorization': f'Bearer {token}'}, verify=False)
+
+
+def print_results(results: List[ScenarioResult]) -> None:
+    for r in results:
+        outcome = 'completed' if r.error is None else f'failed: {r.error}'
+        print(f'Test #{r.test} {r.alias} {outcome} ({r.elapsed:.1f}s)')
+    sys.stdout.flush()
+
+
+'''
+Runs the given API only scenarios (TEST:ALIAS, ex. 3:iam/KaliLinux.sh) in this process,
+the script variables they use are read from the environment (SCRIPT_VARS)
+Exits non zero if any scenario failed
+'''
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='In-process runtime for API only scenarios')
+    parser.add_argument('scenarios', nargs='+', help='Scenarios to run as TEST:ALIAS')
+    parser.add_argument('--space', type=str, default='host', help='Execution space reported in the scenario events. Default: host')
+    parser.add_argument('--concurrency', type=int, default=ScenarioRuntime.CONCURRENCY, help='Lanes of scenarios run at once. Default: 4')
+    parser.add_argument('--fresh-tor-exit', action='store_true', help='Switch to new Tor circuits before the first Tor scenario')
+    args = parser.parse_args()
+
+    scenarios = []
+    for arg in args.scenarios:
+        test, _, alias = arg.partition(':')
+        if alias not in SCENARIOS:
+            parser.error(f'unknown scenario {alias}')
+        scenarios.append((int(test), alias))
+
+    runtime = ScenarioRuntime({v: os.environ.get(v, '') for v in SCRIPT_VARS}, args.space, args.concurrency, args.fresh_tor_exit)
+    results = runtime.run(scenarios)
+    print_results(results)
+    sys.exit(1 if any(r.error for r in results) else 0)
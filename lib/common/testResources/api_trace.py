@@ -0,0 +1,226 @@
+#Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License").
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  or in the "license" file accompanying this file. This file is distributed
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+#  express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+
+import os
+import json
+import time
+import threading
+from typing import Dict, List, NamedTuple, Optional
+
+
+# error codes botocore's retry handler treats as throttling
+THROTTLING_CODES = {
+    'Throttling', 'ThrottlingException', 'ThrottledException', 'RequestThrottledException',
+    'TooManyRequestsException', 'ProvisionedThroughputExceededException', 'TransactionInProgressException',
+    'RequestLimitExceeded', 'BandwidthLimitExceeded', 'LimitExceededException', 'RequestThrottled',
+    'SlowDown', 'PriorRequestNotComplete', 'EC2ThrottledException',
+}
+
+# upper bounds (seconds) of the latency histogram buckets, the last bucket is open ended
+BUCKETS = [0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0]
+
+
+'''
+One AWS API call as seen by the client, start is relative to the start of tracing
+retries and throttles count the extra attempts botocore made and how many of the
+attempts were throttled, error is the final error code (None on success)
+'''
+class ApiSpan(NamedTuple):
+    service: str
+    operation: str
+    start: float
+    latency: float
+    retries: int
+    throttles: int
+    request_bytes: Optional[int]
+    response_bytes: Optional[int]
+    status: Optional[int]
+    error: Optional[str]
+    thread: int
+
+
+def body_size(body) -> Optional[int]:
+    if body is None:
+        return 0
+    if isinstance(body, (bytes, bytearray, str)):
+        return len(body)
+    # file like bodies (ex. S3 uploads) are sized without reading them
+    try:
+        position = body.tell()
+        size = body.seek(0, os.SEEK_END) - position
+        body.seek(position)
+        return size
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def error_code(response) -> Optional[str]:
+    if isinstance(response, dict):
+        return response.get('Error', {}).get('Code')
+    return None
+
+
+'''
+ApiTracer records every API call of the clients it instruments through botocore's events
+    - before-call starts a span in the call's request context
+    - needs-retry counts attempts and throttling errors of the call
+    - after-call (or after-call-error when the call raised) ends the span
+Spans are written as Chrome trace event JSON (chrome://tracing, Perfetto) by finish,
+which also prints a latency histogram per operation
+'''
+class ApiTracer:
+    CONTEXT_KEY = 'gd_trace'
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.origin = time.monotonic()
+        self.lock = threading.Lock()
+        self.spans: List[ApiSpan] = []
+
+
+    '''
+    Registers the tracer's handlers on a client, each client is instrumented once
+    '''
+    def instrument(self, client) -> None:
+        events = client.meta.events
+        service = client.meta.service_model.service_id.hyphenize()
+        events.register(f'before-call.{service}', self.before_call, unique_id=f'gd-trace-before-{service}')
+        events.register(f'needs-retry.{service}', self.needs_retry, unique_id=f'gd-trace-retry-{service}')
+        events.register(f'after-call.{service}', self.after_call, unique_id=f'gd-trace-after-{service}')
+        events.register(f'after-call-error.{service}', self.after_call_error, unique_id=f'gd-trace-error-{service}')
+
+
+    def before_call(self, model, params, context, **kwargs) -> None:
+        context[self.CONTEXT_KEY] = {
+            'service': model.service_model.service_id.hyphenize(),
+            'operation': model.name,
+            'start': time.monotonic(),
+            'attempts': 1,
+            'throttles': 0,
+            'request_bytes': body_size(params.get('body')),
+        }
+
+
+    def needs_retry(self, response=None, attempts=1, request_dict=None, **kwargs) -> None:
+        span = (request_dict or {}).get('context', {}).get(self.CONTEXT_KEY)
+        if span is None:
+            return
+        span['attempts'] = max(span['attempts'], attempts)
+        if response is not None and error_code(response[1]) in THROTTLING_CODES:
+            span['throttles'] += 1
+
+
+    def after_call(self, http_response, parsed, context, **kwargs) -> None:
+        length = http_response.headers.get('content-length') if http_response is not None else None
+        self.end_span(
+            context,
+            int(length) if length is not None else None,
+            http_response.status_code if http_response is not None else None,
+            error_code(parsed),
+            parsed.get('ResponseMetadata', {}).get('RetryAttempts') if isinstance(parsed, dict) else None,
+        )
+
+
+    def after_call_error(self, context, exception, **kwargs) -> None:
+        self.end_span(context, None, None, type(exception).__name__, None)
+
+
+    def end_span(self, context: dict, response_bytes: Optional[int], status: Optional[int],
+                 error: Optional[str], retries: Optional[int]) -> None:
+        span = context.pop(self.CONTEXT_KEY, None)
+        if span is None:
+            return
+        now = time.monotonic()
+        if retries is None:
+            retries = span['attempts'] - 1
+        record = ApiSpan(
+            span['service'],
+            span['operation'],
+            span['start'] - self.origin,
+            now - span['start'],
+            retries,
+            span['throttles'],
+            span['request_bytes'],
+            response_bytes,
+            status,
+            error,
+            threading.get_ident(),
+        )
+        with self.lock:
+            self.spans.append(record)
+
+
+    '''
+    Writes the trace file and prints the histogram, called once at exit
+    '''
+    def finish(self) -> None:
+        with self.lock:
+            spans = list(self.spans)
+        if not spans:
+            return
+        self.write_trace(spans)
+        print_histogram(spans)
+        print(f'API trace of {len(spans)} calls written to {self.path}')
+
+
+    def write_trace(self, spans: List[ApiSpan]) -> None:
+        pid = os.getpid()
+        events = [{
+            'name': f'{s.service}.{s.operation}',
+            'cat': s.service,
+            'ph': 'X',
+            'ts': round(s.start * 1e6),
+            'dur': round(s.latency * 1e6),
+            'pid': pid,
+            'tid': s.thread,
+            'args': {
+                'retries': s.retries,
+                'throttles': s.throttles,
+                'request_bytes': s.request_bytes,
+                'response_bytes': s.response_bytes,
+                'status': s.status,
+                'error': s.error,
+            },
+        } for s in spans]
+        with open(self.path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+'''
+Prints one row per operation: call count, latency percentiles, retries, throttles,
+total time and the number of calls in each latency bucket, slowest total time first
+'''
+def print_histogram(spans: List[ApiSpan]) -> None:
+    operations: Dict[str, List[ApiSpan]] = {}
+    for s in spans:
+        operations.setdefault(f'{s.service}.{s.operation}', []).append(s)
+
+    width = max(len(name) for name in operations) + 2
+    labels = [f'<{b * 1000:g}ms' if b < 1 else f'<{b:g}s' for b in BUCKETS] + [f'>={BUCKETS[-1]:g}s']
+    print(f'{"Operation":<{width}}{"Calls":>6}{"p50":>8}{"p90":>8}{"max":>8}{"Total":>8}{"Retry":>6}{"Thr":>5}  '
+          + ''.join(f'{label:>7}' for label in labels))
+
+    for name, calls in sorted(operations.items(), key=lambda o: -sum(s.latency for s in o[1])):
+        latencies = [s.latency for s in calls]
+        counts = [0] * (len(BUCKETS) + 1)
+        for latency in latencies:
+            counts[next((i for i, b in enumerate(BUCKETS) if latency < b), len(BUCKETS))] += 1
+        print(f'{name:<{width}}{len(calls):>6}'
+              f'{percentile(latencies, 0.5):>7.2f}s{percentile(latencies, 0.9):>7.2f}s{max(latencies):>7.2f}s'
+              f'{sum(latencies):>7.1f}s{sum(s.retries for s in calls):>6}{sum(s.throttles for s in calls):>5}  '
+              + ''.join(f'{c or "":>7}' for c in counts))
@@ -0,0 +1,156 @@
+#Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License").
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  or in the "license" file accompanying this file. This file is distributed
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+#  express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+
+import threading
+from typing import Callable, Optional
+import boto3
+import botocore.session
+from botocore.config import Config
+from botocore.credentials import CredentialProvider, DeferredRefreshableCredentials
+import tester_vars as vars
+
+
+'''
+Credential provider of an assumed role, the credentials are fetched on first use
+and refreshed by botocore (with the given fetch function) before they expire
+'''
+class AssumedRoleProvider(CredentialProvider):
+    METHOD = 'sts-assume-role'
+    CANONICAL_NAME = 'gd-tester-assume-role'
+
+    def __init__(self, fetch: Callable[[], dict]) -> None:
+        self.fetch = fetch
+
+
+    def load(self) -> DeferredRefreshableCredentials:
+        return DeferredRefreshableCredentials(self.fetch, self.METHOD)
+
+
+'''
+ClientRegistry creates AWS clients lazily on first use and hands out the same
+client afterwards. All clients come from one session (one credential
+resolution) and use TCP keep-alive with a connection pool sized for the
+tester's thread pools. Clients are safe to share between threads, creating
+them is not, so creation happens under a lock
+Clients default to the tester region, other regions can be requested explicitly
+A registry given a role ARN creates its clients with that role's credentials,
+assumed on first use and refreshed by botocore before they expire
+While an API tracer is set (see trace) every client is instrumented by it
+'''
+class ClientRegistry:
+    MAX_POOL_CONNECTIONS = 32
+    ROLE_SESSION_NAME = 'GuardDutyTester'
+
+    def __init__(self, region: str = vars.REGION, max_pool_connections: int = MAX_POOL_CONNECTIONS,
+                 role_arn: Optional[str] = None) -> None:
+        self.region = region
+        self.max_pool_connections = max_pool_connections
+        self.role_arn = role_arn
+        self.lock = threading.Lock()
+        self.session = None
+        self.clients = {}
+
+
+    '''
+    Returns the client for the given service (and region), creating it on first use
+    '''
+    def client(self, service: str, region: Optional[str] = None):
+        key = (service, region or self.region)
+        if key in self.clients:
+            return self.clients[key]
+
+        with self.lock:
+            if key not in self.clients:
+                if self.session is None:
+                    self.session = self.new_session()
+                config = Config(max_pool_connections=self.max_pool_connections, tcp_keepalive=True)
+                self.clients[key] = self.session.client(service, region_name=key[1], config=config)
+                if tracer:
+                    tracer.instrument(self.clients[key])
+            return self.clients[key]
+
+
+    '''
+    Session with the ambient credentials, or refreshable credentials of the registry's role
+    '''
+    def new_session(self) -> boto3.session.Session:
+        if not self.role_arn:
+            return boto3.session.Session(region_name=self.region)
+
+        # the role's provider is asked first, ahead of the environment and the instance profile
+        core_session = botocore.session.get_session()
+        core_session.get_component('credential_provider').insert_before('env', AssumedRoleProvider(self.assume_role))
+        return boto3.session.Session(botocore_session=core_session, region_name=self.region)
+
+
+    '''
+    Assumes the registry's role with the process wide (ambient) credentials
+    '''
+    def assume_role(self) -> dict:
+        creds = registry.client('sts').assume_role(RoleArn=self.role_arn, RoleSessionName=self.ROLE_SESSION_NAME)['Credentials']
+        return {
+            'access_key': creds['AccessKeyId'],
+            'secret_key': creds['SecretAccessKey'],
+            'token': creds['SessionToken'],
+            'expiry_time': creds['Expiration'].isoformat(),
+        }
+
+
+    '''
+    Sets the connection pool size of clients created from now on
+    '''
+    def configure(self, max_pool_connections: int) -> None:
+        with self.lock:
+            self.max_pool_connections = max_pool_connections
+
+
+'''
+process wide registry used by the tester modules
+and registries of assumed roles, keyed by role ARN
+'''
+registry = ClientRegistry()
+role_registries = {}
+role_registries_lock = threading.Lock()
+tracer = None
+
+
+def client(service: str, region: Optional[str] = None):
+    return registry.client(service, region)
+
+
+'''
+Returns the registry of clients using the given role's credentials
+'''
+def for_role(role_arn: str) -> ClientRegistry:
+    with role_registries_lock:
+        if role_arn not in role_registries:
+            role_registries[role_arn] = ClientRegistry(registry.region, registry.max_pool_connections, role_arn)
+        return role_registries[role_arn]
+
+
+def configure(max_pool_connections: int) -> None:
+    registry.configure(max_pool_connections)
+
+
+'''
+Instruments the clients of all registries with the given API tracer (api_trace.ApiTracer),
+clients that already exist as well as the ones created afterwards
+'''
+def trace(api_tracer) -> None:
+    global tracer
+    with role_registries_lock:
+        tracer = api_tracer
+        for r in [registry, *role_registries.values()]:
+            with r.lock:
+                for c in r.clients.values():
+                    api_tracer.instrument(c)
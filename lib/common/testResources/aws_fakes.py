@@ -0,0 +1,302 @@
+#Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License").
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  or in the "license" file accompanying this file. This file is distributed
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+#  express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+
+import sys
+import copy
+import time
+import types
+import threading
+from collections import Counter
+from typing import Optional
+from botocore.exceptions import ClientError
+
+
+'''
+Values of the deployed tester_vars.py (written by the driver host user data),
+used when the module is not present, ex. when benchmarking away from the driver host
+'''
+FAKE_VARS = {
+    'LINUX_IP': '10.0.0.10',
+    'WINDOWS_IP': '10.0.0.11',
+    'RED_TEAM_INSTANCE': 'i-0000000000000000a',
+    'RED_TEAM_IP': '172.16.0.10',
+    'LINUX_INSTANCE': 'i-0000000000000000b',
+    'WINDOWS_INSTANCE': 'i-0000000000000000c',
+    'S3_BUCKET_NAME': 'gd-tester-bucket',
+    'EMPTY_BUCKET_NAME': 'gd-tester-empty-bucket',
+    'ATTACK_BUCKET_NAME': 'gd-tester-attack-bucket',
+    'TEMP_ROLE_ARN': 'arn:aws:iam::111122223333:role/GuardDutyTesterTempRole',
+    'REGION': 'us-east-1',
+    'ACCNT_ID': '111122223333',
+    'CLOUD_TRAIL_NAME': 'gd-tester-trail',
+    'EKS_CLUSTER_NAME': 'gd-tester-eks',
+    'MALICIOUS_IP': '198.51.100.1',
+    'LAMBDA_NAME': 'gd-tester-lambda',
+    'ROLE_NAME': 'GuardDutyTesterDebianRole',
+    'CLUSTER': 'gd-tester-ecs',
+    'CONTAINER': 'amazon-linux',
+    'STEP_FUNCTION': 'arn:aws:states:us-east-1:111122223333:stateMachine:gd-tester-settings',
+    'TASK_ROLE_ARN': 'arn:aws:iam::111122223333:role/GuardDutyTesterTaskRole',
+    'TASK_EXEC_ROLE_ARN': 'arn:aws:iam::111122223333:role/GuardDutyTesterTaskExecRole',
+    'EC2_TASK_FAM': 'gd-tester-ec2-task',
+    'FARGATE_TASK_FAM': 'gd-tester-fargate-task',
+    'SUBNETS': ['subnet-00000000000000001'],
+    'SEC_GROUP': ['sg-00000000000000001'],
+}
+
+# detector features and the additional configuration GuardDuty reports for them
+DETECTOR_FEATURES = {
+    'CLOUD_TRAIL': [],
+    'DNS_LOGS': [],
+    'FLOW_LOGS': [],
+    'S3_DATA_EVENTS': [],
+    'EKS_AUDIT_LOGS': [],
+    'EBS_MALWARE_PROTECTION': [],
+    'RDS_LOGIN_EVENTS': [],
+    'LAMBDA_NETWORK_LOGS': [],
+    'RUNTIME_MONITORING': ['EKS_ADDON_MANAGEMENT', 'ECS_FARGATE_AGENT_MANAGEMENT', 'EC2_AGENT_MANAGEMENT'],
+}
+
+
+'''
+Registers the stand-in tester_vars module unless the deployed one can be imported
+'''
+def install_vars() -> None:
+    try:
+        import tester_vars
+    except ImportError:
+        module = types.ModuleType('tester_vars')
+        module.__dict__.update(copy.deepcopy(FAKE_VARS))
+        sys.modules['tester_vars'] = module
+
+
+'''
+Modeled client errors, one ClientError subclass per error code so both
+client.exceptions.<Code> and ClientError handlers catch them as they would the real error
+'''
+class FakeExceptions:
+
+    def __init__(self) -> None:
+        self.classes = {}
+
+
+    def __getattr__(self, code: str) -> type:
+        if code.startswith('__'):
+            raise AttributeError(code)
+        if code not in self.classes:
+            self.classes[code] = type(code, (ClientError,), {})
+        return self.classes[code]
+
+
+    def error(self, code: str, operation: str) -> ClientError:
+        return getattr(self, code)({'Error': {'Code': code, 'Message': f'{code} (local stand-in)'}}, operation)
+
+
+'''
+FakeAccount holds the state of one account and region as the tester sees it and
+answers the API calls the tester makes against GuardDuty, IAM, S3, S3 Control,
+ECS, EKS, Step Functions and STS. Handlers are the methods named <service>_<operation>
+Every call is counted per service.operation, latency seconds are slept per call
+to stand in for the network round trip
+'''
+class FakeAccount:
+
+    def __init__(self, features_enabled: bool = False, pwd_policy: Optional[dict] = None,
+                 pub_block: Optional[dict] = None, addon_status: Optional[str] = 'ACTIVE',
+                 task_revisions: int = 0, latency: float = 0.0) -> None:
+        status = 'ENABLED' if features_enabled else 'DISABLED'
+        self.detector = {
+            'Status': 'ENABLED',
+            'ServiceRole': 'arn:aws:iam::111122223333:role/aws-service-role/guardduty.amazonaws.com/AWSServiceRoleForAmazonGuardDuty',
+            'Features': [{
+                'Name': name,
+                'Status': status,
+                'UpdatedAt': '2024-01-01T00:00:00Z',
+                **({'AdditionalConfiguration': [{'Name': c, 'Status': status, 'UpdatedAt': '2024-01-01T00:00:00Z'} for c in config]} if config else {}),
+            } for name, config in DETECTOR_FEATURES.items()],
+        }
+        self.pwd_policy = pwd_policy
+        self.pub_block = pub_block
+        self.addon_status = addon_status
+        self.task_definitions = [
+            {'taskDefinitionArn': f'arn:aws:ecs:us-east-1:111122223333:task-definition/family:{i}', 'tags': []}
+            for i in range(task_revisions)
+        ]
+        self.executions = []
+        self.uploads = []
+        self.latency = latency
+        self.exceptions = FakeExceptions()
+        self.calls = Counter()
+        self.lock = threading.Lock()
+
+
+    def call(self, service: str, operation: str, *args, **kwargs):
+        handler = getattr(self, f"{service.replace('-', '')}_{operation}", None)
+        if handler is None:
+            raise NotImplementedError(f'{service}.{operation} has no local stand-in')
+        with self.lock:
+            self.calls[f'{service}.{operation}'] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return handler(*args, **kwargs)
+
+
+    # GuardDuty
+
+    def guardduty_list_detectors(self, **kwargs) -> dict:
+        return {'DetectorIds': ['fakedetector']}
+
+    def guardduty_get_detector(self, DetectorId: str) -> dict:
+        with self.lock:
+            return {**copy.deepcopy(self.detector), 'ResponseMetadata': {'HTTPStatusCode': 200}}
+
+    def guardduty_update_detector(self, DetectorId: str, Features: list = (), **kwargs) -> dict:
+        with self.lock:
+            for update in Features:
+                feature = next(f for f in self.detector['Features'] if f['Name'] == update['Name'])
+                feature['Status'] = update['Status']
+                for config in update.get('AdditionalConfiguration', []):
+                    next(c for c in feature['AdditionalConfiguration'] if c['Name'] == config['Name'])['Status'] = config['Status']
+        return {}
+
+    def guardduty_create_threat_intel_set(self, **kwargs) -> dict:
+        return {'ThreatIntelSetId': 'fakethreatintelset'}
+
+    def guardduty_list_coverage(self, **kwargs) -> dict:
+        return {'Resources': [{'CoverageStatus': 'HEALTHY'}]}
+
+
+    # IAM
+
+    def iam_get_account_password_policy(self) -> dict:
+        if self.pwd_policy is None:
+            raise self.exceptions.error('NoSuchEntityException', 'GetAccountPasswordPolicy')
+        return {'PasswordPolicy': dict(self.pwd_policy)}
+
+    def iam_update_account_password_policy(self, **policy) -> dict:
+        self.pwd_policy = policy
+        return {}
+
+    def iam_delete_account_password_policy(self) -> dict:
+        self.pwd_policy = None
+        return {}
+
+
+    # S3 and S3 Control
+
+    def s3_upload_file(self, filename: str, bucket: str, key: str, **kwargs) -> None:
+        with self.lock:
+            self.uploads.append((bucket, key))
+
+    def s3control_get_public_access_block(self, AccountId: str) -> dict:
+        if self.pub_block is None:
+            raise self.exceptions.error('NoSuchPublicAccessBlockConfiguration', 'GetPublicAccessBlock')
+        return {'PublicAccessBlockConfiguration': dict(self.pub_block)}
+
+    def s3control_put_public_access_block(self, AccountId: str, PublicAccessBlockConfiguration: dict) -> dict:
+        self.pub_block = PublicAccessBlockConfiguration
+        return {}
+
+
+    # ECS
+
+    def ecs_list_task_definitions(self, maxResults: int = 100, **kwargs) -> dict:
+        with self.lock:
+            return {'taskDefinitionArns': [t['taskDefinitionArn'] for t in reversed(self.task_definitions)][:maxResults]}
+
+    def ecs_describe_task_definition(self, taskDefinition: str, **kwargs) -> dict:
+        with self.lock:
+            task = next(t for t in self.task_definitions if t['taskDefinitionArn'] == taskDefinition)
+            return {'taskDefinition': {'taskDefinitionArn': taskDefinition}, 'tags': list(task['tags'])}
+
+    def ecs_register_task_definition(self, family: str, tags: list = (), **kwargs) -> dict:
+        with self.lock:
+            arn = f'arn:aws:ecs:us-east-1:111122223333:task-definition/{family}:{len(self.task_definitions) + 1}'
+            self.task_definitions.append({'taskDefinitionArn': arn, 'tags': list(tags)})
+        return {'taskDefinition': {'taskDefinitionArn': arn}}
+
+    def ecs_run_task(self, **kwargs) -> dict:
+        return {'tasks': [{'taskArn': 'arn:aws:ecs:us-east-1:111122223333:task/fake'}], 'failures': []}
+
+
+    # EKS
+
+    def eks_describe_addon(self, clusterName: str, addonName: str) -> dict:
+        if self.addon_status is None:
+            raise self.exceptions.error('ResourceNotFoundException', 'DescribeAddon')
+        return {'addon': {'addonName': addonName, 'status': self.addon_status}}
+
+    def eks_create_addon(self, **kwargs) -> dict:
+        self.addon_status = 'ACTIVE'
+        return {'addon': {'status': 'CREATING'}}
+
+
+    # Step Functions and STS
+
+    def stepfunctions_start_execution(self, stateMachineArn: str, input: str) -> dict:
+        with self.lock:
+            self.executions.append(input)
+        return {'executionArn': f'{stateMachineArn}:fake{len(self.executions)}'}
+
+    def sts_get_caller_identity(self) -> dict:
+        return {'Account': '111122223333', 'Arn': 'arn:aws:iam::111122223333:user/fake'}
+
+
+class FakePaginator:
+
+    def __init__(self, client: 'FakeClient', operation: str) -> None:
+        self.client = client
+        self.operation = operation
+
+
+    def paginate(self, **kwargs):
+        # every stand-in answers in a single page
+        yield self.client.account.call(self.client.service, self.operation, **kwargs)
+
+
+'''
+Client of one service, operations are dispatched to the account's handlers
+'''
+class FakeClient:
+
+    def __init__(self, service: str, account: FakeAccount) -> None:
+        self.service = service
+        self.account = account
+        self.exceptions = account.exceptions
+
+
+    def __getattr__(self, operation: str):
+        if operation.startswith('__'):
+            raise AttributeError(operation)
+        return lambda *args, **kwargs: self.account.call(self.service, operation, *args, **kwargs)
+
+
+    def get_paginator(self, operation: str) -> FakePaginator:
+        return FakePaginator(self, operation)
+
+
+'''
+Replaces the shared client registry (aws_clients.registry) with clients of the given
+account, returns the registry it replaced so it can be put back
+'''
+def install(account: FakeAccount):
+    import aws_clients
+
+    class FakeRegistry(aws_clients.ClientRegistry):
+        def client(self, service: str, region: Optional[str] = None) -> FakeClient:
+            return FakeClient(service, account)
+
+    previous = aws_clients.registry
+    aws_clients.registry = FakeRegistry(previous.region)
+    aws_clients.role_registries.clear()
+    return previous
@@ -0,0 +1,122 @@
+#Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License").
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  or in the "license" file accompanying this file. This file is distributed
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+#  express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+
+import json
+import time
+import argparse
+import operator
+from typing import Callable, List
+from test_catalog import TestCatalog, Filter
+
+
+'''
+Filter sets equivalent to those built by TestBuilder.build_testing_script for common CLI invocations
+'''
+SCENARIOS = {
+    'default (all)': [
+        ('resource', 'in', ['attack-sequence', 'ec2', 'ecs-ec2', 'ecs-fargate', 'eks', 'iam', 'lambda', 's3']),
+        ('findingType', '!=', 'Stealth:IAMUser/PasswordPolicyChanged'),
+        ('findingType', 'does not contain', 'Policy:S3'),
+    ],
+    '--ec2 --runtime only --tactics impact': [
+        ('resource', 'in', ['ec2']),
+        ('tactic', 'in', ['impact']),
+        ('findingType', 'contains', 'Runtime'),
+        ('findingType', '!=', 'Stealth:IAMUser/PasswordPolicyChanged'),
+        ('findingType', 'does not contain', 'Policy:S3'),
+    ],
+    '--s3 --runtime false': [
+        ('resource', 'in', ['s3']),
+        ('findingType', 'does not contain', 'Runtime'),
+        ('findingType', '!=', 'Stealth:IAMUser/PasswordPolicyChanged'),
+        ('findingType', 'does not contain', 'Policy:S3'),
+    ],
+    '--finding (single)': [
+        ('findingType', 'in', ['CryptoCurrency:EC2/BitcoinTool.B!DNS']),
+        ('findingType', '!=', 'Stealth:IAMUser/PasswordPolicyChanged'),
+        ('findingType', 'does not contain', 'Policy:S3'),
+    ],
+}
+
+LINEAR_OPS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    'in': operator.contains,
+    'contains': lambda substr, base: substr in base,
+    'does not contain': lambda substr, base: substr not in base,
+}
+
+
+'''
+Reference implementation of the previous behavior, one list comprehension per filter
+'''
+def linear_select(definitions: List[dict], filters: List[Filter]) -> List[dict]:
+    for attribute, op, value in filters:
+        if value:
+            definitions = [d for d in definitions if LINEAR_OPS[op](value, d[attribute])]
+    return definitions
+
+
+'''
+Grows the published definitions into a synthetic catalog of the requested size
+Each copy keeps the published attribute values so filters stay selective
+'''
+def synthesize(definitions: List[dict], size: int) -> List[dict]:
+    catalog = []
+    copy = 0
+    while len(catalog) < size:
+        for d in definitions[:size - len(catalog)]:
+            synthetic = dict(d)
+            synthetic['alias'] = f"{d['alias']}#{copy}"
+            catalog.append(synthetic)
+        copy += 1
+    return catalog
+
+
+'''
+Returns the best wall time in milliseconds over the given number of repeats
+'''
+def best_of(func: Callable[[], object], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark test definition selection against catalog size')
+    parser.add_argument('--sizes', nargs='*', type=int, default=[107, 1000, 10000, 100000], help='Catalog sizes to benchmark')
+    parser.add_argument('--repeat', type=int, default=5, help='Repeats per measurement, best time is reported')
+    args = parser.parse_args()
+
+    with open('definitions.json') as f:
+        published = json.load(f)['definitions']
+
+    # catalog ms is what a CLI invocation pays, loading the catalog plus one select
+    print(f"{'size':>8} {'scenario':<40} {'linear ms':>10} {'catalog ms':>10} {'matches':>8}")
+    for size in args.sizes:
+        definitions = synthesize(published, size)
+
+        for name, filters in SCENARIOS.items():
+            expected = linear_select(definitions, filters)
+            selected = TestCatalog(definitions).select(filters)
+            assert [d['alias'] for d in expected] == [d['alias'] for d in selected], name
+
+            linear = best_of(lambda: linear_select(definitions, filters), args.repeat)
+            catalog = best_of(lambda: TestCatalog(definitions).select(filters), args.repeat)
+            print(f'{size:>8} {name:<40} {linear:>10.3f} {catalog:>10.3f} {len(selected):>8}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+#Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License").
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  or in the "license" file accompanying this file. This file is distributed
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+#  express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+
+import sys
+import math
+import random
+import struct
+import asyncio
+import argparse
+import itertools
+import string
+from typing import Dict, Iterator, NamedTuple, Optional
+
+
+# printable DNS label characters, the first 2^entropy of them are used for generated labels
+LABEL_ALPHABET = string.ascii_lowercase + string.digits + string.ascii_uppercase + '-'
+MAX_LABEL_LENGTH = 63
+MAX_NAME_LENGTH = 253
+RCODES = {0: 'NOERROR', 1: 'FORMERR', 2: 'SERVFAIL', 3: 'NXDOMAIN', 4: 'NOTIMP', 5: 'REFUSED'}
+
+# flags (recursion desired), question count 1, no answer/authority/additional records
+HEADER_TAIL = struct.pack('>HHHHH', 0x0100, 1, 0, 0, 0)
+# QTYPE A, QCLASS IN
+QUESTION_TAIL = struct.pack('>HH', 1, 1)
+
+
+'''
+Outcome of a traffic run, rcodes counts the answered queries per response code
+timeouts are queries without an answer in time, errors are failed sends and ICMP errors
+send_time is the time spent sending, elapsed also includes waiting for the last answers
+'''
+class TrafficReport(NamedTuple):
+    sent: int
+    rcodes: Dict[str, int]
+    timeouts: int
+    errors: int
+    send_time: float
+    elapsed: float
+
+    @property
+    def answered(self) -> int:
+        return sum(self.rcodes.values())
+
+    @property
+    def qps(self) -> float:
+        return self.sent / self.send_time if self.send_time else 0.0
+
+
+'''
+Returns an endless stream of names below domain, each made of the given number of random labels
+Each character is drawn from the first 2^entropy characters of LABEL_ALPHABET,
+so entropy is the bits per character of the generated labels (at most log2(63))
+'''
+def generate_names(domain: str, labels: int, label_length: int, entropy: float,
+                   seed: Optional[int] = None) -> Iterator[str]:
+    if not 1 <= label_length <= MAX_LABEL_LENGTH:
+        raise ValueError(f'label length must be between 1 and {MAX_LABEL_LENGTH}')
+    if labels * (label_length + 1) + len(domain) > MAX_NAME_LENGTH:
+        raise ValueError(f'{labels} labels of {label_length} characters exceed the {MAX_NAME_LENGTH} character name limit')
+
+    alphabet = LABEL_ALPHABET[:min(len(LABEL_ALPHABET), max(2, round(2 ** entropy)))]
+    rng = random.Random(seed)
+
+    def stream() -> Iterator[str]:
+        while True:
+            generated = []
+            for _ in range(labels):
+                label = ''.join(rng.choices(alphabet, k=label_length))
+                # labels may not start or end with a hyphen
+                if label[0] == '-' or label[-1] == '-':
+                    label = 'x' + label[1:-1] + 'x' if label_length > 1 else 'x'
+                generated.append(label)
+            yield '.'.join(generated + [domain])
+
+    return stream()
+
+
+'''
+Encodes name as a DNS question (length prefixed labels)
+'''
+def encode_question(name: str) -> bytes:
+    qname = b''.join(bytes([len(label)]) + label.encode() for label in name.rstrip('.').split('.'))
+    return qname + b'\x00' + QUESTION_TAIL
+
+
+'''
+Returns the first nameserver of resolv.conf, the resolver the host's own lookups use
+'''
+def system_resolver(path: str = '/etc/resolv.conf') -> str:
+    try:
+        with open(path) as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 2 and fields[0] == 'nameserver':
+                    return fields[1]
+    except OSError:
+        pass
+    return '127.0.0.1'
+
+
+class DnsProtocol(asyncio.DatagramProtocol):
+
+    def __init__(self) -> None:
+        self.pending = {}
+        self.errors = 0
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        if len(data) < 4:
+            return
+        future = self.pending.get(struct.unpack_from('>H', data)[0])
+        if future and not future.done():
+            future.set_result(data[3] & 0x0F)
+
+    def error_received(self, exc: Exception) -> None:
+        self.errors += 1
+
+
+'''
+DnsQueryEngine sends raw DNS queries over a single UDP socket from one asyncio loop
+    - queries are paced to a target rate (qps <= 0 sends as fast as concurrency allows)
+    - at most concurrency queries are awaiting an answer at any time
+    - answers are matched to their query by transaction id, a query unanswered
+      after timeout seconds is counted as a timeout
+Names are consumed lazily from the given iterator, so generated names never
+have to be held in memory
+'''
+class DnsQueryEngine:
+    MAX_CONCURRENCY = 4096
+
+    def __init__(self, resolver: str, concurrency: int = 64, qps: float = 100.0,
+                 timeout: float = 2.0, port: int = 53) -> None:
+        self.resolver = resolver
+        self.port = port
+        self.concurrency = max(1, min(concurrency, self.MAX_CONCURRENCY))
+        self.qps = qps
+        self.timeout = timeout
+
+
+    '''
+    Sends queries for the names until count queries were sent, duration seconds
+    passed, or the names ran out, then waits for the outstanding answers
+    '''
+    def run(self, names: Iterator[str], count: Optional[int] = None, duration: Optional[float] = None) -> TrafficReport:
+        return asyncio.run(self.send_all(names, count, duration))
+
+
+    async def send_all(self, names: Iterator[str], count: Optional[int], duration: Optional[float]) -> TrafficReport:
+        loop = asyncio.get_running_loop()
+        transport, protocol = await loop.create_datagram_endpoint(DnsProtocol, remote_addr=(self.resolver, self.port))
+        slots = asyncio.Semaphore(self.concurrency)
+        rcodes = {}
+        state = {'timeouts': 0, 'errors': 0}
+        ids = itertools.cycle(range(1, 65536))
+        tasks = set()
+
+        async def query(qid: int, packet: bytes) -> None:
+            future = loop.create_future()
+            protocol.pending[qid] = future
+            try:
+                transport.sendto(packet)
+                rcode = await asyncio.wait_for(future, self.timeout)
+                name = RCODES.get(rcode, str(rcode))
+                rcodes[name] = rcodes.get(name, 0) + 1
+            except asyncio.TimeoutError:
+                state['timeouts'] += 1
+            except OSError:
+                state['errors'] += 1
+            finally:
+                protocol.pending.pop(qid, None)
+                slots.release()
+
+        start = loop.time()
+        stop = start + duration if duration else math.inf
+        interval = 1 / self.qps if self.qps > 0 else 0
+        sent = 0
+        send_time = 0.0
+
+        try:
+            for name in itertools.islice(names, count):
+                send_at = start + sent * interval
+                now = loop.time()
+                if send_at >= stop or now >= stop:
+                    break
+                if send_at > now:
+                    await asyncio.sleep(send_at - now)
+
+                await slots.acquire()
+                qid = next(ids)
+                while qid in protocol.pending:
+                    qid = next(ids)
+                task = loop.create_task(query(qid, struct.pack('>H', qid) + HEADER_TAIL + encode_question(name)))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                sent += 1
+                send_time = loop.time() - start
+
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            transport.close()
+
+        return TrafficReport(sent, rcodes, state['timeouts'], state['errors'] + protocol.errors, send_time, loop.time() - start)
+
+
+def print_report(report: TrafficReport, resolver: str) -> None:
+    answers = ', '.join(f'{k} {v}' for k, v in sorted(report.rcodes.items())) or 'none'
+    print(f'DNS queries sent to {resolver}: {report.sent} in {report.send_time:.1f}s ({report.qps:.1f} queries/s)')
+    print(f'    answered {report.answered} ({answers}), timeouts {report.timeouts}, errors {report.errors}')
+    sys.stdout.flush()
+
+
+'''
+Generates DNS traffic for the DNS based scenarios, either queries for names made of
+random labels below a domain (data exfiltration) or repeated queries for one name
+(threat intel domains)
+'''
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Asynchronous DNS query generator')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--domain', type=str, help='Query generated names below this domain')
+    target.add_argument('--name', type=str, help='Repeatedly query this name')
+    parser.add_argument('--resolver', type=str, default=None, help='Resolver address. Default: first nameserver of /etc/resolv.conf')
+    parser.add_argument('--count', type=int, default=None, help='Number of queries to send. Default: 1000 unless --duration is given')
+    parser.add_argument('--duration', type=float, default=None, help='Stop sending after this many seconds')
+    parser.add_argument('--qps', type=float, default=100.0, help='Target queries per second, 0 for no limit. Default: 100')
+    parser.add_argument('--concurrency', type=int, default=64, help='Maximum queries awaiting an answer. Default: 64')
+    parser.add_argument('--timeout', type=float, default=2.0, help='Seconds to wait for an answer. Default: 2')
+    parser.add_argument('--labels', type=int, default=2, help='Generated labels per name. Default: 2')
+    parser.add_argument('--label-length', type=int, default=60, help='Characters per generated label. Default: 60')
+    parser.add_argument('--entropy', type=float, default=6.0, help='Bits of entropy per generated character (1 to 6). Default: 6')
+    parser.add_argument('--seed', type=int, default=None, help='Seed of the label generator')
+    args = parser.parse_args()
+
+    if args.count is None and args.duration is None:
+        args.count = 1000
+
+    if args.domain:
+        try:
+            names = generate_names(args.domain, args.labels, args.label_length, args.entropy, args.seed)
+        except ValueError as e:
+            parser.error(str(e))
+    else:
+        names = itertools.repeat(args.name)
+
+    resolver = args.resolver or system_resolver()
+    engine = DnsQueryEngine(resolver, args.concurrency, args.qps, args.timeout)
+    print_report(engine.run(names, args.count, args.duration), resolver)
@@ -0,0 +1,84 @@
+#Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License").
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  or in the "license" file accompanying this file. This file is distributed
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+#  express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+
+import base64
+import subprocess
+from typing import Dict, Optional
+import aws_clients
+import tester_vars as vars
+
+
+'''
+EcrRepository wraps the ECR and docker steps shared by the tester images
+Images are addressed by content-hash tags so callers can skip a build
+and push entirely when ECR already holds the tag
+'''
+class EcrRepository:
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.ecr = aws_clients.client('ecr')
+        self.registry = f'{vars.ACCNT_ID}.dkr.ecr.{vars.REGION}.amazonaws.com'
+        self.uri = f'{self.registry}/{self.name}'
+        self.logged_in = False
+
+
+    '''
+    Returns the digest of the image with the given tag, or None if ECR does not hold it
+    '''
+    def image_digest(self, tag: str) -> Optional[str]:
+        try:
+            images = self.ecr.describe_images(repositoryName=self.name, imageIds=[{'imageTag': tag}])['imageDetails']
+            return images[0]['imageDigest'] if images else None
+        except (self.ecr.exceptions.ImageNotFoundException, self.ecr.exceptions.RepositoryNotFoundException):
+            return None
+
+
+    '''
+    Builds the given Dockerfile and pushes it under tag, returns the pushed image digest
+    '''
+    def build_and_push(self, tag: str, dockerfile: str, build_args: Optional[Dict[str, str]] = None) -> str:
+        self.create()
+        self.docker_login()
+
+        image = f'{self.uri}:{tag}'
+        command = ['sudo', 'docker', 'build', '--platform=linux/amd64', '-t', image, '-f', dockerfile]
+        for key, value in (build_args or {}).items():
+            command += ['--build-arg', f'{key}={value}']
+        subprocess.run(command + ['.'], check=True)
+        subprocess.run(['sudo', 'docker', 'push', image], check=True)
+
+        return self.image_digest(tag)
+
+
+    '''
+    Creates the ECR repository if it does not exist yet
+    '''
+    def create(self) -> None:
+        try:
+            self.ecr.create_repository(repositoryName=self.name)
+        except self.ecr.exceptions.RepositoryAlreadyExistsException:
+            pass
+
+
+    '''
+    Logs docker in to the account's ECR registry
+    '''
+    def docker_login(self) -> None:
+        if self.logged_in:
+            return
+        token = self.ecr.get_authorization_token()['authorizationData'][0]['authorizationToken']
+        password = base64.b64decode(token).decode().split(':', 1)[1]
+        subprocess.run(['sudo', 'docker', 'login', '--username', 'AWS', '--password-stdin', self.registry],
+                       input=password, text=True, check=True, stdout=subprocess.DEVNULL)
+        self.logged_in = True
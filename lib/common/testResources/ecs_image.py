@@ -0,0 +1,117 @@
+#Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License").
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  or in the "license" file accompanying this file. This file is distributed
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+#  express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+
+import hashlib
+from ecr_repository import EcrRepository
+import tester_vars as vars
+
+
+DOCKERFILE = '''FROM public.ecr.aws/ecs-sample-image/amazon-ecs-sample:latest
+WORKDIR /
+RUN apt update -y && apt install python3 netcat-openbsd sudo zip unzip curl -y
+RUN curl "https://awscli.amazonaws.com/awscli-exe-linux-x86_64.zip" -o /tmp/awscliv2.zip && unzip -q /tmp/awscliv2.zip -d /tmp && /tmp/aws/install && rm -rf /tmp/aws /tmp/awscliv2.zip
+RUN printf '%s' 'X5O!P%@AP[4\\PZX54(P^)7CC)7}$EICAR-STANDARD-ANTIVIRUS-TEST-FILE!$H+H*' > /tmp/eicar.com && cp /tmp/eicar.com /tmp/eicar.com.txt && zip -j /tmp/eicar_com.zip /tmp/eicar.com && zip -j /tmp/eicarcom2.zip /tmp/eicar_com.zip
+COPY ecs_entrypoint.sh /ecs_entrypoint.sh
+ENTRYPOINT ["bash", "/ecs_entrypoint.sh"]
+'''
+
+# waits until the task is ready to be monitored instead of a fixed sleep:
+# task metadata must be reachable and, on Fargate, the GuardDuty agent sidecar must be RUNNING
+ENTRYPOINT = '''#!/bin/bash
+RESOURCE=$1
+
+ready() {
+python3 - <<'EOF'
+import os, sys, json, urllib.request
+uri = os.environ.get('ECS_CONTAINER_METADATA_URI_V4')
+if not uri:
+    sys.exit(0)
+task = json.load(urllib.request.urlopen(uri + '/task', timeout=2))
+agents = [c for c in task.get('Containers', []) if 'guardduty' in c.get('Name', '').lower()]
+if task.get('LaunchType') == 'FARGATE' and not any(c.get('KnownStatus') == 'RUNNING' for c in agents):
+    sys.exit(1)
+EOF
+}
+
+for i in $(seq 1 60); do
+  ready 2>/dev/null && break
+  echo "waiting for task readiness..."
+  sleep 2
+done
+
+cd /tmp
+for i in $(seq 1 30); do
+  aws s3 cp s3://$S3_BUCKET_NAME/remote/$RESOURCE.sh . && break
+  sleep 2
+done
+
+bash $RESOURCE.sh
+wait
+echo "done!"
+'''
+
+
+'''
+EcsTesterImage builds the ECS runtime tester image once and caches it in ECR
+The image has the testing tools preinstalled so ECS tasks only fetch and run
+their remote/{resource}.sh script. Images are tagged with a hash of the
+generated Dockerfile and entrypoint so a build and push only happens when
+either changes
+'''
+class EcsTesterImage:
+    REPO_NAME = 'gd-ecs-tester'
+    DOCKERFILE_PATH = 'Dockerfile.ecs'
+    ENTRYPOINT_PATH = 'ecs_entrypoint.sh'
+
+    def __init__(self) -> None:
+        self.repo = EcrRepository(self.REPO_NAME)
+        self.tag = hashlib.sha256((DOCKERFILE + ENTRYPOINT).encode()).hexdigest()[:32]
+        self.uri = f'{self.repo.uri}:{self.tag}'
+        self.ready = False
+
+
+    '''
+    Container definition fields that point a task definition at the prebuilt image
+    '''
+    def container_overrides(self, resource: str) -> dict:
+        return {
+            'image': self.uri,
+            'entryPoint': ['bash', '/ecs_entrypoint.sh'],
+            'command': [resource],
+            'environment': [{'name': 'S3_BUCKET_NAME', 'value': vars.S3_BUCKET_NAME}],
+        }
+
+
+    '''
+    Builds and pushes the image unless ECR already holds the current tag
+    '''
+    def ensure(self) -> None:
+        if self.ready:
+            return
+
+        if not self.repo.image_digest(self.tag):
+            print(f'Building ECS tester image {self.REPO_NAME}:{self.tag}...')
+            self.write_build_files()
+            self.repo.build_and_push(self.tag, self.DOCKERFILE_PATH)
+
+        self.ready = True
+
+
+    '''
+    Writes the generated Dockerfile and entrypoint next to the EKS Dockerfile
+    '''
+    def write_build_files(self) -> None:
+        with open(self.DOCKERFILE_PATH, 'w') as f:
+            f.write(DOCKERFILE)
+        with open(self.ENTRYPOINT_PATH, 'w') as f:
+            f.write(ENTRYPOINT)
@@ -0,0 +1,131 @@
+#Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License").
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  or in the "license" file accompanying this file. This file is distributed
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+#  express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+
+import time
+import random
+import threading
+from botocore.exceptions import ClientError
+import aws_clients
+import tester_vars as vars
+
+
+'''
+EksAgentReadiness ensures the GuardDuty EKS agent is installed and running on the
+EKS cluster in a background thread, so the rest of the set up and the script build
+are not held up while the addon is created
+Agent is installed on ECS/EC2 cluster via user data per documentation:
+https://docs.aws.amazon.com/guardduty/latest/ug/managing-gdu-agent-ec2-manually.html
+and EKS agent is installed via addons as per documentation:
+https://docs.aws.amazon.com/guardduty/latest/ug/managing-gdu-agent-eks-manually.html
+If account has automated agent configuration for eks enabled, no action required
+If no addon exists one is created
+The agent is ready once the addon is ACTIVE and GuardDuty runtime coverage reports
+the cluster as HEALTHY. Polls back off exponentially with jitter up to a deadline
+Without coverage checks (or access to the coverage API) an ACTIVE addon is enough
+'''
+class EksAgentReadiness:
+    ADDON_NAME = 'aws-guardduty-agent'
+    FAILED_STATES = ['CREATE_FAILED', 'DELETING', 'DELETE_FAILED', 'DEGRADED', 'UPDATE_FAILED']
+    BASE_DELAY = 5
+    MAX_DELAY = 60
+    DEADLINE = 900
+
+    def __init__(self, detector_id: str, deadline: float = DEADLINE, check_coverage: bool = True) -> None:
+        self.detector_id = detector_id
+        self.deadline = deadline
+        self.check_coverage = check_coverage
+        self.ready = False
+        self.reason = ''
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+
+    def start(self) -> 'EksAgentReadiness':
+        self.thread.start()
+        return self
+
+
+    '''
+    Blocks until the agent is ready, has failed, or the deadline passed
+    Returns True if the agent is ready
+    '''
+    def wait(self) -> bool:
+        if self.thread.is_alive():
+            print('Waiting for GuardDuty EKS Agent...')
+        self.thread.join()
+        if not self.ready:
+            print(self.reason)
+            print('NOTE: EKS Runtime Monitoring Findings will not be generated')
+        return self.ready
+
+
+    def run(self) -> None:
+        stop = time.monotonic() + self.deadline
+        attempt = 0
+        try:
+            while True:
+                status = self.addon_status()
+                if status in self.FAILED_STATES:
+                    self.reason = f'Unable to properly provision EKS GuardDuty Agent! (addon status {status})'
+                    return
+                if status == 'ACTIVE' and self.coverage_healthy():
+                    self.ready = True
+                    return
+
+                remaining = stop - time.monotonic()
+                if remaining <= 0:
+                    self.reason = f'GuardDuty EKS Agent not healthy after {self.deadline} seconds (addon status {status})'
+                    return
+
+                # exponential backoff with equal jitter
+                delay = min(self.MAX_DELAY, self.BASE_DELAY * 2 ** attempt)
+                time.sleep(min(delay / 2 + random.uniform(0, delay / 2), remaining))
+                attempt += 1
+        except Exception as e:
+            self.reason = f'Unable to check GuardDuty EKS Agent: {e}'
+
+
+    '''
+    Returns the agent addon status, creating the addon if the cluster has none
+    '''
+    def addon_status(self) -> str:
+        eks = aws_clients.client('eks')
+        try:
+            return eks.describe_addon(clusterName=vars.EKS_CLUSTER_NAME, addonName=self.ADDON_NAME)['addon']['status']
+        except eks.exceptions.ResourceNotFoundException:
+            # no add on found -> create one
+            eks.create_addon(
+                clusterName=vars.EKS_CLUSTER_NAME,
+                addonName=self.ADDON_NAME,
+                resolveConflicts='OVERWRITE',
+            )
+            print('Deploying GuardDuty EKS Agent...')
+            return 'CREATING'
+
+
+    '''
+    True if GuardDuty runtime coverage lists the cluster and all its entries are HEALTHY
+    Always True when coverage is not checked, a denied coverage call turns the checks off
+    '''
+    def coverage_healthy(self) -> bool:
+        if not self.check_coverage:
+            return True
+        criteria = {'FilterCriterion': [{'CriterionKey': 'EKS_CLUSTER_NAME', 'FilterCondition': {'Equals': [vars.EKS_CLUSTER_NAME]}}]}
+        try:
+            resources = aws_clients.client('guardduty').list_coverage(DetectorId=self.detector_id, FilterCriteria=criteria)['Resources']
+        except ClientError as e:
+            if e.response['Error']['Code'] not in ['AccessDeniedException', 'AccessDenied']:
+                raise
+            print('Unable to read GuardDuty runtime coverage, waiting for the EKS agent addon only')
+            self.check_coverage = False
+            return True
+        return bool(resources) and all(r['CoverageStatus'] == 'HEALTHY' for r in resources)
@@ -0,0 +1,121 @@
+#Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License").
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  or in the "license" file accompanying this file. This file is distributed
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+#  express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+
+import os
+import hashlib
+import subprocess
+from typing import Optional
+from ecr_repository import EcrRepository
+from runtime_payloads import PayloadBundle
+import tester_vars as vars
+
+
+POD_MANIFEST = '''apiVersion: v1
+kind: Pod
+metadata:
+  name: {pod}
+spec:
+  containers:
+    - name: {pod}
+      imagePullPolicy: IfNotPresent
+      image: {image}
+      args: ["sleep","infinity"]
+      env:
+        - name: GD_RUN_ID
+          value: "{run_id}"
+      securityContext:
+        privileged: true
+'''
+
+
+'''
+EksRuntimeDeployer builds the EKS runtime tester image and deploys it as a pod
+    - the package installs live in a base image (Dockerfile.eks-base) tagged with the
+      hash of that Dockerfile, so they are only built when the base Dockerfile changes
+    - the scenario layer only copies eks.sh and is tagged with the hash of eks.sh,
+      the scenario Dockerfile and the base tag, so an unchanged eks.sh is never rebuilt
+    - the pod is pinned to the image digest, so nodes only pull the image when it changed
+    - the run id reaches the scenarios through the pod environment, it is not part of the image
+    - the compiled runtime payloads are copied into the scenario layer (its tag includes the
+      payload bundle version), so the pod needs neither a compiler nor bucket access for them
+'''
+class EksRuntimeDeployer:
+    REPO_NAME = 'gd-eks-tester'
+    POD = 'gd-eks-runtime-tester'
+    SCRIPT_PATH = 'eks.sh'
+    DOCKERFILE_PATH = 'Dockerfile'
+    BASE_DOCKERFILE_PATH = 'Dockerfile.eks-base'
+
+    def __init__(self, run_id: str = '', payloads: Optional[PayloadBundle] = None) -> None:
+        self.repo = EcrRepository(self.REPO_NAME)
+        self.run_id = run_id
+        self.payloads = payloads or PayloadBundle()
+
+
+    '''
+    Builds (if needed) and deploys the image for the generated eks.sh
+    '''
+    def deploy(self) -> None:
+        # pass the pod args through to the tests so the container keeps running afterwards
+        with open(self.SCRIPT_PATH, 'a') as f:
+            f.write('$@\n')
+
+        digest = self.ensure_image()
+        self.apply_pod(f'{self.repo.uri}@{digest}')
+        os.remove(self.SCRIPT_PATH)
+
+
+    '''
+    Returns the digest of the scenario image, building and pushing it (and the base image)
+    only when ECR does not already hold their content hash tags
+    '''
+    def ensure_image(self) -> str:
+        base_tag = 'base-' + self.file_digest(self.BASE_DOCKERFILE_PATH)
+        tag = self.file_digest(self.SCRIPT_PATH, self.DOCKERFILE_PATH, extra=base_tag + self.payloads.version)
+
+        digest = self.repo.image_digest(tag)
+        if digest:
+            print(f'Using cached EKS tester image {self.REPO_NAME}:{tag}')
+            return digest
+
+        if not self.repo.image_digest(base_tag):
+            print(f'Building EKS tester base image {self.REPO_NAME}:{base_tag}...')
+            self.repo.build_and_push(base_tag, self.BASE_DOCKERFILE_PATH)
+
+        print(f'Building EKS tester image {self.REPO_NAME}:{tag}...')
+        self.payloads.build()
+        return self.repo.build_and_push(tag, self.DOCKERFILE_PATH, {'BASE_IMAGE': f'{self.repo.uri}:{base_tag}'})
+
+
+    '''
+    Replaces the tester pod, the tests run when the pod's container starts
+    '''
+    def apply_pod(self, image: str) -> None:
+        subprocess.run(['aws', 'eks', '--region', vars.REGION, 'update-kubeconfig', '--name', vars.EKS_CLUSTER_NAME],
+                       check=True, stdout=subprocess.DEVNULL)
+        subprocess.run(['kubectl', 'delete', 'pod', self.POD, '--ignore-not-found'],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        subprocess.run(['kubectl', 'apply', '-f', '-'], input=POD_MANIFEST.format(pod=self.POD, image=image, run_id=self.run_id),
+                       text=True, check=True)
+
+
+    '''
+    sha256 over the contents of the given files (and an optional extra string), shortened to a tag
+    '''
+    def file_digest(self, *paths: str, extra: str = '') -> str:
+        h = hashlib.sha256()
+        for path in paths:
+            with open(path, 'rb') as f:
+                h.update(f.read())
+        h.update(extra.encode())
+        return h.hexdigest()[:32]
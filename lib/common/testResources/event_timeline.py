@@ -0,0 +1,210 @@
+#Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License").
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  or in the "license" file accompanying this file. This file is distributed
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+#  express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+
+import os
+import json
+import glob
+import argparse
+import subprocess
+from typing import Iterable, List, NamedTuple, Optional
+import aws_clients
+import tester_vars as vars
+
+
+# prefix of the event lines remote scripts write to their output (see gd_event in the script header)
+EVENT_MARKER = 'GD_EVENT '
+EVENTS_DIR = 'events'
+ECS_LOG_GROUP = 'GuardDuty-Tester-Ecs-Task-Logs'
+EKS_POD = 'gd-eks-runtime-tester'
+
+
+'''
+One scenario of a run, times are epoch seconds of the host the scenario ran on
+duration comes from that host's monotonic clock, None while the scenario has not ended
+'''
+class TimelineEntry(NamedTuple):
+    test: int
+    space: str
+    scenario: str
+    start: float
+    end: Optional[float]
+    duration: Optional[float]
+    exit: Optional[int]
+
+
+def events_path(run_id: str, events_dir: str = EVENTS_DIR) -> str:
+    return os.path.join(events_dir, f'{run_id}.jsonl')
+
+
+'''
+Returns the id of the most recent run with a local events file
+'''
+def latest_run(events_dir: str = EVENTS_DIR) -> Optional[str]:
+    paths = glob.glob(os.path.join(events_dir, '*.jsonl'))
+    if not paths:
+        return None
+    return os.path.basename(max(paths, key=os.path.getmtime))[:-len('.jsonl')]
+
+
+'''
+Parses event lines, lines of other output or of other runs are skipped
+'''
+def parse_events(lines: Iterable[str], run_id: str) -> List[dict]:
+    events = []
+    for line in lines:
+        line = line.strip()
+        if line.startswith(EVENT_MARKER):
+            line = line[len(EVENT_MARKER):]
+        try:
+            event = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(event, dict) and event.get('run') == run_id:
+            events.append(event)
+    return events
+
+
+'''
+EventCollector gathers the scenario events of a run from every place scenarios ran
+    - driver host: the run's local events file
+    - Debian host: the events file the script uploads to s3://<bucket>/events/<run id>/
+    - ECS tasks: the task log group, tasks print their events to stdout
+    - EKS pod: the tester pod's log, the pod prints its events to stdout
+A source that cannot be read is reported and skipped
+'''
+class EventCollector:
+
+    def __init__(self, run_id: str, events_dir: str = EVENTS_DIR) -> None:
+        self.run_id = run_id
+        self.events_dir = events_dir
+
+
+    def collect(self) -> List[dict]:
+        events = []
+        for source in (self.local_events, self.debian_events, self.ecs_events, self.eks_events):
+            try:
+                events += source()
+            except Exception as e:
+                print(f'Unable to collect {source.__name__.replace("_", " ")}: {e}')
+        return events
+
+
+    def local_events(self) -> List[dict]:
+        try:
+            with open(events_path(self.run_id, self.events_dir)) as f:
+                return parse_events(f, self.run_id)
+        except FileNotFoundError:
+            return []
+
+
+    def debian_events(self) -> List[dict]:
+        s3 = aws_clients.client('s3')
+        events = []
+        pages = s3.get_paginator('list_objects_v2').paginate(Bucket=vars.S3_BUCKET_NAME, Prefix=f'events/{self.run_id}/')
+        for page in pages:
+            for obj in page.get('Contents', []):
+                body = s3.get_object(Bucket=vars.S3_BUCKET_NAME, Key=obj['Key'])['Body'].read().decode()
+                events += parse_events(body.splitlines(), self.run_id)
+        return events
+
+
+    def ecs_events(self) -> List[dict]:
+        logs = aws_clients.client('logs')
+        events = []
+        try:
+            pages = logs.get_paginator('filter_log_events').paginate(
+                logGroupName=ECS_LOG_GROUP,
+                filterPattern=f'"{EVENT_MARKER.strip()}" "{self.run_id}"',
+            )
+            for page in pages:
+                events += parse_events((e['message'] for e in page['events']), self.run_id)
+        except logs.exceptions.ResourceNotFoundException:
+            # no ECS task has run yet
+            pass
+        return events
+
+
+    def eks_events(self) -> List[dict]:
+        result = subprocess.run(['kubectl', 'logs', EKS_POD], capture_output=True, text=True)
+        if result.returncode != 0:
+            return []
+        return parse_events(result.stdout.splitlines(), self.run_id)
+
+
+'''
+Merges start and end events into one entry per scenario, ordered by start time
+'''
+def build_timeline(events: List[dict]) -> List[TimelineEntry]:
+    scenarios = {}
+    for e in events:
+        scenarios.setdefault((e['space'], e['test']), {})[e['event']] = e
+
+    entries = []
+    for (space, test), pair in scenarios.items():
+        start, end = pair.get('start'), pair.get('end')
+        if not start:
+            continue
+        entries.append(TimelineEntry(
+            test,
+            space,
+            start.get('scenario', ''),
+            start['ts'],
+            end['ts'] if end else None,
+            end['mono'] - start['mono'] if end else None,
+            end.get('exit') if end else None,
+        ))
+    return sorted(entries, key=lambda e: (e.start, e.test))
+
+
+def print_timeline(entries: List[TimelineEntry]) -> None:
+    if not entries:
+        print('No scenario events recorded for this run')
+        return
+
+    origin = entries[0].start
+    total = sum(e.duration for e in entries if e.duration is not None)
+    width = max([len(e.scenario) for e in entries] + [len('Scenario')]) + 2
+    print(f'{"Start":>8}  {"Test":>4}  {"Space":<12}{"Scenario":<{width}}{"Duration":>9}{"Share":>7}{"Exit":>6}')
+    for e in entries:
+        duration = f'{e.duration:.1f}s' if e.duration is not None else 'running'
+        share = f'{e.duration / total:.0%}' if e.duration is not None and total else '-'
+        exit_code = '-' if e.exit is None else str(e.exit)
+        print(f'{e.start - origin:>7.1f}s  {e.test:>4}  {e.space:<12}{e.scenario:<{width}}{duration:>9}{share:>7}{exit_code:>6}')
+
+    print()
+    print('Wall time per execution space:')
+    for space in sorted({e.space for e in entries}):
+        runs = [e for e in entries if e.space == space]
+        ends = [e.end for e in runs if e.end is not None]
+        span = max(ends) - min(e.start for e in runs) if ends else 0
+        failed = sum(1 for e in runs if e.exit not in (None, 0))
+        print(f'    {space:<12}{len(runs):>4} scenario(s) {span:>8.1f}s  {failed} failed')
+
+
+'''
+Prints the merged scenario timeline of a tester run, by default the latest run on this host
+ECS and EKS scenarios log their events as they run, the Debian host uploads its events
+once its script finishes, so collect again later while remote scenarios are still running
+'''
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Show the scenario timeline of a GuardDuty tester run')
+    parser.add_argument('--run-id', type=str, default=None, help='Run to show. Default: the latest run on this host')
+    args = parser.parse_args()
+
+    run_id = args.run_id or latest_run()
+    if not run_id:
+        print('No runs with scenario events found')
+    else:
+        events = EventCollector(run_id).collect()
+        print(f'Run {run_id}')
+        print_timeline(build_timeline(events))
@@ -0,0 +1,177 @@
+#Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License").
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  or in the "license" file accompanying this file. This file is distributed
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+#  express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+
+import time
+import aws_clients
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional
+
+
+'''
+Verification outcome of a single expected finding type
+detected_at is the GuardDuty time the finding was created (or updated, for a
+finding that already existed before the run), latency is seconds from run start
+'''
+class FindingResult(NamedTuple):
+    finding_type: str
+    tests: List[int]
+    detected_at: Optional[datetime]
+    latency: Optional[float]
+    finding_id: Optional[str]
+
+
+'''
+FindingVerifier waits for the findings expected from a tester run
+    - every poll asks get_findings_statistics for per type counts of the pending
+      types' findings updated since the run started, one cheap call per 50 types
+    - only when the statistics show a not yet matched type are the findings of
+      those types listed and fetched with get_findings in batches of 50
+    - the poll interval backs off while nothing new appears and resets on progress
+    - polling stops once every expected type is matched or the deadline passes
+'''
+class FindingVerifier:
+    MIN_INTERVAL = 15
+    MAX_INTERVAL = 120
+    BACKOFF = 1.5
+    GET_FINDINGS_BATCH = 50
+    CRITERION_VALUES = 50
+
+    def __init__(self, detector_id: str, expected: Dict[str, List[int]], start: datetime) -> None:
+        self.gd = aws_clients.client('guardduty')
+        self.detector_id = detector_id
+        self.expected = expected
+        self.start = start
+        self.start_ms = int(start.timestamp() * 1000)
+        self.matched = {}
+
+
+    '''
+    Polls GuardDuty until all expected finding types are matched or deadline (seconds) passes
+    Returns one result per expected finding type, in the order the types were given
+    '''
+    def verify(self, deadline: float) -> List[FindingResult]:
+        stop = time.monotonic() + deadline
+        interval = self.MIN_INTERVAL
+
+        print(f'\nWaiting up to {int(deadline // 60)} minutes for {len(self.expected)} expected finding type(s)...')
+        while True:
+            pending = [t for t in self.expected if t not in self.matched]
+            if not pending:
+                break
+
+            observed = len(self.matched)
+            counts = self.finding_type_counts(pending)
+            generated = [t for t in pending if counts.get(t)]
+            if generated:
+                self.fetch(generated)
+
+            if len(self.matched) > observed:
+                interval = self.MIN_INTERVAL
+                print(f'{len(self.matched)}/{len(self.expected)} expected finding type(s) observed')
+            else:
+                interval = min(interval * self.BACKOFF, self.MAX_INTERVAL)
+
+            remaining = stop - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(interval, remaining))
+
+        return self.results()
+
+
+    '''
+    Number of findings per finding type updated since the run started, for the given types
+    Each chunk of types has at most as many groups as the statistics page size
+    '''
+    def finding_type_counts(self, finding_types: List[str]) -> Dict[str, int]:
+        counts = {}
+        for i in range(0, len(finding_types), self.CRITERION_VALUES):
+            chunk = finding_types[i:i + self.CRITERION_VALUES]
+            stats = self.gd.get_findings_statistics(
+                DetectorId=self.detector_id,
+                FindingCriteria=self.criteria(chunk),
+                GroupBy='FINDING_TYPE',
+                MaxResults=self.CRITERION_VALUES,
+            )['FindingStatistics']
+            for group in stats.get('GroupedByFindingType', []):
+                counts[group['FindingType']] = group['TotalFindings']
+        return counts
+
+
+    '''
+    Lists the findings of the given types and records the earliest detection of each
+    '''
+    def fetch(self, finding_types: List[str]) -> None:
+        ids = []
+        paginator = self.gd.get_paginator('list_findings')
+        for i in range(0, len(finding_types), self.CRITERION_VALUES):
+            chunk = finding_types[i:i + self.CRITERION_VALUES]
+            for page in paginator.paginate(DetectorId=self.detector_id, FindingCriteria=self.criteria(chunk)):
+                ids += page['FindingIds']
+
+        for i in range(0, len(ids), self.GET_FINDINGS_BATCH):
+            findings = self.gd.get_findings(DetectorId=self.detector_id, FindingIds=ids[i:i + self.GET_FINDINGS_BATCH])['Findings']
+            for finding in findings:
+                detected_at = self.detected_at(finding)
+                current = self.matched.get(finding['Type'])
+                if current is None or detected_at < current[0]:
+                    self.matched[finding['Type']] = (detected_at, finding['Id'])
+
+
+    '''
+    Finding criteria for findings updated since run start, optionally limited to the given types
+    '''
+    def criteria(self, finding_types: Optional[List[str]] = None) -> dict:
+        criterion = {'updatedAt': {'GreaterThanOrEqual': self.start_ms}}
+        if finding_types:
+            criterion['type'] = {'Equals': finding_types}
+        return {'Criterion': criterion}
+
+
+    '''
+    New findings are detected when created, repeated activity updates an existing finding
+    '''
+    def detected_at(self, finding: dict) -> datetime:
+        created = self.parse_time(finding['CreatedAt'])
+        return created if created >= self.start else self.parse_time(finding['UpdatedAt'])
+
+
+    def parse_time(self, value: str) -> datetime:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).astimezone(timezone.utc)
+
+
+    def results(self) -> List[FindingResult]:
+        results = []
+        for finding_type, tests in self.expected.items():
+            detected_at, finding_id = self.matched.get(finding_type, (None, None))
+            latency = (detected_at - self.start).total_seconds() if detected_at else None
+            results.append(FindingResult(finding_type, tests, detected_at, latency, finding_id))
+        return results
+
+
+'''
+Prints a pass/miss table of the verification results
+'''
+def print_results(results: List[FindingResult]) -> None:
+    width = max([len(r.finding_type) for r in results] + [len('Finding Type')])
+    print()
+    print('*' * 71)
+    print(f'{"Result":<6}  {"Finding Type":<{width}}  {"Detected After":>14}  Tests')
+    for r in results:
+        outcome = 'PASS' if r.detected_at else 'MISS'
+        latency = f'{int(r.latency // 60)}m {int(r.latency % 60):02d}s' if r.latency is not None else '-'
+        tests = ', '.join(f'#{n}' for n in r.tests)
+        print(f'{outcome:<6}  {r.finding_type:<{width}}  {latency:>14}  {tests}')
+    passed = sum(1 for r in results if r.detected_at)
+    print(f'\n{passed}/{len(results)} expected finding type(s) observed')
+    print('*' * 71)
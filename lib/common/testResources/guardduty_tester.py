@@ -12,13 +12,19 @@
 #  permissions and limitations under the License.
 
 import sys
+import atexit
+import json
 import signal
 import argparse
 import textwrap
 from types import FrameType
-from typing import Optional
+from typing import List, Optional
 from test_builder import TestBuilder
 from settings_manager import SettingsManager
+from run_history import RunHistory
+from api_trace import ApiTracer
+import aws_clients
+from remote_fanout import RemoteFanout, SUMMARY_MARKER, fanout_targets, organization_accounts
 
 
 '''
@@ -39,6 +45,16 @@ NOTES:
         - true      -> will execute runtime finding tests
         - false     -> will omit runtime finding tests
         - only      -> will omit non runtime finding tests and run only runtime tests
+    - --ecs-prebuilt-image builds the ECS tester image once (tagged by content hash in ECR)
+      so ECS tasks skip installing tools at start up
+    - --verify-findings polls GuardDuty after the tests for the expected findings and
+      prints which were observed and how long each took (DEFAULT wait -> 30 minutes)
+    - every run appends one record per expected finding to the run history file,
+      analyze it with: python3 history_analysis.py
+    - --regions and --accounts/--ou run the tester on the driver host of each listed region
+      and/or account (the tester stack must be deployed in each), permissions are asked once
+        - accounts are reached by assuming --role-name in each account
+        - at most --max-parallel targets run at the same time (DEFAULT -> 8)
 
 EXAMPLES:
         python3 guardduty_tester.py
@@ -48,6 +64,10 @@ EXAMPLES:
         python3 guardduty_tester.py --ec2 --eks --tactics backdoor policy execution
         python3 guardduty_tester.py --eks --runtime only
         python3 guardduty_tester.py --ec2 --runtime only --tactics impact
+        python3 guardduty_tester.py --ecs-fargate --ecs-prebuilt-image
+        python3 guardduty_tester.py --s3 --verify-findings 20
+        python3 guardduty_tester.py --all --yes --regions us-east-1 us-west-2 eu-west-1
+        python3 guardduty_tester.py --s3 --yes --ou ou-abcd-12345678 --role-name GuardDutyTesterFanout
         python3 guardduty_tester.py --finding 'CryptoCurrency:EC2/BitcoinTool.B!DNS'                                        
          '''))
     
@@ -99,6 +119,17 @@ EXAMPLES:
     parser.add_argument('--tactics', nargs='*', type=str, choices=tactics, default=tactics, help='Declare tactics flag followed by one or more of options above to specify which finding type(s) to generate')
     parser.add_argument('--log-source', nargs='*', type=str, choices=log_sources, default=None, help='Declare log-sources flag followed by one or more of options above to specify which finding type(s) to generate')
     parser.add_argument('--yes', action='store_true', default=False, help='Assume "yes" for all configuration prompts')
+    parser.add_argument('--verify-findings', nargs='?', type=int, const=30, default=None, metavar='MINUTES', help='After the tests, wait up to MINUTES (default 30) for the expected findings and report which were generated')
+    parser.add_argument('--history-file', type=str, default=RunHistory.DEFAULT_PATH, help=f'Append-only run history file. Default: {RunHistory.DEFAULT_PATH}')
+    parser.add_argument('--regions', nargs='+', type=str, default=None, help='Run the tester concurrently in each of the given regions, on the driver host deployed in that region')
+    parser.add_argument('--accounts', nargs='+', type=str, default=None, help='Run the tester concurrently in each of the given account ids, on the driver host deployed in that account')
+    parser.add_argument('--ou', type=str, default=None, help='Run the tester in every active account of the given Organizations OU (and the OUs below it)')
+    parser.add_argument('--role-name', type=str, default='OrganizationAccountAccessRole', help='Role assumed in each account of --accounts/--ou. Default: OrganizationAccountAccessRole')
+    parser.add_argument('--max-parallel', type=int, default=RemoteFanout.MAX_PARALLEL, help=f'Maximum number of accounts/regions tested at the same time. Default: {RemoteFanout.MAX_PARALLEL}')
+    parser.add_argument('--consents', type=str, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--fanout-summary', action='store_true', default=False, help=argparse.SUPPRESS)
+    parser.add_argument('--trace-api', nargs='?', type=str, const='api_trace.json', default=None, metavar='FILE', help='Trace the AWS API calls of the run to FILE (default api_trace.json, Chrome trace format) and print a latency histogram per operation at exit')
+    parser.add_argument('--ecs-prebuilt-image', action='store_true', default=False, help='Run ECS runtime tests from a tester image built once and cached in ECR')
 
     args = parser.parse_args()
 
@@ -120,6 +151,25 @@ EXAMPLES:
     return args
 
 
+'''
+arguments for a worker of a multi account/region run: the same as given, without the fan out options
+'''
+def remote_worker_args(argv: List[str]) -> List[str]:
+    fanout_options = ['--regions', '--accounts', '--ou', '--role-name', '--max-parallel']
+    worker_args = []
+    skipping = False
+    for arg in argv:
+        option = arg.split('=', 1)[0]
+        if option in fanout_options:
+            skipping = '=' not in arg
+            continue
+        if skipping and not arg.startswith('-'):
+            continue
+        skipping = False
+        worker_args.append(arg)
+    return worker_args
+
+
 '''
 guardduty tester main method
 accepts user given parameters
@@ -130,8 +180,24 @@ runs and returns account back to original state
 if __name__ == '__main__':
     args = parse_args()
 
-    settings = SettingsManager()
+    if args.trace_api:
+        tracer = ApiTracer(args.trace_api)
+        aws_clients.trace(tracer)
+        atexit.register(tracer.finish)
+
+    # multi account/region run -> ask permissions once then run the tester on each target's driver host
+    if args.regions or args.accounts or args.ou:
+        settings = SettingsManager()
+        settings.load_test_settings(args)
+        consents = settings.gather_consents()
+        accounts = (args.accounts or []) + (organization_accounts(args.ou) if args.ou else [])
+        targets = fanout_targets(accounts, args.regions, args.role_name)
+        fanout = RemoteFanout(targets, remote_worker_args(sys.argv[1:]), consents, args.max_parallel)
+        sys.exit(fanout.run())
+
     tester = TestBuilder()
+    # one test catalog per run, the settings manager selects from it as well
+    settings = SettingsManager(tester.tests.catalog)
 
     '''
     function to handle graceful exit if any signal that would end the process recieved
@@ -149,6 +215,16 @@ if __name__ == '__main__':
     settings.set_test_settings(args)
     
     tester.build_testing_script(settings.test_settings)
-    tester.run_test_script()
+    tester.run_test_script(settings.confirm_eks_runtime)
+
+    if args.verify_findings:
+        tester.verify_findings(settings.accnt_state['detector_id'], args.verify_findings)
+
+    tester.record_history(args.history_file)
+    if tester.tests.definitions:
+        print(f'Scenario timeline of this run: python3 event_timeline.py --run-id {tester.tests.run_id}')
+
+    if args.fanout_summary:
+        print(SUMMARY_MARKER + json.dumps(tester.summary()), file=sys.stderr)
 
     settings.reset_settings()
@@ -0,0 +1,179 @@
+#Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License").
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  or in the "license" file accompanying this file. This file is distributed
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+#  express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+
+import argparse
+import numpy as np
+from typing import Dict, List, NamedTuple
+from run_history import RunHistory
+
+
+PERCENTILES = (50, 95, 99)
+
+
+'''
+Verified run history records as column arrays
+types holds the distinct finding types, type_idx indexes into it per record
+run_idx is the chronological position of the record's run (runs are appended in order)
+latency is NaN for missed findings
+'''
+class HistoryColumns(NamedTuple):
+    types: np.ndarray
+    type_idx: np.ndarray
+    run_idx: np.ndarray
+    detected: np.ndarray
+    latency: np.ndarray
+
+
+'''
+Per finding type aggregates, every array is indexed like HistoryColumns.types
+'''
+class TypeStats(NamedTuple):
+    runs: np.ndarray
+    rate: np.ndarray
+    percentiles: Dict[int, np.ndarray]
+
+
+'''
+Loads the records of verified runs (detected/missed) into column arrays
+'''
+def load_columns(path: str) -> HistoryColumns:
+    run_order = {}
+    seen = set()
+    types, run_ids, detected, latency = [], [], [], []
+    for r in RunHistory(path).records():
+        if r['outcome'] not in ('detected', 'missed'):
+            continue
+        # older stores hold one record per test, a finding type counts once per run
+        if (r['run_id'], r['finding_type']) in seen:
+            continue
+        seen.add((r['run_id'], r['finding_type']))
+        run_order.setdefault(r['run_id'], len(run_order))
+        types.append(r['finding_type'])
+        run_ids.append(run_order[r['run_id']])
+        detected.append(r['outcome'] == 'detected')
+        latency.append(r['latency'] if r['latency'] is not None else np.nan)
+
+    unique_types, type_idx = np.unique(np.array(types, dtype=object).astype(str), return_inverse=True)
+    return HistoryColumns(unique_types, type_idx, np.array(run_ids, dtype=np.int64),
+                          np.array(detected, dtype=bool), np.array(latency, dtype=np.float64))
+
+
+'''
+Detection rate and time to detection percentiles per finding type over the masked records
+Percentiles use linear interpolation (numpy's default) computed for all types at once
+over the latencies sorted by (type, latency); types without detections get NaN
+'''
+def aggregate(cols: HistoryColumns, mask: np.ndarray) -> TypeStats:
+    n = len(cols.types)
+    idx = cols.type_idx[mask]
+    runs = np.bincount(idx, minlength=n)
+    hits = np.bincount(idx, weights=cols.detected[mask], minlength=n)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rate = hits / runs
+
+    found = mask & cols.detected
+    order = np.lexsort((cols.latency[found], cols.type_idx[found]))
+    values = cols.latency[found][order]
+    counts = np.bincount(cols.type_idx[found], minlength=n)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    has = counts > 0
+
+    percentiles = {}
+    for q in PERCENTILES:
+        pos = q / 100 * np.maximum(counts - 1, 0)
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.ceil(pos).astype(np.int64)
+        out = np.full(n, np.nan)
+        if has.any():
+            low = values[starts[has] + lo[has]]
+            high = values[starts[has] + hi[has]]
+            out[has] = low + (high - low) * (pos[has] - lo[has])
+        percentiles[q] = out
+
+    return TypeStats(runs, rate, percentiles)
+
+
+'''
+Finding types that regressed in the most recent runs compared to the runs before them
+    - detection rate dropped by more than rate_drop (a type no longer generated drops to 0)
+    - p95 time to detection grew by more than latency_growth times
+'''
+def regressions(cols: HistoryColumns, recent_runs: int, baseline_runs: int,
+                rate_drop: float, latency_growth: float) -> List[str]:
+    total = int(cols.run_idx.max()) + 1 if len(cols.run_idx) else 0
+    if total <= recent_runs:
+        return []
+
+    split = total - recent_runs
+    recent = aggregate(cols, cols.run_idx >= split)
+    baseline = aggregate(cols, (cols.run_idx < split) & (cols.run_idx >= split - baseline_runs))
+
+    compared = (recent.runs > 0) & (baseline.runs > 0)
+    with np.errstate(invalid='ignore'):
+        dropped = compared & (baseline.rate - recent.rate > rate_drop)
+        slower = compared & (recent.percentiles[95] > baseline.percentiles[95] * latency_growth)
+
+    flagged = []
+    for i in np.flatnonzero(dropped | slower):
+        reasons = []
+        if dropped[i]:
+            reasons.append(f'detection rate {baseline.rate[i]:.0%} -> {recent.rate[i]:.0%}')
+        if slower[i]:
+            reasons.append(f'p95 {format_seconds(baseline.percentiles[95][i])} -> {format_seconds(recent.percentiles[95][i])}')
+        flagged.append(f'{cols.types[i]}: {", ".join(reasons)}')
+    return flagged
+
+
+def format_seconds(value: float) -> str:
+    if np.isnan(value):
+        return '-'
+    return f'{int(value // 60)}m {int(value % 60):02d}s'
+
+
+def print_report(cols: HistoryColumns, stats: TypeStats, flagged: List[str]) -> None:
+    width = max([len(t) for t in cols.types] + [len('Finding Type')])
+    header = ''.join(f'{"p" + str(q):>10}' for q in PERCENTILES)
+    print(f'{"Finding Type":<{width}}  {"Runs":>5}  {"Detected":>8}{header}')
+    for i, finding_type in enumerate(cols.types):
+        row = ''.join(f'{format_seconds(stats.percentiles[q][i]):>10}' for q in PERCENTILES)
+        print(f'{finding_type:<{width}}  {stats.runs[i]:>5}  {stats.rate[i]:>8.0%}{row}')
+
+    print()
+    if flagged:
+        print('Regressions:')
+        for line in flagged:
+            print(f'    {line}')
+    else:
+        print('No regressions against the baseline window')
+
+
+'''
+Reports time to detection percentiles and detection rate per finding type from the
+run history store and flags regressions of the latest runs against a baseline window
+'''
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Analyze GuardDuty tester run history')
+    parser.add_argument('--history-file', type=str, default=RunHistory.DEFAULT_PATH, help='Run history file written by guardduty_tester.py')
+    parser.add_argument('--recent-runs', type=int, default=3, help='Number of latest verified runs compared against the baseline. Default: 3')
+    parser.add_argument('--baseline-runs', type=int, default=20, help='Number of verified runs before the recent ones used as baseline. Default: 20')
+    parser.add_argument('--rate-drop', type=float, default=0.2, help='Flag a detection rate drop larger than this fraction. Default: 0.2')
+    parser.add_argument('--latency-growth', type=float, default=1.5, help='Flag a p95 time to detection growth larger than this factor. Default: 1.5')
+    args = parser.parse_args()
+
+    cols = load_columns(args.history_file)
+    if not len(cols.types):
+        print('No verified runs in history, run the tester with --verify-findings to record detections')
+    else:
+        stats = aggregate(cols, np.ones(len(cols.type_idx), dtype=bool))
+        flagged = regressions(cols, args.recent_runs, args.baseline_runs, args.rate_drop, args.latency_growth)
+        print_report(cols, stats, flagged)
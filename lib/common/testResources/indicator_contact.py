@@ -0,0 +1,256 @@
+#Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License").
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  or in the "license" file accompanying this file. This file is distributed
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+#  express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+
+# Standard library only (and dns_traffic, which is too): this module is also piped to python3
+# inside ECS tasks, EKS pods and the Debian host, where no tester dependencies are installed,
+# the scripts write dns_traffic.py next to it first
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import itertools
+from typing import List, NamedTuple, Optional, Tuple
+from dns_traffic import DnsQueryEngine, TrafficReport, system_resolver
+
+
+BOUNDARY = 'gdtesterboundary'
+
+
+'''
+Outcome of contacting a single indicator
+dns is the resolved address ('ip' when the indicator is an address) or the lookup error
+queries is the report of the DNS query burst sent for a domain indicator (None for addresses)
+connect is 'connected', 'timeout', 'refused' or the connection error
+status is the HTTP status line when the indicator answered
+'''
+class ContactResult(NamedTuple):
+    indicator: str
+    dns: str
+    queries: Optional[TrafficReport]
+    connect: str
+    status: Optional[str]
+    elapsed: float
+
+
+'''
+Splits an indicator (domain or ip, optionally with :port) into host and port
+'''
+def parse_indicator(indicator: str, default_port: int = 80) -> Tuple[str, int]:
+    host, _, port = indicator.partition(':')
+    return host, int(port) if port else default_port
+
+
+def is_address(host: str) -> bool:
+    try:
+        socket.inet_aton(host)
+        return True
+    except OSError:
+        return False
+
+
+'''
+IndicatorContactEngine contacts threat intel indicators concurrently from one asyncio loop
+For every indicator it resolves the domain through the host's resolver, connects with
+a connect timeout and posts a file upload, the whole contact bounded by a per indicator
+deadline. The multipart body (a random 1 KB payload) is built once and shared by all requests
+Alongside the contact, a domain indicator is queried in a short burst by the DNS traffic
+engine (dns_traffic.DnsQueryEngine) through the host's resolver
+'''
+class IndicatorContactEngine:
+    CONNECT_TIMEOUT = 1.0
+    DEADLINE = 5.0
+    CONCURRENCY = 64
+    PAYLOAD_SIZE = 1024
+    DNS_QUERIES = 20
+    DNS_QPS = 10.0
+
+    def __init__(self, connect_timeout: float = CONNECT_TIMEOUT, deadline: float = DEADLINE,
+                 concurrency: int = CONCURRENCY, dns_queries: int = DNS_QUERIES) -> None:
+        self.connect_timeout = connect_timeout
+        self.deadline = deadline
+        self.concurrency = max(1, concurrency)
+        self.dns_queries = dns_queries
+        self.dns = DnsQueryEngine(system_resolver(), qps=self.DNS_QPS)
+        self.body = (
+            f'--{BOUNDARY}\r\n'
+            'Content-Disposition: form-data; name="file"; filename="PAYLOAD"\r\n'
+            'Content-Type: application/octet-stream\r\n\r\n'
+        ).encode() + os.urandom(self.PAYLOAD_SIZE) + f'\r\n--{BOUNDARY}--\r\n'.encode()
+
+
+    def run(self, indicators: List[str]) -> List[ContactResult]:
+        return asyncio.run(self.contact_all(indicators))
+
+
+    async def contact_all(self, indicators: List[str]) -> List[ContactResult]:
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(indicator: str) -> ContactResult:
+            async with slots:
+                return await self.contact(indicator)
+
+        return list(await asyncio.gather(*(bounded(i) for i in indicators)))
+
+
+    async def contact(self, indicator: str) -> ContactResult:
+        start = time.monotonic()
+        result = {'dns': '-', 'connect': '-', 'status': None}
+
+        async def bounded_exchange() -> None:
+            try:
+                await asyncio.wait_for(self.exchange(indicator, result), self.deadline)
+            except asyncio.TimeoutError:
+                if result['connect'] == '-':
+                    result['connect'] = 'timeout'
+
+        _, queries = await asyncio.gather(bounded_exchange(), self.query_burst(indicator))
+        return ContactResult(indicator, result['dns'], queries, result['connect'], result['status'], time.monotonic() - start)
+
+
+    '''
+    Queries a domain indicator dns_queries times, returns None for addresses or when no queries are sent
+    '''
+    async def query_burst(self, indicator: str) -> Optional[TrafficReport]:
+        host, _ = parse_indicator(indicator)
+        if is_address(host) or self.dns_queries <= 0:
+            return None
+        try:
+            return await self.dns.send_all(itertools.repeat(host), self.dns_queries, None)
+        except OSError:
+            # no usable resolver, the lookup of the contact still queries the domain
+            return None
+
+
+    '''
+    Resolves, connects and posts the payload, recording each step's outcome in result
+    '''
+    async def exchange(self, indicator: str, result: dict) -> None:
+        host, port = parse_indicator(indicator)
+        loop = asyncio.get_running_loop()
+
+        if is_address(host):
+            address = host
+            result['dns'] = 'ip'
+        else:
+            try:
+                infos = await loop.getaddrinfo(host, port, family=socket.AF_INET, type=socket.SOCK_STREAM)
+            except socket.gaierror as e:
+                result['dns'] = e.strerror or 'lookup failed'
+                return
+            address = infos[0][4][0]
+            result['dns'] = address
+
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(address, port), self.connect_timeout)
+        except asyncio.TimeoutError:
+            result['connect'] = 'timeout'
+            return
+        except ConnectionRefusedError:
+            result['connect'] = 'refused'
+            return
+        except OSError as e:
+            result['connect'] = e.strerror or type(e).__name__
+            return
+
+        result['connect'] = 'connected'
+        try:
+            writer.write((
+                f'POST /sample.dat HTTP/1.1\r\n'
+                f'Host: {host}\r\n'
+                f'Content-Type: multipart/form-data; boundary={BOUNDARY}\r\n'
+                f'Content-Length: {len(self.body)}\r\n'
+                'Connection: close\r\n\r\n'
+            ).encode())
+            writer.write(self.body)
+            await writer.drain()
+            status = await reader.readline()
+            result['status'] = status.decode(errors='replace').strip() or None
+        except OSError:
+            pass
+        finally:
+            writer.close()
+
+
+def query_summary(queries: Optional[TrafficReport]) -> str:
+    if queries is None:
+        return '-'
+    return f'{queries.answered}/{queries.sent} ' + (','.join(sorted(queries.rcodes)) or 'unanswered')
+
+
+def print_results(results: List[ContactResult]) -> None:
+    width = max([len(r.indicator) for r in results] + [len('Indicator')]) + 2
+    dns_width = max([len(r.dns) for r in results] + [len('DNS')]) + 2
+    query_width = max([len(query_summary(r.queries)) for r in results] + [len('Queries')]) + 2
+    print(f'{"Indicator":<{width}}{"DNS":<{dns_width}}{"Queries":<{query_width}}{"Connect":<12}{"Time":>6}  Response')
+    for r in results:
+        print(f'{r.indicator:<{width}}{r.dns:<{dns_width}}{query_summary(r.queries):<{query_width}}'
+              f'{r.connect:<12}{r.elapsed:>5.1f}s  {r.status or "-"}')
+    sys.stdout.flush()
+
+
+'''
+Records the result of every indicator as an 'indicator' event of the test, in the run's events file
+($GD_EVENTS) or on stdout behind the event marker where no events file is set, like gd_event
+'''
+def record_results(results: List[ContactResult], test: int, space: str, scenario: str) -> None:
+    with open('/proc/uptime') as f:
+        mono = float(f.read().split()[0])
+    lines = []
+    for r in results:
+        lines.append(json.dumps({
+            'run': os.environ.get('GD_RUN_ID', ''),
+            'test': test,
+            'space': space,
+            'event': 'indicator',
+            'scenario': scenario,
+            'indicator': r.indicator,
+            'dns': r.dns,
+            'queries': r.queries._asdict() if r.queries else None,
+            'connect': r.connect,
+            'status': r.status,
+            'elapsed': round(r.elapsed, 3),
+            'ts': time.time(),
+            'mono': mono,
+        }, separators=(',', ':')))
+
+    if os.environ.get('GD_EVENTS'):
+        with open(os.environ['GD_EVENTS'], 'a') as f:
+            f.write(''.join(line + '\n' for line in lines))
+    else:
+        print(''.join(f'GD_EVENT {line}\n' for line in lines), end='', flush=True)
+
+
+'''
+Contacts the given threat intel indicators (domain or ip, optionally :port) concurrently
+'''
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Concurrent threat intel indicator contact')
+    parser.add_argument('indicators', nargs='+', help='Indicators to contact, domain or ip with an optional :port')
+    parser.add_argument('--connect-timeout', type=float, default=IndicatorContactEngine.CONNECT_TIMEOUT, help='Seconds to wait for a connection. Default: 1')
+    parser.add_argument('--deadline', type=float, default=IndicatorContactEngine.DEADLINE, help='Seconds allowed per indicator. Default: 5')
+    parser.add_argument('--concurrency', type=int, default=IndicatorContactEngine.CONCURRENCY, help='Indicators contacted at once. Default: 64')
+    parser.add_argument('--dns-queries', type=int, default=IndicatorContactEngine.DNS_QUERIES, help='DNS queries sent per domain indicator. Default: 20')
+    parser.add_argument('--test', type=int, default=None, help='Test number to record the results under as events of the run')
+    parser.add_argument('--space', type=str, default='host', help='Execution space of the recorded events. Default: host')
+    parser.add_argument('--scenario', type=str, default='threatIntel/request.sh', help='Scenario of the recorded events. Default: threatIntel/request.sh')
+    args = parser.parse_args()
+
+    engine = IndicatorContactEngine(args.connect_timeout, args.deadline, args.concurrency, args.dns_queries)
+    results = engine.run(args.indicators)
+    print_results(results)
+    if args.test is not None:
+        record_results(results, args.test, args.space, args.scenario)
@@ -0,0 +1,142 @@
+#Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License").
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  or in the "license" file accompanying this file. This file is distributed
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+#  express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
+import aws_clients
+import tester_vars as vars
+
+
+'''
+Outcome of a batch of invocations, packets/bytes/send_errors are the totals the
+handler reported (only known for synchronous invocations)
+'''
+class InvocationReport(NamedTuple):
+    invoked: int
+    failed: int
+    packets: int
+    bytes: int
+    send_errors: int
+    elapsed: float
+
+    @property
+    def rate(self) -> float:
+        return self.invoked / self.elapsed if self.elapsed else 0.0
+
+
+'''
+LambdaInvoker invokes the tester function concurrently through the shared lambda client
+    - invocations are started at a target rate (rate <= 0 starts them all at once)
+      and at most concurrency are in flight
+    - asynchronous (Event) invocations only wait for Lambda to accept the request,
+      synchronous ones wait for the handler and sum the packet counts it returns
+The payload tells the handler where to send its traffic, see tester_lambda.lambda_handler
+'''
+class LambdaInvoker:
+    CONCURRENCY = 16
+
+    def __init__(self, function_name: str, payload: dict, invocations: int = 1, rate: float = 0,
+                 concurrency: int = CONCURRENCY, wait: bool = False) -> None:
+        self.function_name = function_name
+        self.payload = json.dumps(payload).encode()
+        self.invocations = invocations
+        self.rate = rate
+        self.concurrency = max(1, concurrency)
+        self.invocation_type = 'RequestResponse' if wait else 'Event'
+
+
+    def run(self) -> InvocationReport:
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = []
+            for i in range(self.invocations):
+                if self.rate > 0:
+                    delay = start + i / self.rate - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                futures.append(pool.submit(self.invoke))
+            results = [f.result() for f in futures]
+
+        counts = [r for r in results if r is not None]
+        return InvocationReport(
+            len(counts),
+            len(results) - len(counts),
+            sum(c.get('packets', 0) for c in counts),
+            sum(c.get('bytes', 0) for c in counts),
+            sum(c.get('errors', 0) for c in counts),
+            time.monotonic() - start,
+        )
+
+
+    '''
+    Invokes the function once, returns the handler's counts (empty for Event invocations) or None on failure
+    '''
+    def invoke(self) -> Optional[dict]:
+        try:
+            response = aws_clients.client('lambda').invoke(
+                FunctionName=self.function_name,
+                InvocationType=self.invocation_type,
+                Payload=self.payload,
+            )
+        except Exception as e:
+            print(f'Lambda invocation failed: {e}')
+            return None
+
+        if response.get('FunctionError'):
+            print(f"Lambda invocation failed: {response['Payload'].read().decode(errors='replace')}")
+            return None
+        if self.invocation_type == 'Event':
+            return {}
+        return json.loads(response['Payload'].read() or b'{}') or {}
+
+
+def print_report(report: InvocationReport, wait: bool) -> None:
+    print(f'Lambda invocations: {report.invoked} succeeded, {report.failed} failed '
+          f'in {report.elapsed:.1f}s ({report.rate:.1f} invocations/s)')
+    if wait:
+        print(f'    handler sent {report.packets} packets, {report.bytes} bytes, {report.send_errors} send errors')
+    sys.stdout.flush()
+
+
+'''
+Invokes the tester Lambda function to generate Lambda network activity
+'''
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Concurrent tester Lambda function invocation')
+    parser.add_argument('--ip', type=str, required=True, help='Address the function sends traffic to')
+    parser.add_argument('--port', type=int, required=True, help='Port the function sends traffic to')
+    parser.add_argument('--function-name', type=str, default=vars.LAMBDA_NAME, help='Function to invoke. Default: the tester function')
+    parser.add_argument('--invocations', type=int, default=1, help='Number of invocations. Default: 1')
+    parser.add_argument('--rate', type=float, default=0, help='Invocations started per second, 0 for no limit. Default: 0')
+    parser.add_argument('--concurrency', type=int, default=LambdaInvoker.CONCURRENCY, help=f'Invocations in flight at once. Default: {LambdaInvoker.CONCURRENCY}')
+    parser.add_argument('--packets', type=int, default=1, help='Packets sent per invocation. Default: 1')
+    parser.add_argument('--packet-size', type=int, default=1024, help='Bytes per packet. Default: 1024')
+    parser.add_argument('--packet-rate', type=float, default=0, help='Packets per second within an invocation, 0 for no limit. Default: 0')
+    parser.add_argument('--tcp', action='store_true', help='Send over one TCP connection per invocation instead of UDP')
+    parser.add_argument('--wait', action='store_true', help='Invoke synchronously and report the packets the handler sent')
+    args = parser.parse_args()
+
+    payload = {
+        'ip': args.ip,
+        'port': args.port,
+        'packets': args.packets,
+        'size': args.packet_size,
+        'rate': args.packet_rate,
+        'protocol': 'tcp' if args.tcp else 'udp',
+    }
+    invoker = LambdaInvoker(args.function_name, payload, args.invocations, args.rate, args.concurrency, args.wait)
+    print_report(invoker.run(), args.wait)
@@ -0,0 +1,222 @@
+#Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License").
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  or in the "license" file accompanying this file. This file is distributed
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+#  express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+from typing import Callable, Dict, List, NamedTuple, Optional
+import aws_fakes
+
+# the tester modules read tester_vars at import, the stand-in is used away from the driver host
+aws_fakes.install_vars()
+
+from aws_fakes import FakeAccount
+from settings_manager import SettingsManager
+from test_builder import TestBuilder
+import guardduty_tester
+
+
+'''
+Command lines timed from argument parsing to a ready test script
+'''
+COMMAND_LINES = {
+    '--all': ['--all', '--yes'],
+    '--ec2 --runtime only': ['--ec2', '--runtime', 'only', '--yes'],
+    '--finding (single)': ['--finding', 'CryptoCurrency:EC2/BitcoinTool.B!DNS', '--yes'],
+}
+
+
+'''
+Best wall time over the repeats, API calls and peak traced memory of one run
+'''
+class BenchmarkResult(NamedTuple):
+    name: str
+    ms: float
+    calls: int
+    peak_kib: float
+
+
+'''
+Grows the published definitions into a synthetic catalog of the requested size
+Copies keep their scenario alias (so the scenario scripts resolve) and differ in their description
+'''
+def grow_catalog(definitions: List[dict], size: int) -> List[dict]:
+    catalog = []
+    copy = 0
+    while len(catalog) < size:
+        for d in definitions[:size - len(catalog)]:
+            synthetic = dict(d)
+            if copy:
+                synthetic['description'] = f"{d['description']} #{copy}"
+            catalog.append(synthetic)
+        copy += 1
+    return catalog
+
+
+'''
+Runs a benchmark against a fresh fake account per repeat
+setup prepares the state the timed step starts from (not timed), run is the timed step
+The best time over the repeats is reported, calls and peak memory come from one more
+run under tracemalloc (kept apart as tracing slows the run down)
+'''
+def measure(name: str, setup: Callable[[FakeAccount], object], run: Callable[[object], None],
+            account: Callable[[], FakeAccount], repeat: int) -> BenchmarkResult:
+    best = float('inf')
+    for _ in range(repeat):
+        fake = account()
+        aws_fakes.install(fake)
+        state = setup(fake)
+        start = time.perf_counter()
+        run(state)
+        best = min(best, time.perf_counter() - start)
+
+    fake = account()
+    aws_fakes.install(fake)
+    state = setup(fake)
+    calls_before = sum(fake.calls.values())
+    tracemalloc.start()
+    run(state)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return BenchmarkResult(name, best * 1000, sum(fake.calls.values()) - calls_before, peak / 1024)
+
+
+'''
+Parses a tester command line and loads its settings without reading the account
+'''
+def parse(argv: List[str]):
+    sys.argv = ['guardduty_tester.py', *argv]
+    return guardduty_tester.parse_args()
+
+
+def plan(argv: List[str]) -> None:
+    args = parse(argv)
+    settings = SettingsManager()
+    settings.set_test_settings(args)
+    tester = TestBuilder()
+    tester.build_testing_script(settings.test_settings)
+    if settings.eks_agent:
+        settings.eks_agent.thread.join()
+
+
+def configured_settings(argv: List[str]) -> SettingsManager:
+    settings = SettingsManager()
+    settings.set_test_settings(parse(argv))
+    if settings.eks_agent:
+        settings.eks_agent.thread.join()
+    return settings
+
+
+def run_benchmarks(sizes: List[int], repeat: int, latency: float, published: List[dict]) -> List[BenchmarkResult]:
+    all_args = parse(COMMAND_LINES['--all'])
+
+    def disabled() -> FakeAccount:
+        return FakeAccount(latency=latency)
+
+    def enabled() -> FakeAccount:
+        return FakeAccount(features_enabled=True, pwd_policy={'MinimumPasswordLength': 8, 'RequireSymbols': False,
+                           'RequireNumbers': False, 'RequireUppercaseCharacters': False, 'RequireLowercaseCharacters': False},
+                           pub_block={'BlockPublicAcls': False}, latency=latency)
+
+    results = []
+    for name, argv in COMMAND_LINES.items():
+        results.append(measure(f'plan {name}', lambda fake: argv, plan, disabled, repeat))
+
+    results.append(measure('set_test_settings (features disabled)', lambda fake: SettingsManager(),
+                           lambda settings: settings.set_test_settings(all_args), disabled, repeat))
+    results.append(measure('set_test_settings (features enabled)', lambda fake: SettingsManager(),
+                           lambda settings: settings.set_test_settings(all_args), enabled, repeat))
+    results.append(measure('reset_settings (after --all)', lambda fake: configured_settings(COMMAND_LINES['--all']),
+                           lambda settings: settings.reset_settings(), disabled, repeat))
+
+    for size in sizes:
+        with open('definitions.json', 'w') as f:
+            json.dump({'definitions': grow_catalog(published, size)}, f)
+        test_settings = configured_settings(COMMAND_LINES['--all']).test_settings
+        results.append(measure(f'build_testing_script ({size} tests)', lambda fake: TestBuilder(),
+                               lambda tester: tester.build_testing_script(test_settings), disabled, repeat))
+    return results
+
+
+'''
+Prints the results, against the baseline when given, and returns the names of the
+benchmarks that regressed: slower or larger than the baseline by more than the
+tolerance, or making more API calls than it
+'''
+def report(results: List[BenchmarkResult], baseline: Optional[Dict[str, dict]], tolerance: float) -> List[str]:
+    regressions = []
+    width = max(len(r.name) for r in results) + 2
+    header = f'{"benchmark":<{width}}{"ms":>10}{"calls":>7}{"peak KiB":>10}'
+    print(header + (f'{"base ms":>10}{"delta":>8}{"base calls":>11}{"base KiB":>10}' if baseline else ''))
+
+    for r in results:
+        line = f'{r.name:<{width}}{r.ms:>10.2f}{r.calls:>7}{r.peak_kib:>10.0f}'
+        base = (baseline or {}).get(r.name)
+        if base:
+            delta = r.ms / base['ms'] - 1 if base['ms'] else 0.0
+            regressed = (delta > tolerance or r.calls > base['calls']
+                         or r.peak_kib > base['peak_kib'] * (1 + tolerance))
+            line += f"{base['ms']:>10.2f}{delta:>+8.0%}{base['calls']:>11}{base['peak_kib']:>10.0f}"
+            if regressed:
+                line += '  REGRESSION'
+                regressions.append(r.name)
+        print(line)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark the tester planning and orchestration paths against local AWS stand-ins')
+    parser.add_argument('--sizes', nargs='*', type=int, default=[107, 1000, 10000], help='Catalog sizes for the script build benchmark')
+    parser.add_argument('--repeat', type=int, default=5, help='Repeats per measurement, best time is reported. Default: 5')
+    parser.add_argument('--latency', type=float, default=0, help='Milliseconds each stand-in API call takes. Default: 0')
+    parser.add_argument('--baseline', type=str, default=None, help='Compare against the results saved in this file')
+    parser.add_argument('--save-baseline', type=str, default=None, help='Save the results to this file')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed slowdown/growth over the baseline. Default: 0.2')
+    args = parser.parse_args()
+
+    with open('definitions.json') as f:
+        published = json.load(f)['definitions']
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    # scripts are generated into a scratch copy of the tester directory, the prompts and banners are silenced
+    source = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='gd-benchmark-') as scratch:
+        workdir = os.path.join(scratch, 'py_tester')
+        shutil.copytree(source, workdir, ignore=shutil.ignore_patterns('__pycache__', 'events', '*.jsonl', '*.json.gz'))
+        os.chdir(workdir)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = run_benchmarks(args.sizes, args.repeat, args.latency / 1000, published)
+        finally:
+            os.chdir(source)
+
+    regressions = report(results, baseline, args.tolerance)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({r.name: r._asdict() for r in results}, f, indent=2)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
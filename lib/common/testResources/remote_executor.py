@@ -0,0 +1,190 @@
+#Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License").
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  or in the "license" file accompanying this file. This file is distributed
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+#  express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+
+import sys
+import time
+import threading
+from typing import Dict, List, NamedTuple, Optional
+from event_timeline import EventCollector
+import aws_clients
+import tester_vars as vars
+
+
+'''
+Exit code of one scenario of the remote script, from its end event (None when it never ended)
+'''
+class RemoteScenario(NamedTuple):
+    test: int
+    scenario: str
+    exit: Optional[int]
+
+
+'''
+Outcome of the remote script, status is the final SSM command invocation status
+'''
+class RemoteResult(NamedTuple):
+    command_id: str
+    status: str
+    duration: float
+    scenarios: List[RemoteScenario]
+
+
+'''
+RemoteExecutor runs a generated remote script (uploaded by Tests.upload_file) on an instance
+through SSM Run Command and follows it to the end
+    - start sends the command and follows it from a background thread, so the script runs
+      (and its output shows up) while the local tests do
+    - the thread polls the command invocation with backoff until it reaches a terminal state,
+      streaming stdout and stderr from CloudWatch Logs on every poll
+    - wait joins the thread, falling back to the (truncated) output of the invocation when
+      no log stream could be read
+    - the per scenario exit codes come from the events the script uploads when it finishes
+'''
+class RemoteExecutor:
+    DOCUMENT = 'AWS-RunShellScript'
+    PLUGIN = 'aws-runShellScript'
+    LOG_GROUP = 'GuardDuty-Tester-Remote-Output'
+    EXECUTION_TIMEOUT = 2 * 3600
+    MIN_POLL = 2
+    MAX_POLL = 15
+    TERMINAL_STATES = ['Success', 'Cancelled', 'TimedOut', 'Failed']
+
+    def __init__(self, instance_id: str, run_id: str, resource: str = 'ec2', label: str = 'debian') -> None:
+        self.instance_id = instance_id
+        self.run_id = run_id
+        self.resource = resource
+        self.label = label
+        self.command_id = None
+        self.started = None
+        self.log_tokens: Dict[str, Optional[str]] = {'stdout': None, 'stderr': None}
+        self.streamed = False
+        self.invocation = None
+        self.error = None
+        self.thread = threading.Thread(target=self.follow, daemon=True)
+
+
+    def start(self) -> str:
+        command = f'aws s3 cp s3://{vars.S3_BUCKET_NAME}/remote/{self.resource}.sh . && bash {self.resource}.sh'
+        self.command_id = aws_clients.client('ssm').send_command(
+            InstanceIds=[self.instance_id],
+            DocumentName=self.DOCUMENT,
+            Parameters={'commands': [command], 'executionTimeout': [str(self.EXECUTION_TIMEOUT)]},
+            CloudWatchOutputConfig={'CloudWatchLogGroupName': self.LOG_GROUP, 'CloudWatchOutputEnabled': True},
+        )['Command']['CommandId']
+        self.started = time.monotonic()
+        print(f'Running {self.resource}.sh on {self.instance_id} (SSM command {self.command_id})')
+        self.thread.start()
+        return self.command_id
+
+
+    '''
+    Polls the command invocation with backoff until it reaches a terminal state, streaming
+    the command's output on every poll (runs on the background thread)
+    '''
+    def follow(self) -> None:
+        ssm = aws_clients.client('ssm')
+        interval = self.MIN_POLL
+        try:
+            while True:
+                time.sleep(interval)
+                self.stream()
+                try:
+                    invocation = ssm.get_command_invocation(CommandId=self.command_id, InstanceId=self.instance_id)
+                except ssm.exceptions.InvocationDoesNotExist:
+                    # invocation is not registered right after send_command
+                    continue
+                if invocation['Status'] in self.TERMINAL_STATES:
+                    self.invocation = invocation
+                    break
+                interval = min(interval * 2, self.MAX_POLL)
+
+            # the agent delivers the last output lines just before it reports the final status
+            self.stream()
+        except Exception as e:
+            self.error = e
+
+
+    def wait(self) -> RemoteResult:
+        self.thread.join()
+        if self.invocation is None:
+            print(f'Unable to follow the {self.label} script: {self.error}')
+            status = 'Unknown'
+        else:
+            status = self.invocation['Status']
+            if not self.streamed:
+                self.log(self.invocation.get('StandardOutputContent', ''))
+                self.log(self.invocation.get('StandardErrorContent', ''), 'stderr')
+
+        result = RemoteResult(self.command_id, status, time.monotonic() - self.started, self.scenario_exits())
+        print_remote_result(self.label, result)
+        return result
+
+
+    '''
+    Prints the log events written to the command's stdout/stderr streams since the last call
+    '''
+    def stream(self) -> None:
+        logs = aws_clients.client('logs')
+        for name in self.log_tokens:
+            kwargs = {
+                'logGroupName': self.LOG_GROUP,
+                'logStreamName': f'{self.command_id}/{self.instance_id}/{self.PLUGIN}/{name}',
+                'startFromHead': True,
+            }
+            while True:
+                if self.log_tokens[name]:
+                    kwargs['nextToken'] = self.log_tokens[name]
+                try:
+                    page = logs.get_log_events(**kwargs)
+                except logs.exceptions.ResourceNotFoundException:
+                    # the stream is created with the first output
+                    break
+                except Exception as e:
+                    print(f'Unable to stream {self.label} {name}: {e}')
+                    break
+                self.log_tokens[name] = page['nextForwardToken']
+                if not page['events']:
+                    break
+                self.streamed = True
+                self.log('\n'.join(e['message'] for e in page['events']), name)
+
+
+    def log(self, text: str, name: str = 'stdout') -> None:
+        prefix = f'[{self.label}]' if name == 'stdout' else f'[{self.label} {name}]'
+        for line in text.splitlines():
+            print(f'{prefix} {line}')
+        sys.stdout.flush()
+
+
+    def scenario_exits(self) -> List[RemoteScenario]:
+        try:
+            events = EventCollector(self.run_id).debian_events()
+        except Exception as e:
+            print(f'Unable to read the {self.label} scenario events: {e}')
+            return []
+        exits = {}
+        for event in events:
+            key = (event['test'], event['scenario'])
+            if event['event'] == 'end' or key not in exits:
+                exits[key] = event['exit'] if event['event'] == 'end' else None
+        return [RemoteScenario(test, scenario, code) for (test, scenario), code in sorted(exits.items())]
+
+
+def print_remote_result(label: str, result: RemoteResult) -> None:
+    failed = [s for s in result.scenarios if s.exit != 0]
+    print()
+    print(f'{label} script: {result.status} in {int(result.duration // 60)}m {int(result.duration % 60):02d}s, '
+          f'{len(result.scenarios) - len(failed)}/{len(result.scenarios)} scenarios exited 0')
+    for s in failed:
+        status = 'did not finish' if s.exit is None else f'exit {s.exit}'
+        print(f'  Test #{s.test} {s.scenario}: {status}')
@@ -0,0 +1,247 @@
+#Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License").
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  or in the "license" file accompanying this file. This file is distributed
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+#  express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+
+import sys
+import json
+import time
+import shlex
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple, Optional
+import aws_clients
+import tester_vars as vars
+
+
+# marker of the summary line a remote worker writes to stderr (--fanout-summary)
+SUMMARY_MARKER = 'GD_TESTER_SUMMARY '
+
+
+'''
+An account and region to run the tester in, clients is the registry holding
+credentials for the account (the ambient ones, or an assumed role's)
+'''
+class FanoutTarget(NamedTuple):
+    label: str
+    region: str
+    clients: aws_clients.ClientRegistry
+
+
+'''
+Outcome of the tester run on a single target
+'''
+class TargetResult(NamedTuple):
+    label: str
+    status: str
+    duration: float
+    summary: Optional[dict]
+
+
+'''
+Builds the targets for the given accounts and regions (all combinations)
+Accounts are reached by assuming role_name in each of them, no accounts
+means the current account, no regions means the tester region
+'''
+def fanout_targets(accounts: Optional[List[str]], regions: Optional[List[str]], role_name: str) -> List[FanoutTarget]:
+    targets = []
+    for account, region in itertools.product(accounts or [None], regions or [vars.REGION]):
+        if account:
+            clients = aws_clients.for_role(f'arn:aws:iam::{account}:role/{role_name}')
+        else:
+            clients = aws_clients.registry
+        label = '/'.join(x for x in (account, region if regions else None) if x) or region
+        targets.append(FanoutTarget(label, region, clients))
+    return targets
+
+
+'''
+Returns the ids of the active accounts in the given Organizations OU and all OUs below it
+'''
+def organization_accounts(ou_id: str) -> List[str]:
+    org = aws_clients.client('organizations')
+    accounts = []
+    parents = [ou_id]
+    while parents:
+        parent = parents.pop()
+        for page in org.get_paginator('list_accounts_for_parent').paginate(ParentId=parent):
+            accounts += [a['Id'] for a in page['Accounts'] if a['Status'] == 'ACTIVE']
+        for page in org.get_paginator('list_organizational_units_for_parent').paginate(ParentId=parent):
+            parents += [ou['Id'] for ou in page['OrganizationalUnits']]
+    return accounts
+
+
+'''
+RemoteFanout runs the tester on many targets (accounts and/or regions) at once
+Every account and region has its own tester stack, so each target's run happens
+on that target's driver host through SSM Run Command, with that host's tester
+variables, clients, account state and restore step function
+    - consent answers are gathered once by the caller (one per setting and GuardDuty feature)
+      and passed to every worker, a worker never prompts (see SettingsManager.get_user_permission)
+    - targets run concurrently on a bounded pool, the launching host only polls for completion
+    - each target's output is printed with a [target] prefix once it finishes
+    - a combined summary per target and per finding type is printed at the end
+'''
+class RemoteFanout:
+    DRIVER_INSTANCE_NAME = 'Driver-GuardDutyTester'
+    TESTER_DIR = '/home/ssm-user/py_tester'
+    EXECUTION_TIMEOUT = 4 * 3600
+    MAX_PARALLEL = 8
+    MIN_POLL = 5
+    MAX_POLL = 30
+    TERMINAL_STATES = ['Success', 'Cancelled', 'TimedOut', 'Failed']
+    OUTPUT_LIMIT = 24000
+
+    def __init__(self, targets: List[FanoutTarget], argv: List[str], consents: dict,
+                 max_parallel: int = MAX_PARALLEL) -> None:
+        self.targets = targets
+        self.argv = argv + ['--consents', json.dumps(consents), '--fanout-summary']
+        self.max_parallel = max_parallel
+        self.print_lock = threading.Lock()
+
+
+    '''
+    Runs all targets, prints the combined summary
+    and returns 0 if every target's run succeeded
+    '''
+    def run(self) -> int:
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=min(len(self.targets), self.max_parallel)) as pool:
+            results = list(pool.map(self.run_target, self.targets))
+        self.print_summary(results, time.monotonic() - start)
+        self.print_findings(results)
+        return 0 if all(r.status == 'Success' for r in results) else 1
+
+
+    def run_target(self, target: FanoutTarget) -> TargetResult:
+        start = time.monotonic()
+        try:
+            instance_id = self.find_driver(target)
+            self.log(target.label, f'running tester on driver host {instance_id}...')
+            invocation = self.wait(target, instance_id, self.send(target, instance_id))
+        except Exception as e:
+            self.log(target.label, f'unable to run tester: {e}')
+            return TargetResult(target.label, 'Error', time.monotonic() - start, None)
+
+        output = invocation.get('StandardOutputContent', '')
+        self.log(target.label, output)
+        if len(output) >= self.OUTPUT_LIMIT:
+            self.log(target.label, 'NOTE: output truncated by SSM, the full output is in the Run Command history')
+        summary = self.parse_summary(invocation.get('StandardErrorContent', ''))
+        return TargetResult(target.label, invocation['Status'], time.monotonic() - start, summary)
+
+
+    '''
+    Returns the id of the running tester driver host of the target
+    '''
+    def find_driver(self, target: FanoutTarget) -> str:
+        reservations = target.clients.client('ec2', target.region).describe_instances(Filters=[
+            {'Name': 'tag:Name', 'Values': [self.DRIVER_INSTANCE_NAME]},
+            {'Name': 'instance-state-name', 'Values': ['running']},
+        ])['Reservations']
+        instances = [i['InstanceId'] for r in reservations for i in r['Instances']]
+        if not instances:
+            raise Exception(f'no running {self.DRIVER_INSTANCE_NAME} instance, is the tester stack deployed in {target.label}?')
+        return instances[0]
+
+
+    def send(self, target: FanoutTarget, instance_id: str) -> str:
+        command = (f'export PATH=$PATH:/usr/local/bin && cd {self.TESTER_DIR} && '
+                   f'sudo -u ssm-user env PATH=$PATH python3 guardduty_tester.py {shlex.join(self.argv)}')
+        return target.clients.client('ssm', target.region).send_command(
+            InstanceIds=[instance_id],
+            DocumentName='AWS-RunShellScript',
+            Parameters={'commands': [command], 'executionTimeout': [str(self.EXECUTION_TIMEOUT)]},
+        )['Command']['CommandId']
+
+
+    '''
+    Polls the command invocation with backoff until it reaches a terminal state
+    '''
+    def wait(self, target: FanoutTarget, instance_id: str, command_id: str) -> dict:
+        ssm = target.clients.client('ssm', target.region)
+        interval = self.MIN_POLL
+        while True:
+            time.sleep(interval)
+            try:
+                invocation = ssm.get_command_invocation(CommandId=command_id, InstanceId=instance_id)
+            except ssm.exceptions.InvocationDoesNotExist:
+                # invocation is not registered right after send_command
+                continue
+            if invocation['Status'] in self.TERMINAL_STATES:
+                return invocation
+            interval = min(interval * 2, self.MAX_POLL)
+
+
+    def parse_summary(self, stderr: str) -> Optional[dict]:
+        for line in reversed(stderr.splitlines()):
+            if line.startswith(SUMMARY_MARKER):
+                try:
+                    return json.loads(line[len(SUMMARY_MARKER):])
+                except ValueError:
+                    return None
+        return None
+
+
+    '''
+    Prints text with every line prefixed by the target, output of one target is never interleaved with another
+    '''
+    def log(self, label: str, text: str) -> None:
+        with self.print_lock:
+            for line in text.splitlines():
+                print(f'[{label}] {line}')
+            sys.stdout.flush()
+
+
+    def print_summary(self, results: List[TargetResult], elapsed: float) -> None:
+        width = max([len(r.label) for r in results] + [len('Target')]) + 2
+        print()
+        print('***********************************************************************')
+        print(f'{"Target":<{width}}{"Status":<12}{"Duration":>10}{"Tests":>8}  Findings')
+        for r in results:
+            tests, findings = '-', '-'
+            if r.summary:
+                tests = str(r.summary['tests'])
+                verification = r.summary.get('verification')
+                if verification:
+                    observed = sum(1 for v in verification if v['detected'])
+                    findings = f'{observed}/{len(verification)} observed'
+                else:
+                    findings = f'{len(r.summary["expected_findings"])} expected'
+            duration = f'{int(r.duration // 60)}m {int(r.duration % 60):02d}s'
+            print(f'{r.label:<{width}}{r.status:<12}{duration:>10}{tests:>8}  {findings}')
+        print()
+        print(f'{len(results)} target(s) in {int(elapsed // 60)}m {int(elapsed % 60):02d}s')
+        print('***********************************************************************')
+
+
+    '''
+    Per finding type, the targets where it was observed out of the targets that verified it
+    '''
+    def print_findings(self, results: List[TargetResult]) -> None:
+        observed, verified = {}, {}
+        for r in results:
+            for v in (r.summary or {}).get('verification', []):
+                verified.setdefault(v['finding_type'], []).append(r.label)
+                if v['detected']:
+                    observed.setdefault(v['finding_type'], []).append(r.label)
+        if not verified:
+            return
+
+        width = max(len(t) for t in verified) + 2
+        print(f'{"Finding Type":<{width}}{"Observed":>10}  Missing In')
+        for finding_type in sorted(verified):
+            seen = observed.get(finding_type, [])
+            missing = [label for label in verified[finding_type] if label not in seen]
+            ratio = f'{len(seen)}/{len(verified[finding_type])}'
+            print(f'{finding_type:<{width}}{ratio:>10}  {", ".join(missing) or "-"}')
+        print('***********************************************************************')
@@ -0,0 +1,70 @@
+#Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License").
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  or in the "license" file accompanying this file. This file is distributed
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+#  express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+
+import os
+import json
+from datetime import datetime
+from typing import Iterator, List, Optional
+
+
+'''
+RunHistory is an append-only JSON lines store with one record per expected finding per run
+Records of a run are written with a single append so concurrent runs never interleave lines
+
+Record fields:
+    run_id                          - the tester run id, also naming the run's events (events/<run_id>.jsonl)
+    region, account, run_start, finding_type
+    tests                           - the tests expected to generate the finding, each with
+                                      test_num, alias, resource, space (host, debian, ecs-ec2, ecs-fargate, eks)
+                                      and scenario_start, scenario_end (local tests only, remote tests
+                                      run outside the driver)
+    observed_at, latency            - GuardDuty detection time and seconds after run start
+    outcome                         - detected, missed, or unverified (run without --verify-findings)
+'''
+class RunHistory:
+    DEFAULT_PATH = 'run_history.jsonl'
+
+    def __init__(self, path: str = DEFAULT_PATH) -> None:
+        self.path = path
+
+
+    '''
+    Appends the given records as the run with the given id
+    '''
+    def append(self, run_id: str, records: List[dict]) -> None:
+        lines = ''.join(json.dumps({'run_id': run_id, **r}, default=self.encode) + '\n' for r in records)
+        with open(self.path, 'a') as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+    '''
+    Yields all stored records in the order they were written, skipping any partially written line
+    '''
+    def records(self) -> Iterator[dict]:
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            return
+
+
+    def encode(self, value: object) -> Optional[str]:
+        if isinstance(value, datetime):
+            return value.isoformat()
+        raise TypeError(f'{type(value).__name__} is not JSON serializable')
@@ -0,0 +1,111 @@
+#Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License").
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  or in the "license" file accompanying this file. This file is distributed
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+#  express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+
+import os
+import glob
+import shutil
+import hashlib
+import platform
+import subprocess
+from typing import List
+from botocore.exceptions import ClientError
+import aws_clients
+import tester_vars as vars
+
+
+SOURCE_DIR = 'payloads'
+BUILD_DIR = os.path.join(SOURCE_DIR, 'build')
+S3_PREFIX = 'payloads'
+# statically linked, so a binary built on the driver host runs on any target image of the same architecture
+CFLAGS = ['-w', '-static', '-O2']
+
+# gd_payload NAME [FILE] puts the precompiled payload NAME for this machine's architecture at ./FILE
+# (./NAME by default), from the local bundle when the target has one (driver host, EKS image) or
+# else from the tester bucket
+PAYLOAD_FUNCTION = '''gd_payload() {
+  local KEY="$GD_PAYLOAD_VERSION/$(uname -m)/$1"
+  local DEST="./${2:-$1}"
+  if [ -f "${GD_PAYLOAD_DIR:-/gd_payloads}/$KEY" ]; then
+    cp "${GD_PAYLOAD_DIR:-/gd_payloads}/$KEY" "$DEST"
+  else
+    aws s3 cp "s3://$S3_BUCKET_NAME/''' + S3_PREFIX + '''/$KEY" "$DEST" --quiet
+  fi
+  chmod +x "$DEST"
+}
+'''
+
+
+'''
+PayloadBundle holds the compiled runtime scenario payloads (the C programs under payloads/)
+    - the bundle version is a hash of the sources and compiler flags, so the payloads are
+      compiled once per source change instead of by every target on every run
+    - binaries are laid out as <version>/<arch>/<name>, locally under payloads/build and
+      in the tester bucket under payloads/, the driver host builds its own architecture
+    - targets fetch them with gd_payload (see PAYLOAD_FUNCTION), so their images need no compiler
+'''
+class PayloadBundle:
+
+    def __init__(self) -> None:
+        self.sources = sorted(glob.glob(os.path.join(SOURCE_DIR, '*.c')))
+        self.version = self.source_digest()
+        self.arch = platform.machine()
+
+
+    @property
+    def names(self) -> List[str]:
+        return [os.path.splitext(os.path.basename(s))[0] for s in self.sources]
+
+
+    def source_digest(self) -> str:
+        h = hashlib.sha256(' '.join(CFLAGS).encode())
+        for path in self.sources:
+            h.update(os.path.basename(path).encode())
+            with open(path, 'rb') as f:
+                h.update(f.read())
+        return h.hexdigest()[:16]
+
+
+    def local_dir(self) -> str:
+        return os.path.join(BUILD_DIR, self.version, self.arch)
+
+
+    '''
+    Compiles the payloads missing from the local bundle, and drops bundles of older versions
+    '''
+    def build(self) -> None:
+        target = self.local_dir()
+        os.makedirs(target, exist_ok=True)
+        for version in os.listdir(BUILD_DIR):
+            if version != self.version:
+                shutil.rmtree(os.path.join(BUILD_DIR, version), ignore_errors=True)
+
+        for source, name in zip(self.sources, self.names):
+            binary = os.path.join(target, name)
+            if not os.path.exists(binary):
+                print(f'Compiling runtime payload {name} ({self.version}/{self.arch})...')
+                subprocess.run(['gcc', source, '-o', binary + '.tmp', *CFLAGS], check=True)
+                os.replace(binary + '.tmp', binary)
+
+
+    '''
+    Builds the local bundle and uploads the binaries the tester bucket does not hold yet
+    '''
+    def publish(self) -> None:
+        self.build()
+        s3 = aws_clients.client('s3')
+        for name in self.names:
+            key = f'{S3_PREFIX}/{self.version}/{self.arch}/{name}'
+            try:
+                s3.head_object(Bucket=vars.S3_BUCKET_NAME, Key=key)
+            except ClientError:
+                s3.upload_file(os.path.join(self.local_dir(), name), vars.S3_BUCKET_NAME, key)
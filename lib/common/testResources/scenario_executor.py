@@ -0,0 +1,185 @@
+#Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License").
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  or in the "license" file accompanying this file. This file is distributed
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+#  express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+
+import os
+import sys
+import time
+import shutil
+import signal
+import tempfile
+import threading
+import subprocess
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+
+
+'''
+A single locally run test: its test number, scenario class
+(scenario directory, ex. threatIntel, ec2, iam) and bash script text
+Tests that run remotely are units of class 'remote' that only print their description,
+given as text when it needs no shell (printed without starting a process)
+'''
+class ScenarioUnit(NamedTuple):
+    number: int
+    scenario_class: str
+    script: str
+    text: Optional[str] = None
+
+
+'''
+Outcome of a locally run test, times are time.monotonic() values
+'''
+class UnitResult(NamedTuple):
+    number: int
+    returncode: Optional[int]
+    output: str
+    start: float
+    end: float
+    timed_out: bool
+
+
+'''
+ScenarioExecutor runs each local test as its own bash process on a bounded worker pool
+    - concurrency is limited per scenario class, ex. traffic heavy EC2 scenarios run one at a time
+      and EKS scenarios that rewrite the kubeconfig do not overlap
+    - each test is given a timeout after which its whole process group is killed
+    - each test runs in its own scratch directory beside the tester directory so files
+      written by one scenario (PAYLOAD, ...) cannot collide with another
+      while relative paths such as ../py_tester still resolve
+    - output is printed in test number order as soon as all earlier tests have finished
+    - units given as text only (remote test descriptions) are not run, their text is the output
+'''
+class ScenarioExecutor:
+    MAX_WORKERS = 16
+    CLASS_LIMITS = {
+        'remote': 16,
+        'ec2': 1,
+        'eks': 1,
+        'runtime': 2,
+        # the block public access and bucket policy scripts change the same settings, in test number order
+        's3': 1,
+        'threatIntel': 16,
+    }
+    DEFAULT_CLASS_LIMIT = 4
+    CLASS_TIMEOUTS = {
+        'ec2': 3600,
+    }
+    DEFAULT_TIMEOUT = 900
+
+    def __init__(self, max_workers: int = MAX_WORKERS, class_limits: Optional[Dict[str, int]] = None,
+                 timeouts: Optional[Dict[str, int]] = None) -> None:
+        self.max_workers = max_workers
+        self.class_limits = {**self.CLASS_LIMITS, **(class_limits or {})}
+        self.timeouts = {**self.CLASS_TIMEOUTS, **(timeouts or {})}
+        self.scratch_root = os.path.dirname(os.path.abspath(os.getcwd()))
+
+
+    '''
+    Runs all units and returns their results in test number order
+    '''
+    def run(self, units: List[ScenarioUnit]) -> List[UnitResult]:
+        if not units:
+            return []
+
+        futures = {u.number: Future() for u in units}
+        dispatcher = threading.Thread(target=self.dispatch, args=(units, futures), daemon=True)
+        dispatcher.start()
+
+        results = []
+        for unit in sorted(units, key=lambda u: u.number):
+            result = futures[unit.number].result()
+            self.report(result)
+            results.append(result)
+
+        dispatcher.join()
+        return results
+
+
+    '''
+    Submits units to the worker pool in test number order whenever both a worker
+    and a slot for the unit's scenario class are free
+    '''
+    def dispatch(self, units: List[ScenarioUnit], futures: Dict[int, Future]) -> None:
+        pending = {}
+        for unit in sorted(units, key=lambda u: u.number):
+            if unit.text is not None:
+                now = time.monotonic()
+                futures[unit.number].set_result(UnitResult(unit.number, 0, unit.text, now, now, False))
+                continue
+            pending.setdefault(unit.scenario_class, deque()).append(unit)
+
+        running = {cls: 0 for cls in pending}
+        state = {'total': 0}
+        cond = threading.Condition()
+
+        def finished(unit: ScenarioUnit, result: UnitResult) -> None:
+            with cond:
+                running[unit.scenario_class] -= 1
+                state['total'] -= 1
+                cond.notify()
+            futures[unit.number].set_result(result)
+
+        def work(unit: ScenarioUnit) -> None:
+            try:
+                result = self.run_unit(unit)
+            except Exception as e:
+                now = time.monotonic()
+                result = UnitResult(unit.number, None, f'Test #{unit.number} failed to start: {e}\n', now, now, False)
+            finished(unit, result)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            with cond:
+                while any(pending.values()):
+                    for cls, queue in pending.items():
+                        limit = self.class_limits.get(cls, self.DEFAULT_CLASS_LIMIT)
+                        while queue and running[cls] < limit and state['total'] < self.max_workers:
+                            running[cls] += 1
+                            state['total'] += 1
+                            pool.submit(work, queue.popleft())
+                    if any(pending.values()):
+                        cond.wait()
+
+
+    '''
+    Runs a single unit in its own scratch directory and process group
+    The process group is killed on timeout so backgrounded commands do not outlive the test
+    '''
+    def run_unit(self, unit: ScenarioUnit) -> UnitResult:
+        timeout = self.timeouts.get(unit.scenario_class, self.DEFAULT_TIMEOUT)
+        workdir = tempfile.mkdtemp(prefix=f'.gd-tester-{unit.number}-', dir=self.scratch_root)
+        timed_out = False
+        start = time.monotonic()
+
+        try:
+            proc = subprocess.Popen(['bash', '-c', unit.script], cwd=workdir, stdout=subprocess.PIPE,
+                                    stderr=subprocess.STDOUT, start_new_session=True, text=True)
+            try:
+                output, _ = proc.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                timed_out = True
+                os.killpg(proc.pid, signal.SIGKILL)
+                output, _ = proc.communicate()
+                output += f'Test #{unit.number} timed out after {timeout} seconds\n'
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        return UnitResult(unit.number, proc.returncode, output, start, time.monotonic(), timed_out)
+
+
+    '''
+    Prints the output of a finished unit
+    '''
+    def report(self, result: UnitResult) -> None:
+        sys.stdout.write(result.output)
+        sys.stdout.flush()
@@ -0,0 +1,159 @@
+#Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License").
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  or in the "license" file accompanying this file. This file is distributed
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+#  express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+
+import os
+import json
+import hashlib
+from typing import Tuple
+
+
+'''
+Value of a test definition's INDICATOR, the malicious ip when the definition's
+indicator is empty, followed by :port when the definition has a port
+'''
+def indicator_value(d: dict) -> str:
+    value = d['indicator'] or '$MALICIOUS_IP'
+    if d.get('port') is not None:
+        value += f":{d['port']}"
+    return value
+
+
+'''
+ScenarioTemplate holds the text of a single scenario script with the
+INDICATOR/PORT variable prefixes precompiled into format strings
+render() returns the fragment for a given test definition, memoized
+per (indicator, port) since most threat intel tests share one script
+'''
+class ScenarioTemplate:
+    __slots__ = ('alias', 'digest', 'indicator_fmt', 'port_fmt', 'plain', 'rendered')
+
+    def __init__(self, alias: str, body: str, digest: str) -> None:
+        self.alias = alias
+        self.digest = digest
+        self.indicator_fmt = 'INDICATOR="{}"\n' + body.replace('{', '{{').replace('}', '}}') + '\n'
+        self.port_fmt = 'PORT={}\n' + body.replace('{', '{{').replace('}', '}}') + '\n'
+        self.plain = body + '\n'
+        self.rendered = {}
+
+
+    '''
+    Insert the domain/ip + port required for the test ahead of the scenario script
+    DNS and UDP DOS tests use port but not indicator
+    '''
+    def render(self, d: dict) -> str:
+        key = (d.get('indicator'), d.get('port'))
+        if key in self.rendered:
+            return self.rendered[key]
+
+        indicator, port = key
+        if indicator is not None:
+            fragment = self.indicator_fmt.format(indicator_value(d))
+        elif port is not None:
+            fragment = self.port_fmt.format(port)
+        else:
+            fragment = self.plain
+
+        self.rendered[key] = fragment
+        return fragment
+
+
+'''
+ScenarioTemplates loads each scenario script at most once per run and persists
+the script text on disk keyed by content hash (sha256)
+The manifest records each alias' size and modification time, so on repeat runs
+an unchanged scenario is served from the cache without opening the script
+Only the aliases a run selects are stat'ed (one stat each, no walk of the tree). A single
+key for the whole tree would miss scripts edited in place: directory modification times only
+change when entries are added, removed or renamed, and no build step stamps the tree with a hash
+'''
+class ScenarioTemplates:
+    CACHE_VERSION = 1
+
+    def __init__(self, root: str = 'scenarios', cache_path: str = '.scenario_cache.json') -> None:
+        self.root = root
+        self.cache_path = cache_path
+        self.templates = {}
+        self.dirty = False
+        self.manifest, self.bodies = self.load_cache()
+
+
+    '''
+    Returns the compiled template for the given scenario alias
+    '''
+    def get(self, alias: str) -> ScenarioTemplate:
+        if alias not in self.templates:
+            body, digest = self.read(alias)
+            self.templates[alias] = ScenarioTemplate(alias, body, digest)
+        return self.templates[alias]
+
+
+    '''
+    Returns the scenario text and digest, from the disk cache when the
+    scenario file's size and modification time still match the manifest
+    '''
+    def read(self, alias: str) -> Tuple[str, str]:
+        path = os.path.join(self.root, alias)
+        stat = os.stat(path)
+        entry = self.manifest.get(alias)
+
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns and entry['sha256'] in self.bodies:
+            return self.bodies[entry['sha256']], entry['sha256']
+
+        with open(path) as f:
+            body = f.read()
+        digest = hashlib.sha256(body.encode()).hexdigest()
+
+        self.manifest[alias] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest}
+        self.bodies[digest] = body
+        self.dirty = True
+        return body, digest
+
+
+    '''
+    Loads the persisted manifest and scenario bodies, any unreadable or outdated cache is ignored
+    '''
+    def load_cache(self) -> Tuple[dict, dict]:
+        try:
+            with open(self.cache_path) as f:
+                cache = json.load(f)
+            if cache.get('version') == self.CACHE_VERSION:
+                return cache['manifest'], cache['bodies']
+        except (OSError, ValueError, KeyError):
+            pass
+        return {}, {}
+
+
+    '''
+    Writes the cache back to disk if any scenario was (re)read during this run
+    Bodies no longer referenced by the manifest are dropped
+    '''
+    def save(self) -> None:
+        if not self.dirty:
+            return
+
+        referenced = {entry['sha256'] for entry in self.manifest.values()}
+        cache = {
+            'version': self.CACHE_VERSION,
+            'manifest': self.manifest,
+            'bodies': {k: v for k, v in self.bodies.items() if k in referenced},
+        }
+
+        tmp_path = f'{self.cache_path}.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(cache, f)
+            os.replace(tmp_path, self.cache_path)
+            self.dirty = False
+        except OSError:
+            # cache is an optimization only, a read only working directory must not fail the run
+            pass
@@ -11,4 +11,5 @@
 #  express or implied. See the License for the specific language governing 
 #  permissions and limitations under the License.
 
-dig -f ../domains/queries.txt > /dev/null &
\ No newline at end of file
+# high entropy subdomain queries through the VPC resolver, generated on the fly by the DNS traffic engine
+python3 ../py_tester/dns_traffic.py --domain guarddutyc2activityb.com --count 1000 --qps 100 --concurrency 64 --labels 2 --label-length 60 --entropy 6
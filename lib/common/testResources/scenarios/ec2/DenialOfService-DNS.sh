@@ -11,22 +11,6 @@
 #  express or implied. See the License for the specific language governing 
 #  permissions and limitations under the License.
 
-echo "import socket
-import random
-import string
-
-dest_ip = '$MALICIOUS_IP'
-dest_port = $PORT
-payload = ''.join(random.choice(string.ascii_lowercase) for _ in range(64)).encode()
-
-
-for i in range(400000):
-    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    s.bind(('',0))
-    s.sendto(payload, (dest_ip, dest_port))
-    s.close()
-
-" > fake_dos.py
-
-python3 fake_dos.py
-rm fake_dos.py
\ No newline at end of file
+# 400,000 packets paced at 20,000 packets/s by the batched UDP traffic generator, rotating
+# over many source ports as a flood from many clients would
+python3 ../py_tester/udp_traffic.py --host $MALICIOUS_IP --port $PORT --pps 20000 --duration 30 --packets 400000 --payload-size 64 --source-ports 256
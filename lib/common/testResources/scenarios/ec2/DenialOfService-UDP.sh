@@ -16,21 +16,5 @@ EIP=$(aws ec2 describe-addresses \
         --query 'Addresses[0].PublicIp' \
         --output text)
 
-echo "import socket
-import random
-import string
-
-dest_ip = '$EIP'
-dest_port = $PORT
-payload = ''.join(random.choice(string.ascii_lowercase) for _ in range(256)).encode()
-
-s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-
-for i in range(400000):
-    s.sendto(payload, (dest_ip, dest_port))
-    
-s.close()
-" > fake_dos.py
-
-python3 fake_dos.py
-rm fake_dos.py
\ No newline at end of file
+# 400,000 packets paced at 20,000 packets/s by the batched UDP traffic generator
+python3 ../py_tester/udp_traffic.py --host $EIP --port $PORT --pps 20000 --duration 30 --packets 400000 --payload-size 256
@@ -12,4 +12,5 @@
 #  permissions and limitations under the License.
 
 IFS=':' read -r IP PORT <<< "$INDICATOR"
-aws lambda invoke --function-name $LAMBDA_NAME --invocation-type Event --region $REGION --cli-binary-format raw-in-base64-out --payload '{"ip":"'$IP'","port":"'$PORT'"}' response.json > /dev/null
\ No newline at end of file
+# concurrent invocations, each sending a sustained flow of packets to the indicator
+python3 ../py_tester/lambda_driver.py --ip $IP --port $PORT --invocations 4 --rate 2 --packets 120 --packet-rate 2
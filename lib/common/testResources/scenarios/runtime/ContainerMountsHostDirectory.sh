@@ -14,19 +14,7 @@
 DATE_STRING=$(date +%s)
 EXEC_FILENAME="$DATE_STRING-mountTest"
 
-echo '
-#include <stdio.h>
-#include <sys/mount.h>
-
-int main()
-{
-   if (mount("/etc/", "/tmp/", "tempfs-test", 0, NULL) != 0) perror("mount"); //mount() fails with "No such device", but triggers event required for finding
-
-   return 0;
-}' > mountTest.c
-
-gcc mountTest.c -o $EXEC_FILENAME
+gd_payload mountTest $EXEC_FILENAME
 
 ./$EXEC_FILENAME
-rm $EXEC_FILENAME
-rm mountTest.c
\ No newline at end of file
+rm $EXEC_FILENAME
\ No newline at end of file
@@ -13,11 +13,13 @@
 
 import sys
 import json
-import time
-import boto3
+import aws_clients
 import argparse
 from botocore.exceptions import ClientError
-from typing import List, Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Callable, Optional, Tuple, Union
+from eks_agent import EksAgentReadiness
+from test_catalog import TestCatalog, requested_filters
 import tester_vars as vars
 
 '''
@@ -38,19 +40,45 @@ Settings that can change during testing:
 '''
 class SettingsManager:
 
-    def __init__(self) -> None:
+    def __init__(self, catalog: Optional[TestCatalog] = None) -> None:
         self.test_settings = {}
+        # the run's test catalog (shared with TestBuilder), loaded here only when none is given
+        self.catalog = catalog
         self.accnt_state = {}
-        self.gd_client = boto3.client('guardduty', region_name=vars.REGION)
-        self.iam_client = boto3.client('iam', region_name=vars.REGION)
-        self.s3_client = boto3.client('s3', region_name=vars.REGION)
-        self.s3control = boto3.client('s3control', region_name=vars.REGION)
-        self.eks = boto3.client('eks', region_name=vars.REGION)
         self.input_response_map = {'yes':True, 'y':True, '':True, 'no':False, 'n':False}
+        self.eks_agent = None
+        # why EKS runtime findings cannot be generated when that is known at set up (see confirm_eks_runtime)
+        self.eks_runtime_blocked = None
+        # detector features enabled by the tester during this run
+        self.enabled_features = []
+        # permission answers given up front (multi region runs), keyed by setting
+        self.consents = {}
+
+
+    '''
+    Clients come from the shared registry and are only created when a setting needs them
+    '''
+    @property
+    def gd_client(self):
+        return aws_clients.client('guardduty')
+
+    @property
+    def iam_client(self):
+        return aws_clients.client('iam')
+
+    @property
+    def s3_client(self):
+        return aws_clients.client('s3')
+
+    @property
+    def s3control(self):
+        return aws_clients.client('s3control')
     
 
     '''
     Save account settings state pre-tests
+    All read only lookups are made up front and concurrently, the
+    permission prompts then work from that snapshot
     '''
     def save_curr_state(self) -> None:
         print()
@@ -61,22 +89,89 @@ class SettingsManager:
         print('*        No changes will be made without direct user permission       *')
         print('***********************************************************************')
     
-        self.save_guardduty_state()
-        self.save_pwd_policy()
-        self.save_account_public_block_policy()
+        snapshot = self.snapshot_state()
+
+        self.save_guardduty_state(snapshot['detector'])
+        self.save_pwd_policy(snapshot.get('pwd_policy'))
+        self.save_account_public_block_policy(snapshot.get('accnt_pub_block'))
+
+
+    '''
+    Reads the current GuardDuty detector, password policy and account public access block
+    concurrently, the latter two only when the requested tests may change them
+    These reads happen before any permission is asked, so a failed password policy or public
+    access block read leaves that setting unknown (its error in place of the value), the error
+    is only raised once the user agrees to change the setting
+    '''
+    def snapshot_state(self) -> dict:
+        reads = {'detector': self.read_enabled_detector}
+        if self.needs_pwd_policy():
+            reads['pwd_policy'] = self.read_pwd_policy
+        if self.needs_accnt_pub_block():
+            reads['accnt_pub_block'] = self.read_accnt_pub_block
+
+        snapshot = {}
+        with ThreadPoolExecutor(max_workers=len(reads)) as pool:
+            futures = {key: pool.submit(read) for key, read in reads.items()}
+            for key, future in futures.items():
+                try:
+                    snapshot[key] = future.result()
+                except Exception as e:
+                    if key == 'detector':
+                        raise
+                    snapshot[key] = e
+        return snapshot
+
+
+    '''
+    Returns (id, detector) of the first enabled detector in the region or None
+    Detector ids are paginated and the detectors fetched in parallel
+    '''
+    def read_enabled_detector(self) -> Optional[Tuple[str, dict]]:
+        detector_ids = []
+        for page in self.gd_client.get_paginator('list_detectors').paginate():
+            detector_ids += page['DetectorIds']
+        if not detector_ids:
+            return None
+
+        with ThreadPoolExecutor(max_workers=min(len(detector_ids), 8)) as pool:
+            detectors = pool.map(lambda id: self.gd_client.get_detector(DetectorId=id), detector_ids)
+            for id, curr in zip(detector_ids, detectors):
+                if curr['Status'] == 'ENABLED':
+                    curr.pop('ResponseMetadata')
+                    return id, curr
+        return None
+
+
+    '''
+    Returns the account password policy, None if no policy has been set (i.e. aws default)
+    '''
+    def read_pwd_policy(self) -> Optional[dict]:
+        try:
+            return self.iam_client.get_account_password_policy()['PasswordPolicy']
+        except self.iam_client.exceptions.NoSuchEntityException:
+            return None
+
+
+    '''
+    Returns the account level public access block configuration
+    '''
+    def read_accnt_pub_block(self) -> dict:
+        try:
+            return self.s3control.get_public_access_block(AccountId=vars.ACCNT_ID)['PublicAccessBlockConfiguration']
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'NoSuchPublicAccessBlockConfiguration':
+                # Handle the case where no public access block configuration exists
+                return { "PublicAccessBlockDefault": True }
+            # Re-raise the exception if it's a different error
+            raise
 
 
     '''
     Establish necessary test settings for requested finding generation
     '''
     def set_test_settings(self, args:argparse.Namespace) -> None:
-        # user explicit given parameters
-        self.test_settings['findings'] = args.finding
-        self.test_settings['resources'] = args.test_resources
-        self.test_settings['runtime'] = args.runtime[0]
-        self.test_settings['tactics'] = args.tactics
-        self.test_settings['log_sources'] = args.log_source
-        self.test_settings['assume_yes'] = args.yes
+        self.load_test_settings(args)
 
         # maintain original state to be restored if any changes are made
         self.save_curr_state()
@@ -85,6 +180,40 @@ class SettingsManager:
         self.set_up_guardduty()
         self.set_up_pwd_policy()
         self.set_up_accnt_pub_block()
+
+
+    '''
+    Saves the user given parameters to the test settings
+    '''
+    def load_test_settings(self, args:argparse.Namespace) -> None:
+        # user explicit given parameters
+        self.test_settings['findings'] = args.finding
+        self.test_settings['resources'] = args.test_resources
+        self.test_settings['runtime'] = args.runtime[0]
+        self.test_settings['tactics'] = args.tactics
+        self.test_settings['log_sources'] = args.log_source
+        self.test_settings['assume_yes'] = args.yes
+        self.test_settings['ecs_prebuilt_image'] = args.ecs_prebuilt_image
+        if args.consents:
+            self.consents = json.loads(args.consents)
+
+
+    '''
+    Asks for every permission the requested tests may need without reading or changing
+    any account state, used to answer the prompts once for all regions of a multi region run
+    '''
+    def gather_consents(self) -> dict:
+        consents = {'guardduty': self.get_user_permission('GuardDuty Settings')}
+        if consents['guardduty']:
+            # every detector feature the tests may need, each worker enables the ones disabled in its region
+            for f in self.guardduty_features():
+                if f['feature'] and self.is_requested(f['resource'], f['setting'], f['substr'], f['log_source']):
+                    consents[f['feature']] = self.get_user_permission(f['feature'] + ' protection')
+        if self.needs_pwd_policy():
+            consents['pwd_policy'] = self.get_user_permission('Account Password Policy')
+        if self.needs_accnt_pub_block():
+            consents['accnt_pub_block'] = self.get_user_permission('Account wide Public Access Block for S3 Buckets - NOTE: This may impact other buckets within the account!')
+        return consents
                 
 
     '''
@@ -111,9 +240,22 @@ class SettingsManager:
     If it is not, then no permission is saved for check during
     settings reset stage post testing
     '''
-    def save_pwd_policy(self) -> None:
-        # if implicitly or explicitly Stealth:IAMUser/PasswordPolicyChanged finding type
-        
+    def save_pwd_policy(self, pwd_policy: Union[dict, Exception, None]) -> None:
+        if self.needs_pwd_policy():
+            self.test_settings['pwd_policy_permission'] = self.get_user_permission('Account Password Policy', 'pwd_policy')
+            if self.test_settings['pwd_policy_permission']:
+                # the policy could not be read (see snapshot_state), it cannot be restored after testing
+                if isinstance(pwd_policy, Exception):
+                    raise pwd_policy
+                self.accnt_state['pwd_policy'] = pwd_policy
+        else:
+            self.test_settings['pwd_policy_permission'] = False
+
+
+    '''
+    True if the requested tests implicitly or explicitly include Stealth:IAMUser/PasswordPolicyChanged
+    '''
+    def needs_pwd_policy(self) -> bool:
         if self.test_settings['log_sources']:
             log_source_condition = True if 'cloudtrail' in self.test_settings['log_sources'] else False
         else:
@@ -125,16 +267,8 @@ class SettingsManager:
             log_source_condition) or 
             (self.test_settings['findings'] and 
             'Stealth:IAMUser/PasswordPolicyChanged' in self.test_settings['findings'])):
-            
-            self.test_settings['pwd_policy_permission'] = self.get_user_permission('Account Password Policy')
-            if self.test_settings['pwd_policy_permission']:
-                try:
-                    self.accnt_state['pwd_policy'] = self.iam_client.get_account_password_policy()['PasswordPolicy']
-                except: 
-                    # error gets thrown if no policy has been set (i.e. aws default)
-                    self.accnt_state['pwd_policy'] = None
-        else:
-            self.test_settings['pwd_policy_permission'] = False
+            return True
+        return False
         
 
     '''
@@ -143,8 +277,23 @@ class SettingsManager:
     If it is not, then no permission is saved for check during
     settings reset stage post testing
     '''
-    def save_account_public_block_policy(self) -> None:
-        # if implicitly or explicitly S3 policy finding type that needs account public block disabled
+    def save_account_public_block_policy(self, accnt_pub_block: Union[dict, Exception, None]) -> None:
+        if self.needs_accnt_pub_block():
+            self.test_settings['account_pub_acc_permission'] = self.get_user_permission('Account wide Public Access Block for S3 Buckets - NOTE: This may impact other buckets within the account!', 'accnt_pub_block')
+            if self.test_settings['account_pub_acc_permission']:
+                # the configuration could not be read (see snapshot_state), it cannot be restored after testing
+                if isinstance(accnt_pub_block, Exception):
+                    raise accnt_pub_block
+                self.accnt_state['accnt_pub_block'] = accnt_pub_block
+        else:
+            self.test_settings['account_pub_acc_permission'] = False
+
+
+    '''
+    True if the requested tests implicitly or explicitly include S3 policy finding types
+    that need the account public access block disabled
+    '''
+    def needs_accnt_pub_block(self) -> bool:
         # s3_policy = ['Policy:S3/BucketBlockPublicAccessDisabled', 'Policy:S3/BucketPublicAccessGranted', 'Policy:S3/BucketPublicAccessGranted', 'Policy:S3/BucketPublicAccessGranted' ]
         if self.test_settings['log_sources']:
             log_source_condition = True if 'cloudtrail' in self.test_settings['log_sources'] else False
@@ -157,21 +306,8 @@ class SettingsManager:
             log_source_condition) or 
             (self.test_settings['findings'] and 
              any('Policy:S3' in x for x in self.test_settings['findings']))):
-
-            self.test_settings['account_pub_acc_permission'] = self.get_user_permission('Account wide Public Access Block for S3 Buckets - NOTE: This may impact other buckets within the account!')
-            if self.test_settings['account_pub_acc_permission']:
-                try:
-                    self.accnt_state['accnt_pub_block'] = self.s3control.get_public_access_block(AccountId=vars.ACCNT_ID)['PublicAccessBlockConfiguration']
-                except ClientError as e:
-                    if e.response['Error']['Code'] == 'NoSuchPublicAccessBlockConfiguration':
-                        # Handle the case where no public access block configuration exists
-                        self.accnt_state['accnt_pub_block'] = { "PublicAccessBlockDefault": True }
-                    else:
-                        # Re-raise the exception if it's a different error
-                        raise
-
-        else:
-            self.test_settings['account_pub_acc_permission'] = False
+            return True
+        return False
 
 
     '''
@@ -180,17 +316,10 @@ class SettingsManager:
     Otherwise permission to update the detector will be requested
     And the response will be saved 
     '''
-    def save_guardduty_state(self) -> None:
+    def save_guardduty_state(self, detector: Optional[Tuple[str, dict]]) -> None:
         # check if GD is enabled and capture state
-        detectors_ids = self.gd_client.list_detectors()['DetectorIds']
-
-        for id in detectors_ids:
-            curr = self.gd_client.get_detector(DetectorId=id)
-            if curr['Status'] == 'ENABLED':
-                self.accnt_state['detector_id'] = id
-                self.accnt_state['detector_info'] = curr
-                self.accnt_state['detector_info'].pop('ResponseMetadata')
-                break
+        if detector:
+            self.accnt_state['detector_id'], self.accnt_state['detector_info'] = detector
 
         if 'detector_id' not in self.accnt_state:
             print()
@@ -216,7 +345,7 @@ class SettingsManager:
         print('* which (if exists) will be handled by a Lambda function when the     *')
         print('* tester Cloudformation stack is deleted.                             *')
 
-        self.test_settings['guardduty_permission'] = self.get_user_permission('GuardDuty Settings')
+        self.test_settings['guardduty_permission'] = self.get_user_permission('GuardDuty Settings', 'guardduty')
 
         print('***********************************************************************')
         print()
@@ -224,8 +353,17 @@ class SettingsManager:
 
     '''
     Helper method that requests for permission to make changes to a given setting
-    '''
-    def get_user_permission(self, resource: str) -> bool:
+    A permission already given up front for the setting (consent key) is used as is,
+    a worker of a multi account/region run (given consents) has no terminal to prompt on,
+    so a setting it was given no consent for is left unchanged
+    '''
+    def get_user_permission(self, resource: str, consent: Optional[str] = None) -> bool:
+        if consent in self.consents:
+            return self.consents[consent]
+        if self.consents:
+            print(f'No permission was given up front for {resource}, leaving it unchanged')
+            return False
+
         # for spacing
         print()
         response = self.input_with_assume(f'Allow tester to make changes to {resource}? [y/n]: ').lower()
@@ -240,14 +378,25 @@ class SettingsManager:
     Sets up GuardDuty settings to match the requirements for the requested tests
     '''
     def set_up_guardduty(self) -> None:
-        # check for eks agent config
-        self.check_eks_agent()
         if not self.test_settings['guardduty_permission']:
+            self.start_eks_agent_check()
             return
 
+        # make updates to each feature as necessary
+        for f in self.guardduty_features():
+            self.set_up_guardduty_feature(f['resource'], f['setting'], f['substr'], f['log_source'], f['func'], f['feature'])
+
+        # check for eks agent config in the background once runtime monitoring is set up
+        self.start_eks_agent_check()
+
+
+    '''
+    GuardDuty settings the requested tests may need, with the options that request them
+    '''
+    def guardduty_features(self) -> List[dict]:
         # EBS malware findings will only be passive tests as no free trial available for manual scans
         # S3_DATA_EVENTS'|'EKS_AUDIT_LOGS'|'EKS_RUNTIME_MONITORING'|'LAMBDA_NETWORK_LOGS'|'RUNTIME_MONITORING'
-        features = [
+        return [
             {   # MaliciousIPCaller.Custom findings
                 'resource': ['unauthorized-access', 'recon', 'discovery', 'impact', 'defense-evasion', 'persistence'],
                 'setting': 'tactics',
@@ -290,10 +439,6 @@ class SettingsManager:
             }
         ]
 
-        # make updates to each feature as necessary 
-        for f in features:
-            self.set_up_guardduty_feature(f['resource'], f['setting'], f['substr'], f['log_source'], f['func'], f['feature'])
-
 
     '''
     Sets up strong baseline to detect weakened password policy
@@ -334,13 +479,21 @@ class SettingsManager:
     '''
     def set_up_guardduty_feature(self, options: List, setting: str, finding_substr: str, 
                                  log_source: List, func: Callable[[dict], None], feature: str) -> None:
-        if ((self.test_settings[setting] and
+        if self.is_requested(options, setting, finding_substr, log_source):
+            func(feature) # guardduty_feature or upload_custom_ti
+
+
+    '''
+    True if any of the passed options are in the user requested resources, tactics, or log_source
+    or the given substring is in user explicitly requested findings
+    '''
+    def is_requested(self, options: List, setting: str, finding_substr: str, log_source: List) -> bool:
+        return bool((self.test_settings[setting] and
             any([x in options for x in self.test_settings[setting]])) or
             (self.test_settings['log_sources'] and
             any([x in log_source for x in self.test_settings['log_sources']])) or
             (self.test_settings['findings'] and
-            any([finding_substr in finding for finding in self.test_settings['findings']]))):
-            func(feature) # guardduty_feature or upload_custom_ti
+            any([finding_substr in finding for finding in self.test_settings['findings']])))
     
 
     '''
@@ -403,12 +556,13 @@ class SettingsManager:
         print('*                                                                     *')
         print('* NOTE - changes made here will be reverted at the end of the tests   *')
         
-        if self.get_user_permission(feature + ' protection'):
+        if self.get_user_permission(feature + ' protection', feature):
              self.gd_client.update_detector(
                 DetectorId=self.accnt_state['detector_id'],
                 Enable=True,
                 Features=[config]
             )
+             self.enabled_features.append(feature)
 
         print('***********************************************************************')    
 
@@ -478,7 +632,7 @@ class SettingsManager:
         print('Account Block Public Access settings after allowing time for')
         print('findings to first be generated!')
 
-        boto3.client('stepfunctions', region_name=vars.REGION).start_execution(
+        aws_clients.client('stepfunctions').start_execution(
             stateMachineArn=vars.STEP_FUNCTION,
             input=json.dumps({
                 'account_id': vars.ACCNT_ID,
@@ -533,68 +687,75 @@ class SettingsManager:
 
 
     '''
-    Ensures that EKS GuardDuty agent is installed and running on the EKS cluster
-    Agent is installed on ECS/EC2 cluster via user data per documentation:
-    https://docs.aws.amazon.com/guardduty/latest/ug/managing-gdu-agent-ec2-manually.html
-    and EKS agent is installed via addons as per documentation:
-    https://docs.aws.amazon.com/guardduty/latest/ug/managing-gdu-agent-eks-manually.html
-    If account has automated agent configuration for eks enabled, no action required
-    If it does not, or if agent is in failed state, error will be thrown and addon will be
-    created/replaced
+    Starts the background GuardDuty EKS agent readiness check when EKS runtime tests are requested
+    Only the EKS runtime phase of the run waits on it
+    Runtime coverage is only waited on when runtime monitoring is (or was just) enabled, without
+    permission to change GuardDuty settings the check falls back to waiting for an ACTIVE addon
     '''
-    def check_eks_agent(self) -> None:
-        if ((self.test_settings['resources'] and 
-            'eks' not in self.test_settings['resources']) or 
-            (self.test_settings['findings'] and 
-            not [x for x in self.test_settings['findings'] if 'Kubernetes' in x])):
+    def start_eks_agent_check(self) -> None:
+        if not self.needs_eks_runtime():
             return
-        
-        guard_duty_agent = 'aws-guardduty-agent'
-        try:
-            status = self.eks.describe_addon(
-                clusterName=vars.EKS_CLUSTER_NAME,
-                addonName=guard_duty_agent
-            )['addon']['status']
 
-            if status == 'ACTIVE':
-                return
-            
-            elif status in ['CREATING', 'UPDATING']:
-                print('GuardDuty EKS Agent still in Creating/Updating state...')
-                time.sleep(15)
-                self.check_eks_agent()
+        check_coverage = self.test_settings['guardduty_permission']
+        if check_coverage and not self.runtime_monitoring_enabled():
+            self.eks_runtime_blocked = 'RUNTIME_MONITORING is disabled'
+            print(f'NOTE: {self.eks_runtime_blocked}, EKS Runtime Monitoring Findings will not be generated')
+            return
 
-            elif status in ['CREATE_FAILED', 'DELETING', 'DELETE_FAILED', 'DEGRADED', 'UPDATE_FAILED']:
-                raise Exception('Unable to properly provision EKS GuardDuty Agent!')
-            
-        except self.eks.exceptions.ResourceNotFoundException:
-            # no add on found -> create one
-            self.eks.create_addon(
-                clusterName=vars.EKS_CLUSTER_NAME,
-                addonName=guard_duty_agent,
-                resolveConflicts='OVERWRITE',
-            )
+        self.eks_agent = EksAgentReadiness(self.accnt_state['detector_id'], check_coverage=check_coverage).start()
+
+
+    '''
+    Waits for the background EKS agent check before the EKS tester pod is deployed
+    If the agent cannot produce findings the user is asked whether to continue (yes with --yes),
+    declining skips the EKS runtime tests only, as the rest of the run has already started
+    and its settings are restored at the end. A fan-out worker has no terminal and skips them
+    Returns True if the EKS tester pod should be deployed
+    '''
+    def confirm_eks_runtime(self) -> bool:
+        if self.eks_agent is not None:
+            if self.eks_agent.wait():
+                return True
+        elif self.eks_runtime_blocked is None:
+            return True
+        else:
+            print(f'{self.eks_runtime_blocked}, EKS Runtime Monitoring Findings will not be generated')
+
+        if self.consents and not self.test_settings['assume_yes']:
+            print('Skipping the EKS runtime tests')
+            return False
+
+        response = self.input_with_assume('Continue? [y/n]: ').lower()
+        while True:
+            if response in self.input_response_map:
+                if not self.input_response_map[response]:
+                    print('Skipping the EKS runtime tests')
+                return self.input_response_map[response]
+            else:
+                response = input('Please respond with \'y\' or \'n\': ').lower()
+
+
+    '''
+    True if the requested tests include EKS runtime monitoring tests (those run in the EKS tester pod)
+    '''
+    def needs_eks_runtime(self) -> bool:
+        if self.catalog is None:
+            with open('definitions.json') as f:
+                self.catalog = TestCatalog(json.load(f)['definitions'])
+        filters = requested_filters(self.test_settings)
+        filters += [('resource', '==', 'eks'), ('logSource', '==', 'runtime-monitoring')]
+        return bool(self.catalog.select(filters))
+
+
+    '''
+    True if runtime monitoring is enabled on the detector or was enabled for this run
+    '''
+    def runtime_monitoring_enabled(self) -> bool:
+        if 'RUNTIME_MONITORING' in self.enabled_features:
+            return True
+        features = self.accnt_state['detector_info']['Features']
+        return any(f['Name'] in ['RUNTIME_MONITORING', 'EKS_RUNTIME_MONITORING'] and f['Status'] == 'ENABLED' for f in features)
 
-            print('Deploying GuardDuty EKS Agent...')
-
-            time.sleep(15)
-            self.check_eks_agent()
-
-        except Exception as e:
-            print(e.args)
-            print('NOTE: EKS Runtime Monitoring Findings will not be generated')
-            response = self.input_with_assume('Continue? [y/n]: ').lower()
-            while True:
-                if response in self.input_response_map:
-                    if not self.input_response_map[response]: 
-                        # ('n' | 'no') -> exit tester
-                        # this is first setting to be checked -> nothing to restore if exiting
-                        print('Exiting...')
-                        sys.exit(0)
-                    else:
-                        return
-                else:
-                    response = input('Please respond with \'y\' or \'n\': ').lower()
 
     '''
     Helper method to skip user input and always return `y` when the `assume_yes` flag is passed
@@ -11,15 +11,63 @@
 #  express or implied. See the License for the specific language governing 
 #  permissions and limitations under the License.
 
+import os
+import re
 import json
-import boto3
+import uuid
+import hashlib
 import operator
 import itertools
+import time
 import subprocess
-from typing import List, Union, Set
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Union
+from test_catalog import TestCatalog, Filter, requested_filters
+from scenario_templates import ScenarioTemplates, indicator_value
+from api_scenarios import SCENARIOS as API_SCENARIOS, SCRIPT_VARS as API_SCRIPT_VARS
+from scenario_executor import ScenarioExecutor, ScenarioUnit
+from ecs_image import EcsTesterImage
+from eks_deployer import EksRuntimeDeployer
+from finding_verifier import FindingVerifier, print_results
+from run_history import RunHistory
+from event_timeline import ECS_LOG_GROUP, EVENTS_DIR, events_path
+from runtime_payloads import BUILD_DIR, PAYLOAD_FUNCTION, PayloadBundle
+from remote_executor import RemoteExecutor
+import aws_clients
 import tester_vars as vars
 
 
+# gd_event TEST SPACE start|end SCENARIO [EXIT] writes one JSON event with the wall clock and
+# monotonic (uptime) time to $GD_EVENTS, or to stdout behind a marker where no events file is set
+EVENT_FUNCTION = '''gd_event() {
+  local UP REST
+  read -r UP REST < /proc/uptime
+  local EVENT='{"run":"'$GD_RUN_ID'","test":'$1',"space":"'$2'","event":"'$3'","scenario":"'$4'","exit":'${5:-null}',"ts":'${EPOCHREALTIME:-$(date +%s.%N)}',"mono":'$UP'}'
+  if [ -n "$GD_EVENTS" ]; then
+    echo "$EVENT" >> "$GD_EVENTS"
+  else
+    echo "GD_EVENT $EVENT"
+  fi
+}
+'''
+
+# a description that only echoes text (and the test number) is printed without a shell
+PLAIN_DESCRIPTION = re.compile(r'echo "([^"$`\\]*)\$TEST_NUM([^"$`\\]*)"')
+
+
+'''
+Output of a test description for the given test number, None when it needs a shell to run
+'''
+def description_text(description: str, test_num: int) -> Optional[str]:
+    if not description:
+        return ''
+    match = PLAIN_DESCRIPTION.fullmatch(description)
+    if match is None:
+        return None
+    return f'{match.group(1)}{test_num}{match.group(2)}\n'
+
+
 '''
 TestBuilder class dynamically builds the tester script based on the
 test settings to generate real findings requested via the user parameters
@@ -30,167 +78,411 @@ class TestBuilder:
     def __init__(self,) -> None:
         with open('definitions.json') as f:
             self.tests = Tests(json.load(f)['definitions'])
+        self.executor = ScenarioExecutor()
+        self.results = []
+        self.remote_result = None
+        self.start_time = None
+        self.start_monotonic = None
+        self.verification = []
 
     
     '''
     Builds the test script text based on user provided parameters
     Filters the all test definitions down to match requested tests
-    Filters on resource, tactic, then finding type. Based on 
-    provided permission, some tests may be removed
+    Filters on resource, tactic, finding type, and log source. Based on 
+    provided permission, some tests may be removed. All filters are
+    answered together by the test catalog
     Once filtering has been completed the text of the script
     is built from the paths of given test definitions
     '''
     def build_testing_script(self, test_settings: dict) -> None:
         # trim off tests that do not match given parameters
-        self.tests.select_where('resource', 'in', test_settings['resources'])
-        self.tests.select_where('tactic', 'in', test_settings['tactics'])
-        self.tests.select_where('findingType', 'in', test_settings['findings'])
-        self.tests.select_where('logSource', 'in', test_settings['log_sources'])
-
-        if test_settings['runtime'] == 'false':
-            self.tests.select_where('findingType', 'does not contain', 'Runtime')
-        elif test_settings['runtime'] == 'only':
-            self.tests.select_where('findingType', 'contains', 'Runtime')
+        filters = requested_filters(test_settings)
 
         if not test_settings['pwd_policy_permission']:
-            self.tests.select_where('findingType', '!=', 'Stealth:IAMUser/PasswordPolicyChanged')
+            filters.append(('findingType', '!=', 'Stealth:IAMUser/PasswordPolicyChanged'))
 
         if not test_settings['account_pub_acc_permission']:
-            self.tests.select_where('findingType', 'does not contain', 'Policy:S3')
+            filters.append(('findingType', 'does not contain', 'Policy:S3'))
+
+        self.tests.select(filters)
+
+        # ECS runtime tests can run from a prebuilt tester image instead of installing tools at task start
+        if test_settings['ecs_prebuilt_image']:
+            self.tests.ecs_image = EcsTesterImage()
         
         self.tests.disambiguate()
 
     
     '''
-    Runs the dynamically built test script as subprocess
+    Runs the local tests in parallel on the scenario executor while the Debian script runs
+    on the Debian host (RemoteExecutor), deploys the EKS tester pod if needed, waits for
+    the Debian script, then runs the remaining script (expected findings) as subprocess
+    The EKS pod is only deployed once confirm_eks (SettingsManager.confirm_eks_runtime) has
+    waited for the (background) EKS agent check and agreed to deploy it
+    Local scenarios append their events to the run's events file (event_timeline.py)
     '''
-    def run_test_script(self) -> None:
+    def run_test_script(self, confirm_eks: Optional[Callable[[], bool]] = None) -> None:
+        os.makedirs(EVENTS_DIR, exist_ok=True)
+        os.environ['GD_RUN_ID'] = self.tests.run_id
+        os.environ['GD_EVENTS'] = os.path.abspath(events_path(self.tests.run_id))
+        open(os.environ['GD_EVENTS'], 'a').close()
+
         final_script = self.tests.host_script + self.tests.script_end
         self.tests.write_file('test.sh', final_script)
+        self.start_time = datetime.now(timezone.utc)
+        self.start_monotonic = time.monotonic()
+        # runtime payloads are compiled and uploaded once per source change, targets only fetch them
+        if self.tests.payloads_needed:
+            self.tests.payloads.publish()
+            os.environ['GD_PAYLOAD_DIR'] = os.path.abspath(BUILD_DIR)
         self.tests.run_ecs_tasks()
+        # the Debian script runs alongside the local tests and is waited for before the
+        # expected findings are printed (and before the caller restores the account settings)
+        remote = None
+        if self.tests.debian_script:
+            remote = RemoteExecutor(vars.LINUX_INSTANCE, self.tests.run_id)
+            remote.start()
+            os.remove('ec2.sh')
+        self.results = self.executor.run(self.tests.local_units)
+        if self.tests.eks_deployer and (confirm_eks is None or confirm_eks()):
+            self.tests.eks_deployer.deploy()
+        if remote:
+            self.remote_result = remote.wait()
         subprocess.run('bash test.sh && rm test.sh', shell=True)
 
 
+    '''
+    Polls GuardDuty for the findings expected from the run until all
+    are observed or the given number of minutes has passed
+    '''
+    def verify_findings(self, detector_id: str, minutes: int) -> None:
+        expected = self.tests.expected_findings()
+        if not expected:
+            return
+        verifier = FindingVerifier(detector_id, expected, self.start_time)
+        self.verification = verifier.verify(minutes * 60)
+        print_results(self.verification)
+
+
+    '''
+    Compact summary of the run, reported back to the launching host of a multi region run
+    '''
+    def summary(self) -> dict:
+        return {
+            'tests': len(self.tests.definitions),
+            'expected_findings': list(self.tests.expected_findings()),
+            'verification': [{'finding_type': r.finding_type, 'detected': r.detected_at is not None, 'latency': r.latency}
+                             for r in self.verification],
+        }
+
+
+    '''
+    Appends one record per expected finding type of this run to the run history store,
+    under the run id the run's events are recorded with
+    Scenario times are only known for tests that ran on the driver host
+    '''
+    def record_history(self, path: str) -> None:
+        if not self.tests.definitions:
+            return
+
+        def wall(mono: float) -> datetime:
+            return self.start_time + timedelta(seconds=mono - self.start_monotonic)
+
+        ran = {u.number for u in self.tests.local_units if u.scenario_class != 'remote'}
+        results = {r.number: r for r in self.results if r.number in ran}
+        verified = {r.finding_type: r for r in self.verification}
+
+        # a finding type expected from several tests (execution spaces) is one expectation of the run
+        tests = {}
+        for test_num, d in enumerate(self.tests.definitions, 1):
+            result = results.get(test_num)
+            tests.setdefault(d['findingType'], []).append({
+                'test_num': test_num,
+                'alias': d['alias'],
+                'resource': d['resource'],
+                'space': self.tests.execution_space(d),
+                'scenario_start': wall(result.start) if result else None,
+                'scenario_end': wall(result.end) if result else None,
+            })
+
+        records = []
+        for finding_type, finding_tests in tests.items():
+            finding = verified.get(finding_type)
+            if finding is None:
+                outcome = 'unverified'
+            else:
+                outcome = 'detected' if finding.detected_at else 'missed'
+
+            records.append({
+                'region': vars.REGION,
+                'account': vars.ACCNT_ID,
+                'run_start': self.start_time,
+                'finding_type': finding_type,
+                'tests': finding_tests,
+                'observed_at': finding.detected_at if finding else None,
+                'latency': finding.latency if finding else None,
+                'outcome': outcome,
+            })
+
+        RunHistory(path).append(self.tests.run_id, records)
+
+
 
 '''
 Tests class provides simple wrapper to query the test definitions to build specified tests script
 '''
 class Tests:
+    TASK_DEF_DIGEST_TAG = 'gd-tester-digest'
+    TASK_DEF_LOOKBACK = 10
+    INDICATOR_ALIAS = 'threatIntel/request.sh'
+    INDICATOR_ENGINE = 'indicator_contact.py'
+    DNS_ENGINE = 'dns_traffic.py'
+    API_RUNTIME = 'api_scenarios.py'
+    # the Debian host's virtualenv (see debian-instance.ts) has boto3
+    DEBIAN_PYTHON = '/home/ssm-user/gd_tester_pyenv/bin/python3'
+
     def __init__(self, defn: List[dict]) -> None:
-        self.definitions = defn
+        self.catalog = TestCatalog(defn)
+        self.definitions = list(self.catalog.entries)
+        self.templates = ScenarioTemplates()
+        self.payloads = PayloadBundle()
+        self.payloads_needed = False
 
         self.script_header = self.initialize_script()
         self.host_script = self.script_header
         self.debian_script = ''
+        self.local_units = []
         with open('script_tail.sh') as f:
             self.script_end = f.read()
-        
-        self.ops = {
-            '==':operator.eq,
-            '!=':operator.ne,
-            'in':operator.contains,
-            'contains':self.contains,
-            'does not contain':self.does_not_contain
-        }
 
-        self.ecs = boto3.client('ecs', region_name=vars.REGION)
         self.task_defs = []
+        self.ecs_image = None
+        self.eks_deployer = None
+        self.inline_sources = {}
+        self.run_id = uuid.uuid4().hex[:16]
+
+
+    @property
+    def ecs(self):
+        return aws_clients.client('ecs')
 
 
     '''
-    Given an attribute (key in test definition), operator (==,!=, in, 'does not contain'), and value
+    Given an attribute (key in test definition), operator (==, !=, in, contains, 'does not contain'), and value
     Save the test definitions that match the requirements of the query to self.definitions
     In the case that no value is given (ex, no resource, tactic, or finding), do nothing and return
     '''
     def select_where(self, attribute: str, op: str, value: Union[str, List[str]]) -> None:
-        if not value:
-            return
-        
-        temp = [d for d in self.definitions if self.ops[op](value, d[attribute])]
-        self.definitions = temp
+        self.select([(attribute, op, value)])
+
 
-    
     '''
-    Callable function that checks if substring does not exist in base string saved in self.ops
+    Applies a set of (attribute, operator, value) filters over the test catalog
+    and saves the matching test definitions to self.definitions
     '''
-    def does_not_contain(self, substr: str, base_str: str) -> bool:
-        return substr not in base_str
-    
+    def select(self, filters: List[Filter]) -> None:
+        within = self.definitions if len(self.definitions) != len(self.catalog) else None
+        self.definitions = self.catalog.select(filters, within)
+
     '''
-    Callable function that checks if substring exists in base string saved in self.ops
+    Maps each expected finding type to the test numbers expected to generate it
+    Test numbers follow the order disambiguate assigns them in
     '''
-    def contains(self, substr: str, base_str: str) -> bool:
-        return substr in base_str
-    
+    def expected_findings(self) -> Dict[str, List[int]]:
+        expected = {}
+        for test_num, d in enumerate(self.definitions, 1):
+            expected.setdefault(d['findingType'], []).append(test_num)
+        return expected
+
+    '''
+    Where the scenario of a test definition runs
+    '''
+    def execution_space(self, d: dict) -> str:
+        # scripts that are marked as "local" run on ECS host as their own executor unit
+        if d['local'] == 'true':
+            return 'host'
+
+        # all non runtime remote scripts run from the debian script
+        if 'Runtime' not in d['findingType']:
+            return 'debian'
+
+        # else it is runtime and remote -> ECS task or EKS pod
+        return d['resource']
+
     '''
     Separates scripts that are to be run locally vs on remote resource
     For some non runtime -> run on debian
     For ECS/EKS runtime run on cluster containers
     For TI based findings, insert the indicator into the respective local/remote scripts
-    For all, insert description and expected findings in host script to be printed to users terminal
+    For all, a unit is created for the local executor that prints the test description
+    (and runs the test if it is local), and the expected finding is added to the host script
+    Each execution space collects its fragments in a list that is joined once, and a
+    fragment already present in the same execution space is not repeated
+    Threat intel indicators are collected per execution space and contacted together by
+    a single run of the indicator contact engine instead of one request script each
+    API only scenarios (see api_scenarios.py) of the driver host and of the Debian host
+    run together in one process of the scenario runtime, which emits their events itself
+    Every other scenario is wrapped to emit start/end events (see with_events), remote scripts
+    carry the run id, and the Debian script uploads its events file when it finishes
     '''
     def disambiguate(self) -> None:
         self.definitions.sort(key=operator.itemgetter('resource'))
         split_by_resource = itertools.groupby(self.definitions, key=operator.itemgetter('resource'))
 
+        host_fragments = [self.script_header]
+        debian_fragments = []
+        seen = set()
+        test_num = 0
+        indicators = {}
+        indicator_unit = None
+        api_runs = {}
+        api_unit = None
+
         # iterate over resources and write separate scripts per execution space (EC2 host, EKS pod, ECS container, and Debian host)
         for resource, definitions in split_by_resource:
-            remote_script = ''
+            remote_fragments = []
 
             for d in definitions:
-                self.host_script += d['description'] + '\n'
-                self.host_script += f"EXPECTED_FINDINGS+=({d['expectedFinding']})\n((TEST_NUM++))\n"
-                
-                temp_script = ''
-
-                # include domain/ip + port required for the test
-                if 'indicator' in d:
-                    indicator = d['indicator'] if d['indicator'] else '$MALICIOUS_IP'
-
-                    if 'port' in d:
-                        indicator += f":{d['port']}"
-
-                    temp_script = f"INDICATOR=\"{indicator}\"\n"
-                
-                # DNS and UDP DOS tests use port but not indicator
-                elif 'port' in d:
-                    temp_script = f"PORT={d['port']}\n"
-                
-                with open(f"scenarios/{d['alias']}") as f:
-                    temp_script += f.read() + '\n'
-
-                # scripts that are marked as "local" run on ECS host
-                if d['local'] == 'true':
-                    self.host_script += temp_script
-
-                # write all non runtime remote scripts to debian script
-                elif 'Runtime' not in d['findingType']:
-                    if not self.debian_script:
-                        self.debian_script = self.script_header
-                    self.debian_script += temp_script
-                    
-                # else it is runtime and remote -> ECS task or EKS pod
-                else:
-                    remote_script += temp_script
-
-            if remote_script:
-                self.write_file(f'{resource}.sh', self.script_header + remote_script)
+                test_num += 1
+                host_fragments.append(f"EXPECTED_FINDINGS+=({d['expectedFinding']})\n((TEST_NUM++))\n")
+                unit = [self.script_header, f'TEST_NUM={test_num}\n', d['description'] + '\n']
+                self.local_units.append(ScenarioUnit(test_num, 'remote', ''.join(unit), description_text(d['description'], test_num)))
+
+                space = self.execution_space(d)
+
+                if d['alias'] == self.INDICATOR_ALIAS:
+                    # indicators of a space are reported under the first threat intel test number
+                    _, values = indicators.setdefault(space, (test_num, []))
+                    if indicator_value(d) not in values:
+                        values.append(indicator_value(d))
+                    # the first local threat intel test's unit runs the engine for all of them
+                    if space == 'host' and indicator_unit is None:
+                        indicator_unit = (test_num, unit)
+                    continue
+
+                if d['alias'] in API_SCENARIOS and space in ('host', 'debian'):
+                    runs = api_runs.setdefault(space, [])
+                    if d['alias'] not in [alias for _, alias in runs]:
+                        runs.append((test_num, d['alias']))
+                    # the first local API scenario's unit runs the runtime for all of them
+                    if space == 'host' and api_unit is None:
+                        api_unit = (test_num, unit)
+                    continue
+
+                fragment = self.templates.get(d['alias']).render(d)
+                fragments = {'host': unit, 'debian': debian_fragments}.get(space, remote_fragments)
+
+                # identical scenario in the same execution space only needs to run once
+                if (space, fragment) in seen:
+                    continue
+                seen.add((space, fragment))
+                fragments.append(self.with_events(test_num, space, d['alias'], fragment))
+                if 'gd_payload ' in fragment:
+                    self.payloads_needed = True
+
+                if space == 'host':
+                    self.local_units[-1] = ScenarioUnit(test_num, d['alias'].split('/')[0], ''.join(unit))
+
+            if resource in indicators:
+                remote_fragments.append(self.indicator_fragment(resource, *indicators[resource], inline=True))
+
+            if remote_fragments:
                 if 'ecs' in resource:
+                    self.write_file(f'{resource}.sh', self.script_header + f"GD_RUN_ID='{self.run_id}'\n" + ''.join(remote_fragments))
                     self.upload_file(resource)
                     self.build_ecs_task(resource)
-        
-        if self.debian_script:
+                elif resource == 'eks':
+                    # the run id reaches the pod through its environment, so eks.sh (and its image) stays the same across runs
+                    self.write_file(f'{resource}.sh', self.script_header + ''.join(remote_fragments))
+                    self.eks_deployer = EksRuntimeDeployer(self.run_id, self.payloads)
+
+        if indicator_unit:
+            number, unit = indicator_unit
+            unit.append(self.indicator_fragment('host', *indicators['host'], inline=False))
+            self.local_units[number - 1] = ScenarioUnit(number, 'threatIntel', ''.join(unit))
+        if 'debian' in indicators:
+            debian_fragments.append(self.indicator_fragment('debian', *indicators['debian'], inline=True))
+        if api_unit:
+            number, unit = api_unit
+            unit.append(self.api_fragment('host', api_runs['host'], inline=False))
+            self.local_units[number - 1] = ScenarioUnit(number, 'api', ''.join(unit))
+        if 'debian' in api_runs:
+            debian_fragments.append(self.api_fragment('debian', api_runs['debian'], inline=True))
+
+        self.host_script = ''.join(host_fragments)
+        if debian_fragments:
+            self.debian_script = ''.join([
+                self.script_header,
+                f"GD_RUN_ID='{self.run_id}'\nGD_EVENTS=gd_events.jsonl\n",
+                *debian_fragments,
+                'aws s3 cp $GD_EVENTS s3://$S3_BUCKET_NAME/events/$GD_RUN_ID/debian.jsonl --quiet\n',
+            ])
             self.write_file('ec2.sh', self.debian_script)
             self.upload_file('ec2')
 
+        self.templates.save()
+
+    '''
+    Script fragment running the indicator contact engine against the given indicators
+    On the driver host the engine runs from the tester directory, remote scripts carry
+    the engine's source inline since ECS tasks, EKS pods and the Debian host have no copy,
+    with the DNS traffic engine it imports written next to it
+    The result of every indicator is recorded as an event of the given test
+    '''
+    def indicator_fragment(self, space: str, test_num: int, indicators: List[str], inline: bool) -> str:
+        args = f'--test {test_num} --space {space} ' + ' '.join(f'"{i}"' for i in indicators)
+        env = 'GD_RUN_ID="$GD_RUN_ID" GD_EVENTS="$GD_EVENTS"'
+        if not inline:
+            return self.with_events(test_num, space, self.INDICATOR_ALIAS, f'{env} python3 ../py_tester/{self.INDICATOR_ENGINE} {args}\n')
+
+        engine = (f"cat > {self.DNS_ENGINE} <<'GD_DNS_ENGINE'\n{self.inline_source(self.DNS_ENGINE)}\nGD_DNS_ENGINE\n"
+                  f"{env} python3 - {args} <<'GD_INDICATOR_ENGINE'\n{self.inline_source(self.INDICATOR_ENGINE)}\nGD_INDICATOR_ENGINE\n")
+        return self.with_events(test_num, space, self.INDICATOR_ALIAS, engine)
+
+    '''
+    Fragment running the given (test number, alias) API only scenarios in one scenario runtime process
+    The script variables the scenarios use are handed to the runtime through its environment,
+    remote scripts carry the runtime's source inline like the indicator engine
+    '''
+    def api_fragment(self, space: str, scenarios: List[tuple], inline: bool) -> str:
+        env = ' '.join(f'{v}="${v}"' for v in API_SCRIPT_VARS)
+        args = ' '.join(f'{test}:{alias}' for test, alias in scenarios)
+        if not inline:
+            return f'{env} python3 ../py_tester/{self.API_RUNTIME} --space {space} {args}\n'
+        # the Debian host runs the Tor scenarios, they share one set of fresh circuits per run
+        return (f"{env} {self.DEBIAN_PYTHON} - --space {space} --fresh-tor-exit {args} <<'GD_API_SCENARIOS'\n"
+                f"{self.inline_source(self.API_RUNTIME)}\nGD_API_SCENARIOS\n")
+
+    '''
+    Source of a tester module that remote scripts run inline, read once per build
+    '''
+    def inline_source(self, path: str) -> str:
+        if path not in self.inline_sources:
+            with open(path) as f:
+                self.inline_sources[path] = f.read()
+        return self.inline_sources[path]
+
+    '''
+    Wraps a scenario fragment in start and end events (gd_event in the script header)
+    The scenario runs in a subshell so an exit within it ends only that scenario,
+    the end event carries its exit code
+    '''
+    def with_events(self, test_num: int, space: str, scenario: str, fragment: str) -> str:
+        return (f'gd_event {test_num} {space} start {scenario}\n'
+                f'(\n{fragment}\n)\n'
+                f'gd_event {test_num} {space} end {scenario} $?\n')
+
     '''
     Simple helper method to upload remote script file to s3 for remote execution
     '''
     def upload_file(self, resource: str) -> None:
-        boto3.client('s3', region_name=vars.REGION).upload_file(f'{resource}.sh', vars.S3_BUCKET_NAME, f'remote/{resource}.sh')
+        aws_clients.client('s3').upload_file(f'{resource}.sh', vars.S3_BUCKET_NAME, f'remote/{resource}.sh')
 
     '''
     Builds the task definition for the given ecs launch type and commands to run
+    With a prebuilt tester image the container only fetches and runs the remote script
+    The definition is registered (or an identical one reused) when the tasks are run
     '''
     def build_ecs_task(self, resource: str) -> None:
 
@@ -203,7 +495,7 @@ class Tests:
         task_commands = ';'.join([
             'sleep 30',
             'apt update -y',
-            'apt install python3 gcc netcat-openbsd g++ sudo zip -y',
+            'apt install python3 netcat-openbsd sudo zip -y',
             'curl "https://awscli.amazonaws.com/awscli-exe-linux-x86_64.zip" -o "awscliv2.zip" && unzip awscliv2.zip && ./aws/install',
             "echo -n 'X5O!P%@AP[4\\PZX54(P^)7CC)7}\\$EICAR-STANDARD-ANTIVIRUS-TEST-FILE!\\$H+H*' >/tmp/eicar.com && cp /tmp/eicar.com /tmp/eicar.com.txt && zip -j /tmp/eicar_com.zip /tmp/eicar.com && zip -j /tmp/eicarcom2.zip /tmp/eicar_com.zip",
             f'aws s3 cp s3://{vars.S3_BUCKET_NAME}/remote/{resource}.sh . && bash {resource}.sh', 
@@ -211,15 +503,15 @@ class Tests:
             'sleep 60',
         ])
 
-        self.task_defs.append(self.ecs.register_task_definition(
-            family=vars.EC2_TASK_FAM if is_ec2 else vars.FARGATE_TASK_FAM,
-            taskRoleArn=vars.TASK_ROLE_ARN,
-            executionRoleArn=vars.TASK_EXEC_ROLE_ARN,
-            networkMode='awsvpc',
-            requiresCompatibilities=['EC2'] if is_ec2 else ['FARGATE'],
-            cpu='256' if is_ec2 else '1 vCPU',
-            memory='512' if is_ec2 else '2 GB',
-            containerDefinitions=[{
+        self.task_defs.append({
+            'family': vars.EC2_TASK_FAM if is_ec2 else vars.FARGATE_TASK_FAM,
+            'taskRoleArn': vars.TASK_ROLE_ARN,
+            'executionRoleArn': vars.TASK_EXEC_ROLE_ARN,
+            'networkMode': 'awsvpc',
+            'requiresCompatibilities': ['EC2'] if is_ec2 else ['FARGATE'],
+            'cpu': '256' if is_ec2 else '1 vCPU',
+            'memory': '512' if is_ec2 else '2 GB',
+            'containerDefinitions': [{
                 'name':vars.CONTAINER,
                 'image':'public.ecr.aws/ecs-sample-image/amazon-ecs-sample:latest',
                 'privileged':is_ec2,
@@ -234,34 +526,77 @@ class Tests:
                     'logDriver': 'awslogs',
                     'options': {
                         'awslogs-create-group': 'true',
-                        'awslogs-group': 'GuardDuty-Tester-Ecs-Task-Logs',
+                        'awslogs-group': ECS_LOG_GROUP,
                         'awslogs-region': vars.REGION,
                         'awslogs-stream-prefix': 'app'
                     }
                 },
             }],
-        )['taskDefinition']['taskDefinitionArn'])
+        })
+
+        if self.ecs_image:
+            self.task_defs[-1]['containerDefinitions'][0].update(self.ecs_image.container_overrides(resource))
 
 
     '''
-    Runs the tasks that have been registered for the user specified tests
+    Returns the ARN of an ACTIVE task definition revision matching the given payload
+    Revisions are tagged with a sha256 digest of their full payload at registration
+    The newest revisions of the family are checked for that digest and a new
+    revision is only registered when none match
     '''
-    def run_ecs_tasks(self) -> None:
-        for task in self.task_defs:
-            is_ec2 = 'ec2' in task.lower()
-            self.ecs.run_task(
-                cluster=vars.CLUSTER,
-                taskDefinition=task,
-                launchType='EC2' if is_ec2 else 'FARGATE',
-                count=1,
-                networkConfiguration={
-                    'awsvpcConfiguration': {
-                        'subnets': vars.SUBNETS,
-                        'securityGroups': vars.SEC_GROUP,
-                        'assignPublicIp': 'DISABLED' if is_ec2 else 'ENABLED'
-                    }
+    def resolve_task_definition(self, task_def: dict) -> str:
+        digest = hashlib.sha256(json.dumps(task_def, sort_keys=True).encode()).hexdigest()
+
+        revisions = self.ecs.list_task_definitions(
+            familyPrefix=task_def['family'],
+            status='ACTIVE',
+            sort='DESC',
+            maxResults=self.TASK_DEF_LOOKBACK
+        )['taskDefinitionArns']
+
+        for arn in revisions:
+            tags = self.ecs.describe_task_definition(taskDefinition=arn, include=['TAGS']).get('tags', [])
+            if any(t['key'] == self.TASK_DEF_DIGEST_TAG and t['value'] == digest for t in tags):
+                return arn
+
+        return self.ecs.register_task_definition(
+            **task_def,
+            tags=[{'key': self.TASK_DEF_DIGEST_TAG, 'value': digest}]
+        )['taskDefinition']['taskDefinitionArn']
+
+
+    '''
+    Resolves the task definition and runs a single task for it
+    '''
+    def run_ecs_task(self, task_def: dict) -> None:
+        is_ec2 = 'EC2' in task_def['requiresCompatibilities']
+        self.ecs.run_task(
+            cluster=vars.CLUSTER,
+            taskDefinition=self.resolve_task_definition(task_def),
+            launchType='EC2' if is_ec2 else 'FARGATE',
+            count=1,
+            networkConfiguration={
+                'awsvpcConfiguration': {
+                    'subnets': vars.SUBNETS,
+                    'securityGroups': vars.SEC_GROUP,
+                    'assignPublicIp': 'DISABLED' if is_ec2 else 'ENABLED'
                 }
-            )
+            }
+        )
+
+
+    '''
+    Runs the tasks for the user specified tests, the ecs-ec2 and ecs-fargate
+    families are registered and launched concurrently
+    '''
+    def run_ecs_tasks(self) -> None:
+        if not self.task_defs:
+            return
+        if self.ecs_image:
+            self.ecs_image.ensure()
+        with ThreadPoolExecutor(max_workers=len(self.task_defs)) as pool:
+            # list() surfaces any exception raised while registering or running a task
+            list(pool.map(self.run_ecs_task, self.task_defs))
 
     '''
     Helper method to write to a file
@@ -274,7 +609,7 @@ class Tests:
     Insert shebang and script variables at the start of the script text
     '''
     def initialize_script(self) -> str:
-        return f'#!bin/bash\n\n{self.insert_script_vars()}\n\n' 
+        return f'#!bin/bash\n\n{self.insert_script_vars()}\n\n{EVENT_FUNCTION}\n{PAYLOAD_FUNCTION}\n' 
 
     '''
     Saves the variables to the script to be used by tests as needed
@@ -298,6 +633,7 @@ class Tests:
             f'MALICIOUS_IP=\'{vars.MALICIOUS_IP}\'',
             f'LAMBDA_NAME=\'{vars.LAMBDA_NAME}\'',
             f'EKS_CLUSTER_NAME=\'{vars.EKS_CLUSTER_NAME}\'',
+            f'GD_PAYLOAD_VERSION=\'{self.payloads.version}\'',
             'TEST_NUM=1',
             'EXPECTED_FINDINGS=()',
         ]
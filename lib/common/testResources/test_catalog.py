@@ -0,0 +1,81 @@
+#Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License").
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  or in the "license" file accompanying this file. This file is distributed
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+#  express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+
+from typing import Iterable, List, Optional, Tuple, Union
+
+# (attribute, operator, value) as used by Tests.select_where
+Filter = Tuple[str, str, Union[str, List[str]]]
+
+
+'''
+Filters for the tests requested on the command line (resource, tactic, finding type,
+log source and runtime flag), without the ones that depend on the account settings
+'''
+def requested_filters(test_settings: dict) -> List[Filter]:
+    filters = [
+        ('resource', 'in', test_settings['resources']),
+        ('tactic', 'in', test_settings['tactics']),
+        ('findingType', 'in', test_settings['findings']),
+        ('logSource', 'in', test_settings['log_sources']),
+    ]
+
+    if test_settings['runtime'] == 'false':
+        filters.append(('findingType', 'does not contain', 'Runtime'))
+    elif test_settings['runtime'] == 'only':
+        filters.append(('findingType', 'contains', 'Runtime'))
+    return filters
+
+
+'''
+TestCatalog holds the test definitions (the dictionaries loaded from definitions.json,
+kept as they are) and answers the CLI filter set over them
+    - the tester loads one catalog per run and shares it (see TestBuilder and SettingsManager)
+    - each filter is a single list comprehension over the definitions the earlier filters
+      kept, so the whole filter set costs about one pass over the catalog
+The catalog is queried once or twice per run, which never pays for building indexes first
+(see catalog_benchmark.py)
+'''
+class TestCatalog:
+    OPS = {
+        '==': lambda value, attr: attr == value,
+        '!=': lambda value, attr: attr != value,
+        'in': lambda values, attr: attr in values,
+        'contains': lambda substr, attr: substr in (attr or ''),
+        'does not contain': lambda substr, attr: substr not in (attr or ''),
+    }
+
+    def __init__(self, defn: List[dict]) -> None:
+        self.entries = tuple(defn)
+
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+    '''
+    Evaluates every filter and returns the matching definitions in catalog order
+    Filters with no value (ex, no resource, tactic, or finding given) are skipped
+    Optionally restricts the result to definitions already within a prior selection
+    '''
+    def select(self, filters: List[Filter], within: Optional[Iterable[dict]] = None) -> List[dict]:
+        selected = list(self.entries if within is None else within)
+        for attribute, op, value in filters:
+            if not value:
+                continue
+            if op == 'in':
+                value = {value} if isinstance(value, str) else set(value)
+            test = self.OPS[op]
+            selected = [d for d in selected if test(value, d.get(attribute))]
+            if not selected:
+                break
+        return selected
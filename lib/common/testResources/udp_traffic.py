@@ -0,0 +1,265 @@
+#Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License").
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  or in the "license" file accompanying this file. This file is distributed
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+#  express or implied. See the License for the specific language governing
+#  permissions and limitations under the License.
+
+import os
+import sys
+import time
+import ctypes
+import random
+import socket
+import string
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple, Optional
+
+
+'''
+Packets and bytes sent by a flood (or received by a sink) and the seconds it took
+errors counts batches the kernel refused (ex. ENOBUFS, or ICMP port unreachable)
+'''
+class FloodReport(NamedTuple):
+    packets: int
+    bytes: int
+    errors: int
+    elapsed: float
+
+    @property
+    def pps(self) -> float:
+        return self.packets / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def mbps(self) -> float:
+        return self.bytes * 8 / self.elapsed / 1e6 if self.elapsed else 0.0
+
+
+class IoVec(ctypes.Structure):
+    _fields_ = [('base', ctypes.c_void_p), ('len', ctypes.c_size_t)]
+
+
+class MsgHdr(ctypes.Structure):
+    _fields_ = [
+        ('name', ctypes.c_void_p),
+        ('namelen', ctypes.c_uint32),
+        ('iov', ctypes.POINTER(IoVec)),
+        ('iovlen', ctypes.c_size_t),
+        ('control', ctypes.c_void_p),
+        ('controllen', ctypes.c_size_t),
+        ('flags', ctypes.c_int),
+    ]
+
+
+class MMsgHdr(ctypes.Structure):
+    _fields_ = [('hdr', MsgHdr), ('len', ctypes.c_uint)]
+
+
+'''
+Returns libc's sendmmsg, or None where it is not available (non Linux hosts)
+'''
+def load_sendmmsg():
+    try:
+        sendmmsg = ctypes.CDLL(None, use_errno=True).sendmmsg
+    except (OSError, AttributeError):
+        return None
+    sendmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(MMsgHdr), ctypes.c_uint, ctypes.c_int]
+    sendmmsg.restype = ctypes.c_int
+    return sendmmsg
+
+
+'''
+BatchSender sends batches of one preallocated payload over connected UDP sockets
+With sendmmsg a whole batch is a single system call over a message vector built
+once, otherwise the batch is sent with a tight loop of send() calls
+Batches rotate over source_ports sockets, each bound to its own ephemeral port
+'''
+class BatchSender:
+
+    def __init__(self, host: str, port: int, payload: bytes, batch: int, source_ports: int = 1) -> None:
+        self.batch = batch
+        self.payload = payload
+        self.sockets = []
+        for _ in range(max(1, source_ports)):
+            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            s.connect((host, port))
+            self.sockets.append(s)
+        self.next_socket = 0
+
+        self.sendmmsg = load_sendmmsg()
+        if self.sendmmsg:
+            # every message of the vector points at the same payload buffer
+            self.buffer = ctypes.create_string_buffer(payload, len(payload))
+            self.iov = IoVec(ctypes.addressof(self.buffer), len(payload))
+            self.messages = (MMsgHdr * batch)()
+            for m in self.messages:
+                m.hdr.iov = ctypes.pointer(self.iov)
+                m.hdr.iovlen = 1
+
+
+    '''
+    Sends up to count packets, returns the number the kernel accepted (-1 on error)
+    '''
+    def send(self, count: int) -> int:
+        s = self.sockets[self.next_socket]
+        self.next_socket = (self.next_socket + 1) % len(self.sockets)
+        count = min(count, self.batch)
+
+        if self.sendmmsg:
+            return self.sendmmsg(s.fileno(), self.messages, count, 0)
+
+        sent = 0
+        try:
+            for _ in range(count):
+                s.send(self.payload)
+                sent += 1
+        except OSError:
+            return sent or -1
+        return sent
+
+
+    def close(self) -> None:
+        for s in self.sockets:
+            s.close()
+
+
+'''
+UdpFlood sends UDP packets to a destination at a target rate for a duration
+    - packets are sent in batches, the send schedule is only checked once per batch
+    - with processes > 1 the rate and packet budget are sharded across worker processes
+    - pps <= 0 sends as fast as possible, packets caps the total packets sent
+'''
+class UdpFlood:
+    BATCH = 64
+
+    def __init__(self, host: str, port: int, pps: float, duration: float, payload_size: int = 256,
+                 packets: Optional[int] = None, processes: int = 1, batch: int = BATCH, source_ports: int = 1) -> None:
+        self.host = host
+        self.port = port
+        self.pps = pps
+        self.duration = duration
+        self.payload_size = payload_size
+        self.packets = packets
+        self.processes = max(1, processes)
+        self.batch = max(1, batch)
+        self.source_ports = source_ports
+
+
+    def run(self) -> FloodReport:
+        if self.processes == 1:
+            return self.run_shard(0)
+
+        with ProcessPoolExecutor(max_workers=self.processes) as pool:
+            reports = list(pool.map(self.run_shard, range(self.processes)))
+        return FloodReport(
+            sum(r.packets for r in reports),
+            sum(r.bytes for r in reports),
+            sum(r.errors for r in reports),
+            max(r.elapsed for r in reports),
+        )
+
+
+    '''
+    Runs one shard of the flood, its share of the rate and packet budget
+    '''
+    def run_shard(self, shard: int) -> FloodReport:
+        pps = self.pps / self.processes
+        budget = None
+        if self.packets is not None:
+            budget = self.packets // self.processes + (1 if shard < self.packets % self.processes else 0)
+
+        payload = ''.join(random.choice(string.ascii_lowercase) for _ in range(self.payload_size)).encode()
+        sender = BatchSender(self.host, self.port, payload, self.batch, self.source_ports)
+        packets, errors = 0, 0
+        start = time.monotonic()
+        stop = start + self.duration
+
+        try:
+            while budget is None or packets < budget:
+                now = time.monotonic()
+                if now >= stop:
+                    break
+                if pps > 0:
+                    send_at = start + packets / pps
+                    if send_at > now:
+                        time.sleep(min(send_at - now, stop - now))
+                        continue
+
+                remaining = self.batch if budget is None else budget - packets
+                sent = sender.send(remaining)
+                if sent < 0:
+                    errors += 1
+                else:
+                    packets += sent
+        finally:
+            sender.close()
+
+        return FloodReport(packets, packets * len(payload), errors, time.monotonic() - start)
+
+
+'''
+Receives on a local UDP port until duration seconds passed (or idle seconds without
+a packet after the first one) and reports what arrived, used to measure a flood
+'''
+def udp_sink(port: int, duration: float, idle: float = 2.0, bind: str = '127.0.0.1') -> FloodReport:
+    buffer = bytearray(65535)
+    packets, received = 0, 0
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 24)
+        s.bind((bind, port))
+        s.settimeout(duration)
+        start = last = time.monotonic()
+        stop = start + duration
+        while True:
+            try:
+                received += s.recv_into(buffer)
+            except socket.timeout:
+                break
+            if not packets:
+                start = time.monotonic()
+            packets += 1
+            last = time.monotonic()
+            if last >= stop:
+                break
+            s.settimeout(min(idle, stop - last))
+    return FloodReport(packets, received, 0, last - start)
+
+
+def print_report(report: FloodReport, label: str) -> None:
+    print(f'{label}: {report.packets} packets, {report.bytes} bytes in {report.elapsed:.1f}s '
+          f'({report.pps:,.0f} packets/s, {report.mbps:.1f} Mbit/s), errors {report.errors}')
+    sys.stdout.flush()
+
+
+'''
+Generates UDP traffic for the denial of service scenarios, or with --sink
+counts the packets arriving on a local port to measure a flood
+'''
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Batched UDP traffic generator')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Destination address')
+    parser.add_argument('--port', type=int, required=True, help='Destination port (or the port to listen on with --sink)')
+    parser.add_argument('--pps', type=float, default=20000, help='Target packets per second, 0 for no limit. Default: 20000')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds to send (or listen) for. Default: 20')
+    parser.add_argument('--packets', type=int, default=None, help='Stop after sending this many packets')
+    parser.add_argument('--payload-size', type=int, default=256, help='Payload bytes per packet. Default: 256')
+    parser.add_argument('--batch', type=int, default=UdpFlood.BATCH, help=f'Packets per send batch. Default: {UdpFlood.BATCH}')
+    parser.add_argument('--processes', type=int, default=1, help='Worker processes sharing the rate, 0 for one per core. Default: 1')
+    parser.add_argument('--source-ports', type=int, default=1, help='Sockets (source ports) the batches rotate over. Default: 1')
+    parser.add_argument('--sink', action='store_true', help='Listen on --port and report the packets received')
+    args = parser.parse_args()
+
+    if args.sink:
+        print_report(udp_sink(args.port, args.duration), f'UDP sink on port {args.port}')
+    else:
+        processes = args.processes or os.cpu_count() or 1
+        flood = UdpFlood(args.host, args.port, args.pps, args.duration, args.payload_size,
+                         args.packets, processes, args.batch, args.source_ports)
+        print_report(flood.run(), f'UDP traffic to {args.host}:{args.port}')